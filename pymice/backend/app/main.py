@@ -15,6 +15,7 @@ if disable_cuda_if_unsupported():
     print("[startup] GPU arch unsupported by this PyTorch build — hiding CUDA; running on CPU.")
 
 from app.routers import camera, video, tracking, roi, analysis, system, experiment
+from app.processing.checkpoint import resumable_task_files
 
 app = FastAPI(
     title="PyMice Web API",
@@ -29,6 +30,8 @@ def cleanup_temp_directories(max_age_seconds: int = 3600):
     """Clean temporary directories, but only for files older than max_age_seconds"""
     # NOTE: temp/experiments/ and temp/integrations.json are deliberately NOT cleaned —
     # they hold user data (recordings, hardware bindings) that must survive restarts.
+    # temp/background_cache/ is keyed by video content and capped in size by
+    # app.processing.background, so it is not cleaned here either.
     temp_dirs = [
         "temp/videos",
         "temp/tracking",
@@ -46,6 +49,9 @@ def cleanup_temp_directories(max_age_seconds: int = 3600):
     total_space = 0
     now = time.time()
 
+    # Interrupted tracking tasks can be resumed after a restart: keep what they need
+    preserved = resumable_task_files("temp/tracking", "temp/videos")
+
     for temp_dir in temp_dirs:
         if not os.path.exists(temp_dir):
             continue
@@ -63,6 +69,10 @@ def cleanup_temp_directories(max_age_seconds: int = 3600):
                     print(f"   📌 Preserved model: {item}")
                     continue
 
+                if os.path.abspath(item_path) in preserved:
+                    print(f"   📌 Preserved for resumable tracking: {item}")
+                    continue
+
                 # Check age
                 try:
                     mtime = os.path.getmtime(item_path)
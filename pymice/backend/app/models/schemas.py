@@ -59,12 +59,13 @@ class TrackingFrame(BaseModel):
     centroid_y: Optional[float] = None
     roi: Optional[str] = None
     roi_index: Optional[int] = None
-    detection_method: Literal["yolo", "template", "none"]
+    detection_method: Literal["yolo", "template", "interpolated", "none"]
     timestamp_sec: float
     bbox: Optional[List[float]] = None
     confidence: Optional[float] = None
     keypoints: Optional[List[dict]] = None
     mask: Optional[List[List[float]]] = None
+    gated: Optional[bool] = None  # True: static scene, result reused from the last inferred frame
 
 
 class VideoInfo(BaseModel):
@@ -81,6 +82,9 @@ class TrackingStatistics(BaseModel):
     frames_without_detection: int
     yolo_detections: int
     template_detections: int
+    interpolated_frames: int = 0
+    gated_frames: int = 0
+    gate_hit_rate: float = 0.0
     detection_rate: float
 
 
@@ -91,6 +95,8 @@ class TrackingData(BaseModel):
     video_info: VideoInfo
     statistics: TrackingStatistics
     rois: List[ROI]
+    partial: bool = False  # Stopped sharded run: tracking_data only covers processed_ranges
+    processed_ranges: Optional[List[List[int]]] = None  # [start, end) frame ranges that were tracked
     tracking_data: List[TrackingFrame]
 
 
@@ -103,15 +109,47 @@ class TrackingRequest(BaseModel):
     inference_size: int = Field(default=640, ge=320, le=1280)  # YOLO inference image size (smaller = less GPU memory)
     sam_prompt: Optional[str] = None
     frame_number: Optional[int] = 0
+    batch_size: int = Field(default=1, ge=1, le=64)  # Frames per YOLO call (1 = frame-by-frame)
+    num_shards: int = Field(default=1, ge=1, le=64)  # Worker processes splitting the video (1 = single process)
+    priority: int = Field(default=0, ge=-10, le=10)  # Higher runs first when tracking jobs are queued
+    preview_max_fps: float = Field(default=5.0, gt=0.0, le=60.0)  # Max live-preview renders per second (rendered only when polled)
+    sampling_mode: Literal["every_frame", "stride", "adaptive"] = "every_frame"  # Which frames are inferred; the rest are interpolated
+    sampling_stride: int = Field(default=1, ge=1, le=60)  # stride mode: infer every k-th frame
+    sampling_max_stride: int = Field(default=8, ge=1, le=60)  # adaptive mode: longest stride while the animal is still
+    roi_crop: bool = False  # Run YOLO only on the bounding box of the ROIs (results stay in full-frame coordinates)
+    roi_crop_padding: int = Field(default=32, ge=0, le=512)  # Pixels kept around the ROI bounding box
+    motion_gate: bool = False  # Reuse the last detection while the scene inside the ROIs is static
+    motion_gate_threshold: float = Field(default=0.001, gt=0.0, le=1.0)  # Fraction of ROI pixels that must change to run inference
+    tracking_mode: Literal["full_frame", "search_window"] = "full_frame"  # search_window: look around the last centroid first
+    search_window_size: int = Field(default=320, ge=64, le=1920)  # Side (px, full-frame scale) of the search window
+    search_window_min_confidence: float = Field(default=0.5, ge=0.0, le=1.0)  # Below this, fall back to the full frame
+    inference_backend: Literal["pytorch", "onnx", "openvino", "onnx_int8"] = "pytorch"  # CPU runtime; the model is exported once and cached
+
+    @model_validator(mode="after")
+    def _check_sharded_sampling(self) -> "TrackingRequest":
+        # Shard workers infer every frame of their range; sampling is only done by the single-process pipeline
+        if self.num_shards > 1 and self.sampling_mode != "every_frame":
+            raise ValueError("sampling_mode other than 'every_frame' requires num_shards=1")
+        return self
+
+
+class BatchTrackingRequest(TrackingRequest):
+    """Settings shared by every video of a /tracking/start-batch call"""
+    video_filename: Optional[str] = None  # Unused: one task is queued per entry of video_filenames
+    video_filenames: List[str] = Field(min_length=1, max_length=500)
 
 
 class ProcessingProgress(BaseModel):
     current_frame: int
     total_frames: int
     percentage: float
-    status: Literal["processing", "completed", "error", "stopped"]
+    status: Literal["queued", "processing", "completed", "error", "stopped", "cancelled"]
     device: Optional[str] = None
     error: Optional[str] = None
+    queue_position: Optional[int] = None  # 0-based place in the device queue while queued
+    resumable: Optional[bool] = None  # A checkpoint exists; POST /tracking/resume/{task_id} continues it
+    pipeline: Optional[dict] = None  # Per-stage items / busy time / queue depth
+    shards: Optional[List[dict]] = None  # Per-shard frame range and progress (sharded mode)
 
 
 # Video Models
@@ -187,18 +225,32 @@ class AnalysisOptions(BaseModel):
 
 
 class HeatmapRequest(BaseModel):
-    tracking_data: TrackingData
+    tracking_data: Optional[TrackingData] = None
+    dataset_id: Optional[str] = None  # From POST /analysis/datasets; replaces tracking_data
     settings: HeatmapSettings
     options: AnalysisOptions = Field(default_factory=AnalysisOptions)
     video_frame_base64: Optional[str] = None  # Base64 encoded frame for overlay
 
+    @model_validator(mode="after")
+    def _check_data_source(self) -> "HeatmapRequest":
+        if self.tracking_data is None and not self.dataset_id:
+            raise ValueError("tracking_data or dataset_id is required")
+        return self
+
 
 class OpenFieldAnalysisRequest(BaseModel):
-    tracking_data: TrackingData
+    tracking_data: Optional[TrackingData] = None
+    dataset_id: Optional[str] = None  # From POST /analysis/datasets; replaces tracking_data
     arena_center_x: float
     arena_center_y: float
     arena_radius: float
 
+    @model_validator(mode="after")
+    def _check_data_source(self) -> "OpenFieldAnalysisRequest":
+        if self.tracking_data is None and not self.dataset_id:
+            raise ValueError("tracking_data or dataset_id is required")
+        return self
+
 
 class VideoExportRequest(BaseModel):
     video_filename: str
@@ -220,6 +272,24 @@ class YOLOTestResult(BaseModel):
     speedup: float
 
 
+class InferenceBenchmarkRequest(BaseModel):
+    model_name: str
+    backends: List[Literal["pytorch", "onnx", "openvino", "onnx_int8"]] = Field(default_factory=lambda: ["pytorch", "onnx", "openvino", "onnx_int8"])
+    inference_size: int = Field(default=640, ge=320, le=1280)
+    runs: int = Field(default=20, ge=1, le=500)  # Timed predictions per backend
+    video_filename: Optional[str] = None  # Benchmark on this video's first frame instead of a blank image
+
+
+class QuantizeRequest(BaseModel):
+    model_name: str
+    calibration_video: str  # Frames sampled from this video calibrate the INT8 activation ranges
+    evaluation_video: Optional[str] = None  # Held-out clip for the report (default: last 20% of calibration_video)
+    inference_size: int = Field(default=640, ge=320, le=1280)
+    calibration_frames: int = Field(default=100, ge=1, le=1000)
+    evaluation_frames: int = Field(default=300, ge=1, le=10000)
+    confidence_threshold: float = Field(default=0.5, ge=0.0, le=1.0)
+
+
 # --- Experiment Recording (live) ---
 
 class TriggerMatch(BaseModel):
@@ -285,6 +355,9 @@ class ExperimentStartRequest(BaseModel):
     confidence_threshold: float = Field(default=0.5, ge=0.0, le=1.0)
     iou_threshold: float = Field(default=0.5, ge=0.0, le=1.0)
     inference_size: int = Field(default=640, ge=320, le=1280)
+    roi_crop: bool = False  # Run YOLO only on the bounding box of the ROIs
+    roi_crop_padding: int = Field(default=32, ge=0, le=512)
+    inference_backend: Literal["pytorch", "onnx", "openvino", "onnx_int8"] = "pytorch"  # CPU runtime, see TrackingRequest
     fps_target: Optional[float] = None  # None = use camera-native FPS
     max_consecutive_drops: int = 30
     triggers: List[TriggerRule] = Field(default_factory=list)
@@ -0,0 +1,231 @@
+"""Background estimation for the template-matching fallback.
+
+The background is the per-pixel median of grayscale frames sampled evenly
+from the middle half of the video. Seeking to every sample with
+``cap.set(CAP_PROP_POS_FRAMES)`` makes long-GOP files decode from the
+previous keyframe each time; instead `estimate_background` seeks once to the
+first sample and walks forward, using ``grab()`` for frames in between and
+decoding (``retrieve()``) only the sampled ones.
+
+Sampled frames go straight into a preallocated uint8 stack and the median is
+taken over row tiles (`tiled_median`), so the temporary memory beyond the
+stack itself is bounded by ``memory_limit`` instead of being a float32 copy
+of every frame (~800 MB for 100 frames at 1080p).
+
+`cached_background` stores the result in ``temp/background_cache`` keyed by
+a fingerprint of the video content plus the sampling parameters, so repeated
+runs on the same video (re-uploads included) load it instead of decoding.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Iterable, Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger("pymice.background")
+
+BACKGROUND_CACHE_DIR = "temp/background_cache"
+BACKGROUND_CACHE_MAX_FILES = 64
+DEFAULT_SAMPLE_FRAMES = 100
+MEDIAN_MEMORY_LIMIT = 32 * 1024 * 1024  # bytes of scratch memory per median tile
+SAMPLE_START = 0.25  # sample from 25% ...
+SAMPLE_END = 0.75  # ... to 75% of the video
+
+_FINGERPRINT_CHUNK = 1024 * 1024
+
+
+def sample_indices(total_frames: int, sample_frames: int = DEFAULT_SAMPLE_FRAMES) -> np.ndarray:
+    """Frame indices sampled from the middle half of the video (may repeat for short videos)."""
+    return np.linspace(int(total_frames * SAMPLE_START), int(total_frames * SAMPLE_END), sample_frames, dtype=int)
+
+
+def _frame_count(cap: cv2.VideoCapture) -> int:
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if total_frames <= 0:
+        # Fallback for videos where frame count is not reported
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 1e9)
+        total_frames = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    return total_frames
+
+
+def read_frames_at(cap: cv2.VideoCapture, indices: Iterable[int]) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Yield (index, BGR frame) for ascending frame indices in one sequential pass.
+
+    Seeks once to the first index, then grab()s the frames in between and
+    decodes only the requested ones. A repeated index yields the same frame
+    again; frames that fail to decode are skipped and reading stops at the end
+    of the stream.
+    """
+    position = None
+    last_index, last_frame = None, None
+    for idx in indices:
+        idx = int(idx)
+        if idx == last_index:
+            if last_frame is not None:
+                yield idx, last_frame
+            continue
+        if position is None:
+            position = idx
+            if idx > 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+        while position < idx and cap.grab():
+            position += 1
+        if position < idx or not cap.grab():
+            return
+        position += 1
+        ret, frame = cap.retrieve()
+        last_index, last_frame = idx, frame if ret else None
+        if ret:
+            yield idx, frame
+
+
+def tiled_median(stack: np.ndarray, memory_limit: int = MEDIAN_MEMORY_LIMIT) -> np.ndarray:
+    """
+    Per-pixel median over axis 0 of a uint8 (n, h, w) stack, computed in row tiles.
+
+    Equals ``np.median(stack.astype(np.float32), axis=0).astype(np.uint8)``:
+    for an even n the two middle values are averaged and truncated.
+
+    Args:
+        stack: Frames to take the median of
+        memory_limit: Scratch bytes allowed per tile (sets the tile height)
+
+    Returns:
+        Median frame (uint8)
+    """
+    n, height = stack.shape[:2]
+    row_bytes = stack[0, 0].size * (n + 2)  # partitioned copy + uint16 sum
+    tile_rows = max(1, min(height, memory_limit // max(1, row_bytes)))
+    upper = n // 2
+    kth = [upper - 1, upper] if n % 2 == 0 else [upper]
+
+    median = np.empty(stack.shape[1:], dtype=np.uint8)
+    for top in range(0, height, tile_rows):
+        tile = np.partition(stack[:, top:top + tile_rows], kth, axis=0)
+        if n % 2:
+            median[top:top + tile_rows] = tile[upper]
+        else:
+            pair = tile[upper - 1].astype(np.uint16)
+            pair += tile[upper]
+            median[top:top + tile_rows] = pair >> 1
+    return median
+
+
+def estimate_background(video_path: str, sample_frames: int = DEFAULT_SAMPLE_FRAMES,
+                        memory_limit: int = MEDIAN_MEMORY_LIMIT) -> Optional[np.ndarray]:
+    """
+    Median background of the middle section, read in one sequential pass.
+
+    Args:
+        video_path: Path to video file
+        sample_frames: Number of frames to sample
+        memory_limit: Scratch bytes allowed per median tile (see `tiled_median`)
+
+    Returns:
+        Grayscale background frame (uint8) or None if failed
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return None
+
+    try:
+        total_frames = _frame_count(cap)
+        if total_frames <= 0:
+            return None
+
+        indices = sample_indices(total_frames, sample_frames)
+        logger.info("estimating background of %s from %d frames", os.path.basename(video_path), len(indices))
+
+        stack: Optional[np.ndarray] = None
+        count = 0
+        for _, frame in read_frames_at(cap, indices):
+            if stack is None:
+                stack = np.empty((len(indices), *frame.shape[:2]), dtype=np.uint8)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=stack[count])
+            count += 1
+    finally:
+        cap.release()
+
+    if not count:
+        return None
+    return tiled_median(stack[:count], memory_limit)
+
+
+def video_fingerprint(video_path: str) -> str:
+    """Content hash of a video: its size plus the first, middle and last MiB."""
+    size = os.path.getsize(video_path)
+    digest = hashlib.sha256(str(size).encode("utf-8"))
+    with open(video_path, "rb") as f:
+        for offset in sorted({0, max(0, size // 2 - _FINGERPRINT_CHUNK // 2), max(0, size - _FINGERPRINT_CHUNK)}):
+            f.seek(offset)
+            digest.update(f.read(_FINGERPRINT_CHUNK))
+    return digest.hexdigest()
+
+
+def background_cache_path(video_path: str, sample_frames: int = DEFAULT_SAMPLE_FRAMES,
+                          cache_dir: str = BACKGROUND_CACHE_DIR) -> str:
+    params = f"median-gray:{sample_frames}:{SAMPLE_START}:{SAMPLE_END}"
+    key = hashlib.sha256(f"{video_fingerprint(video_path)}|{params}".encode("utf-8")).hexdigest()[:32]
+    return os.path.join(cache_dir, f"{key}.npy")
+
+
+def _prune_cache(cache_dir: str, max_files: int) -> None:
+    # Only finished entries: other writers' in-progress files end in ".tmp"
+    entries = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith(".npy")]
+    if len(entries) <= max_files:
+        return
+    entries.sort(key=os.path.getmtime)
+    for path in entries[:len(entries) - max_files]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def cached_background(video_path: str, sample_frames: int = DEFAULT_SAMPLE_FRAMES,
+                      cache_dir: str = BACKGROUND_CACHE_DIR,
+                      max_files: int = BACKGROUND_CACHE_MAX_FILES,
+                      memory_limit: int = MEDIAN_MEMORY_LIMIT) -> Optional[np.ndarray]:
+    """estimate_background, served from the on-disk cache when this video was seen before."""
+    path = background_cache_path(video_path, sample_frames, cache_dir)
+    if os.path.exists(path):
+        try:
+            background = np.load(path, allow_pickle=False)
+            os.utime(path)  # most recently used survives pruning
+            logger.info("background cache hit for %s", os.path.basename(video_path))
+            return background
+        except (OSError, ValueError):
+            pass
+
+    background = estimate_background(video_path, sample_frames, memory_limit)
+    if background is not None:
+        _store_background(background, path, cache_dir, max_files)
+    return background
+
+
+def _store_background(background: np.ndarray, path: str, cache_dir: str, max_files: int) -> None:
+    """Write a cache entry; a failed write only costs the next run a cache miss."""
+    tmp_path = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Unique per writer: two tasks on the same video may miss the cache at once
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=os.path.basename(path) + ".", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, background)
+        os.replace(tmp_path, path)
+        tmp_path = None
+        _prune_cache(cache_dir, max_files)
+    except OSError as e:
+        logger.warning("could not cache background %s: %s", path, e)
+    finally:
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
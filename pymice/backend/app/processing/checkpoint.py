@@ -0,0 +1,160 @@
+"""Checkpoints for resumable offline tracking.
+
+While a task runs, its frames are already on disk (``<task>_frames.jsonl``,
+see app.processing.results_writer). A checkpoint records how far that file is
+valid so a crashed, stopped or interrupted task can continue instead of
+re-processing the whole video:
+
+- ``<task>_checkpoint.json``: next frame to process, number of frames and
+  byte offset of the JSONL written so far, detection counters, the frame
+  sampler state, the original TrackingRequest and a hash of everything that
+  affects results.
+- ``<task>_background.npy``: the background frame, so resuming does not
+  recompute it.
+
+The checkpoint is written atomically after the JSONL has been flushed, so
+the offset never points past data that is actually on disk. Resuming
+truncates the JSONL back to that offset.
+"""
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+CHECKPOINT_EVERY_FRAMES = 1000
+CHECKPOINT_EVERY_SEC = 30.0
+
+# TrackingRequest fields that change per-frame results (batch size, priority,
+# preview rate, ... do not, so they may differ on resume)
+RESULT_FIELDS = (
+    "video_filename", "model_name", "rois", "confidence_threshold",
+    "iou_threshold", "inference_size", "sam_prompt",
+    "sampling_mode", "sampling_stride", "sampling_max_stride", "roi_crop", "roi_crop_padding",
+    "motion_gate", "motion_gate_threshold",
+    "tracking_mode", "search_window_size", "search_window_min_confidence",
+    "inference_backend",
+)
+
+
+def checkpoint_path_for(tracking_dir: str, task_id: str) -> str:
+    return os.path.join(tracking_dir, f"{task_id}_checkpoint.json")
+
+
+def background_path_for(tracking_dir: str, task_id: str) -> str:
+    return os.path.join(tracking_dir, f"{task_id}_background.npy")
+
+
+def _file_signature(path: str) -> List[int]:
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def tracking_config_hash(request_data: Dict[str, Any], video_path: str, model_path: str) -> str:
+    """Hash of the result-affecting request fields plus the video and model files on disk."""
+    payload = {
+        "request": {k: request_data.get(k) for k in RESULT_FIELDS},
+        "video": _file_signature(video_path),
+        "model": _file_signature(model_path),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class TrackingCheckpoint:
+    task_id: str
+    config_hash: str
+    request: Dict[str, Any]
+    total_frames: int
+    next_frame: int = 0
+    frames_written: int = 0
+    frames_offset: int = 0  # bytes of <task>_frames.jsonl covered by this checkpoint
+    counters: Dict[str, int] = field(default_factory=dict)
+    background_path: Optional[str] = None
+    sampling: Dict[str, Any] = field(default_factory=dict)  # FrameSampler.state() at next_frame
+    updated_at: float = 0.0
+
+
+def save_checkpoint(path: str, checkpoint: TrackingCheckpoint) -> None:
+    checkpoint.updated_at = time.time()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(asdict(checkpoint), f)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path: str) -> Optional[TrackingCheckpoint]:
+    """The checkpoint at path, or None if there is none (or it is unreadable)."""
+    try:
+        with open(path, "r") as f:
+            return TrackingCheckpoint(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def save_background(path: str, background_frame: Optional[np.ndarray]) -> Optional[str]:
+    if background_frame is None:
+        return None
+    tmp_path = path + ".tmp.npy"
+    np.save(tmp_path, background_frame)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_background(path: Optional[str]) -> Optional[np.ndarray]:
+    if not path or not os.path.exists(path):
+        return None
+    return np.load(path, allow_pickle=False)
+
+
+def remove_checkpoint(tracking_dir: str, task_id: str) -> None:
+    for path in (checkpoint_path_for(tracking_dir, task_id), background_path_for(tracking_dir, task_id)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def list_checkpoints(tracking_dir: str) -> List[TrackingCheckpoint]:
+    if not os.path.isdir(tracking_dir):
+        return []
+    checkpoints = []
+    for name in os.listdir(tracking_dir):
+        if name.endswith("_checkpoint.json"):
+            checkpoint = load_checkpoint(os.path.join(tracking_dir, name))
+            if checkpoint is not None:
+                checkpoints.append(checkpoint)
+    return checkpoints
+
+
+def resumable_task_files(tracking_dir: str, videos_dir: str) -> Set[str]:
+    """Files a pending checkpoint still needs: its own files, the partial JSONL and the video."""
+    keep = set()
+    for checkpoint in list_checkpoints(tracking_dir):
+        keep.add(os.path.abspath(checkpoint_path_for(tracking_dir, checkpoint.task_id)))
+        keep.add(os.path.abspath(background_path_for(tracking_dir, checkpoint.task_id)))
+        keep.add(os.path.abspath(os.path.join(tracking_dir, f"{checkpoint.task_id}_frames.jsonl")))
+        video = checkpoint.request.get("video_filename")
+        if video:
+            keep.add(os.path.abspath(os.path.join(videos_dir, video)))
+    return keep
+
+
+class CheckpointPolicy:
+    """Decides when the running task should write its next checkpoint."""
+
+    def __init__(self, every_frames: int = CHECKPOINT_EVERY_FRAMES, every_sec: float = CHECKPOINT_EVERY_SEC):
+        self._every_frames = every_frames
+        self._every_sec = every_sec
+        self._last_frame = 0
+        self._last_time = time.monotonic()
+
+    def due(self, frames_done: int) -> bool:
+        if (frames_done - self._last_frame >= self._every_frames
+                or time.monotonic() - self._last_time >= self._every_sec):
+            self._last_frame = frames_done
+            self._last_time = time.monotonic()
+            return True
+        return False
@@ -0,0 +1,126 @@
+"""Memory-mapped column store of tracking results (``<task_id>_results.columns/``).
+
+Registering results for analysis (JSON or columnar .npz) decodes the whole
+file into fresh arrays, so every dataset in the analysis cache is a private
+in-RAM copy. The column store is a directory of plain ``.npy`` files that
+`open_column_store` maps with ``np.load(mmap_mode="r")`` instead: nothing is
+read until a plot touches it, the pages live in the OS page cache (shared by
+every request and process using the same results, and dropped under memory
+pressure), and analysis over many or huge sessions is bounded by disk rather
+than RAM.
+
+- One fixed-width ``.npy`` per ingest column (see app.processing.ingest):
+  ``frame_number`` (int64), ``x`` / ``y`` / ``t`` (float64), ``roi_index``
+  (int16) and ``method`` (int8), holding only the frames with a centroid, so
+  the arrays are exactly the analysis dataset and need no filtering copy.
+- ``header.json``: the document without ``tracking_data`` plus a
+  ``column_store`` entry with the format version, the dataset id (content hash,
+  as `columns_id`) and the frame counts.
+
+`ColumnStoreBuilder` converts frames in chunks as they stream by, so it can
+be fed by the results writer's finalize pass.
+"""
+
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app.processing.columnar import Columns
+from app.processing.ingest import COLUMNS, DEFAULT_CHUNK_FRAMES, columns_id, concat_columns, frames_to_columns
+
+STORE_VERSION = 1
+HEADER_FILE = "header.json"
+STORE_KEY = "column_store"
+
+
+class ColumnStoreBuilder:
+    """Accumulates frame dicts into ingest columns, chunk_frames at a time."""
+
+    def __init__(self, chunk_frames: int = DEFAULT_CHUNK_FRAMES):
+        self.chunk_frames = chunk_frames
+        self._pending: List[Dict[str, Any]] = []
+        self._chunks: List[Columns] = []
+        self._done = 0
+
+    def __len__(self) -> int:
+        return self._done + len(self._pending)
+
+    def append(self, frame: Dict[str, Any]) -> None:
+        self._pending.append(frame)
+        if len(self._pending) >= self.chunk_frames:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._pending:
+            self._chunks.append(frames_to_columns(self._pending, offset=self._done))
+            self._done += len(self._pending)
+            self._pending = []
+
+    def columns(self) -> Columns:
+        self._flush()
+        return concat_columns(self._chunks)
+
+    def save(self, path: str, header: Dict[str, Any]) -> str:
+        return save_column_store(path, header, self.columns())
+
+
+def save_column_store(path: str, header: Dict[str, Any], columns: Columns) -> str:
+    """
+    Write the store directory for validated ingest columns (all frames; those
+    without a centroid are left out). Built in a temporary directory and
+    renamed, so a reader never sees half of it.
+    """
+    valid = ~np.isnan(columns["x"])
+    kept = {name: np.ascontiguousarray(columns[name][valid]) for name in COLUMNS}
+    meta = {
+        **{k: v for k, v in header.items() if k not in ("tracking_data", "columnar", STORE_KEY)},
+        STORE_KEY: {
+            "version": STORE_VERSION,
+            "dataset_id": columns_id(kept),
+            "total_frames": int(len(valid)),
+            "valid_frames": int(valid.sum()),
+        },
+    }
+
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name in COLUMNS:
+        np.save(os.path.join(tmp_path, f"{name}.npy"), kept[name])
+    with open(os.path.join(tmp_path, HEADER_FILE), "w") as f:
+        json.dump(meta, f)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def is_column_store(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, HEADER_FILE))
+
+
+def store_mtime(path: str) -> float:
+    """When the store was written (its header is the last file before the rename)."""
+    return os.path.getmtime(os.path.join(path, HEADER_FILE))
+
+
+def open_column_store(path: str, mmap: bool = True) -> Tuple[Dict[str, Any], Columns]:
+    """
+    (header, columns) of a store; the columns are read-only memory maps
+    (mmap=False reads them into memory instead).
+    """
+    with open(os.path.join(path, HEADER_FILE)) as f:
+        header = json.load(f)
+    meta = header.get(STORE_KEY) or {}
+    if meta.get("version") != STORE_VERSION:
+        raise ValueError(f"Unsupported column store version: {meta.get('version')!r}")
+    columns = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+        for name in COLUMNS
+    }
+    for name, column in columns.items():
+        if column.ndim != 1 or len(column) != meta["valid_frames"]:
+            raise ValueError(f"{name}: {len(column)} values for {meta['valid_frames']} frames")
+    return header, columns
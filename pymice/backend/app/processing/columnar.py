@@ -0,0 +1,228 @@
+"""Columnar binary results format (``<task_id>_results.npz``).
+
+The JSON results document repeats every key for every frame and is pretty
+printed, so long runs produce hundreds of MB that take seconds to parse. The
+columnar file stores the same content as one array per field, compressed with
+``np.savez_compressed``:
+
+- ``__header__``: UTF-8 JSON of the document without ``tracking_data``
+  (video_info, statistics, rois, ...) plus a ``columnar`` entry with the
+  format version and the code tables below.
+- Scalar columns, one value per frame: ``frame_number`` (int64),
+  ``timestamp_sec`` (float64), ``centroid_x``/``centroid_y``/``confidence``
+  (float32, NaN = null), ``roi_index`` (int16, -1 = null), ``roi`` and
+  ``detection_method`` (int16 codes into ``roi_labels`` / ``detection_methods``,
+  -1 = null), ``bbox`` (float32 N x 4, NaN = null).
+- Ragged columns: ``mask_points`` (float32 M x 2) with ``mask_offsets``
+  (int64 N + 1) and ``has_mask`` (bool); likewise ``keypoints_values``
+  (float32 K x 3: x, y, conf) with ``keypoints_offsets`` / ``has_keypoints``.
+- ``gated`` (bool): the result was reused by the motion gate. Files written
+  before the gate existed have no such column; it reads as all False.
+
+`ColumnarBuilder` accumulates frames in typed ``array.array`` buffers, so it
+can be fed from a stream without holding the frame dicts.
+"""
+
+import json
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+COLUMNAR_VERSION = 1
+HEADER_KEY = "__header__"
+NAN = float("nan")
+
+Columns = Dict[str, np.ndarray]
+
+
+class ColumnarBuilder:
+    """Accumulates per-frame dicts into column buffers."""
+
+    def __init__(self):
+        self.frame_number = array("q")
+        self.timestamp_sec = array("d")
+        self.centroid_x = array("f")
+        self.centroid_y = array("f")
+        self.confidence = array("f")
+        self.roi_index = array("h")
+        self.roi = array("h")
+        self.detection_method = array("h")
+        self.bbox = array("f")
+        self.has_mask = array("b")
+        self.mask_points = array("f")
+        self.mask_offsets = array("q", [0])
+        self.has_keypoints = array("b")
+        self.keypoints_values = array("f")
+        self.keypoints_offsets = array("q", [0])
+        self.gated = array("b")
+        self._roi_codes: Dict[str, int] = {}
+        self._method_codes: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.frame_number)
+
+    @staticmethod
+    def _code(table: Dict[str, int], value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        if value not in table:
+            table[value] = len(table)
+        return table[value]
+
+    @staticmethod
+    def _float(value) -> float:
+        return NAN if value is None else float(value)
+
+    def append(self, frame: Dict[str, Any]) -> None:
+        self.frame_number.append(int(frame["frame_number"]))
+        self.timestamp_sec.append(self._float(frame.get("timestamp_sec")))
+        self.centroid_x.append(self._float(frame.get("centroid_x")))
+        self.centroid_y.append(self._float(frame.get("centroid_y")))
+        self.confidence.append(self._float(frame.get("confidence")))
+        roi_index = frame.get("roi_index")
+        self.roi_index.append(-1 if roi_index is None else int(roi_index))
+        self.roi.append(self._code(self._roi_codes, frame.get("roi")))
+        self.detection_method.append(self._code(self._method_codes, frame.get("detection_method")))
+
+        bbox = frame.get("bbox")
+        self.bbox.extend([NAN] * 4 if not bbox else [float(v) for v in bbox[:4]])
+
+        mask = frame.get("mask")
+        self.has_mask.append(mask is not None)
+        for point in mask or ():
+            self.mask_points.extend((float(point[0]), float(point[1])))
+        self.mask_offsets.append(len(self.mask_points) // 2)
+
+        keypoints = frame.get("keypoints")
+        self.has_keypoints.append(keypoints is not None)
+        for kpt in keypoints or ():
+            self.keypoints_values.extend((float(kpt["x"]), float(kpt["y"]), float(kpt["conf"])))
+        self.keypoints_offsets.append(len(self.keypoints_values) // 3)
+
+        self.gated.append(bool(frame.get("gated")))
+
+    def columns(self) -> Columns:
+        n = len(self)
+        as_np = lambda buf, dtype: np.frombuffer(buf, dtype=dtype).copy() if len(buf) else np.zeros(0, dtype)
+        return {
+            "frame_number": as_np(self.frame_number, np.int64),
+            "timestamp_sec": as_np(self.timestamp_sec, np.float64),
+            "centroid_x": as_np(self.centroid_x, np.float32),
+            "centroid_y": as_np(self.centroid_y, np.float32),
+            "confidence": as_np(self.confidence, np.float32),
+            "roi_index": as_np(self.roi_index, np.int16),
+            "roi": as_np(self.roi, np.int16),
+            "detection_method": as_np(self.detection_method, np.int16),
+            "bbox": as_np(self.bbox, np.float32).reshape(n, 4),
+            "has_mask": as_np(self.has_mask, np.int8).astype(bool),
+            "mask_points": as_np(self.mask_points, np.float32).reshape(-1, 2),
+            "mask_offsets": as_np(self.mask_offsets, np.int64),
+            "has_keypoints": as_np(self.has_keypoints, np.int8).astype(bool),
+            "keypoints_values": as_np(self.keypoints_values, np.float32).reshape(-1, 3),
+            "keypoints_offsets": as_np(self.keypoints_offsets, np.int64),
+            "gated": as_np(self.gated, np.int8).astype(bool),
+        }
+
+    def code_tables(self) -> Dict[str, List[str]]:
+        by_code = lambda table: [name for name, _ in sorted(table.items(), key=lambda kv: kv[1])]
+        return {
+            "roi_labels": by_code(self._roi_codes),
+            "detection_methods": by_code(self._method_codes),
+        }
+
+    def save(self, path: str, header: Dict[str, Any]) -> str:
+        """Write header + columns to path (a .npz file). Returns path."""
+        full_header = {
+            **header,
+            "columnar": {"version": COLUMNAR_VERSION, "frames": len(self), **self.code_tables()},
+        }
+        header_bytes = np.frombuffer(json.dumps(full_header).encode("utf-8"), dtype=np.uint8)
+        with open(path, "wb") as f:
+            np.savez_compressed(f, **{HEADER_KEY: header_bytes}, **self.columns())
+        return path
+
+
+def build_columnar(frames: Iterable[Dict[str, Any]]) -> ColumnarBuilder:
+    builder = ColumnarBuilder()
+    for frame in frames:
+        builder.append(frame)
+    return builder
+
+
+def load_columnar(path_or_file) -> Tuple[Dict[str, Any], Columns]:
+    """Read a columnar results file. Returns (header, columns)."""
+    with np.load(path_or_file, allow_pickle=False) as npz:
+        if HEADER_KEY not in npz.files:
+            raise ValueError("Not a columnar tracking results file (missing header)")
+        header = json.loads(npz[HEADER_KEY].tobytes().decode("utf-8"))
+        columns = {name: npz[name] for name in npz.files if name != HEADER_KEY}
+    version = header.get("columnar", {}).get("version")
+    if version != COLUMNAR_VERSION:
+        raise ValueError(f"Unsupported columnar results version: {version}")
+    return header, columns
+
+
+def load_columnar_header(path_or_file) -> Dict[str, Any]:
+    """Only the header of a columnar results file (the columns are not decompressed)."""
+    with np.load(path_or_file, allow_pickle=False) as npz:
+        if HEADER_KEY not in npz.files:
+            raise ValueError("Not a columnar tracking results file (missing header)")
+        return json.loads(npz[HEADER_KEY].tobytes().decode("utf-8"))
+
+
+def columns_to_frames(header: Dict[str, Any], columns: Columns) -> List[Dict[str, Any]]:
+    """Rebuild the per-frame dicts of the JSON document from the columns."""
+    tables = header["columnar"]
+    roi_labels = tables["roi_labels"]
+    methods = tables["detection_methods"]
+
+    cx = columns["centroid_x"].tolist()
+    cy = columns["centroid_y"].tolist()
+    conf = columns["confidence"].tolist()
+    roi_index = columns["roi_index"].tolist()
+    roi = columns["roi"].tolist()
+    method = columns["detection_method"].tolist()
+    ts = columns["timestamp_sec"].tolist()
+    bbox = columns["bbox"]
+    has_bbox = ~np.isnan(bbox).any(axis=1)
+    has_mask = columns["has_mask"]
+    mask_points = columns["mask_points"].tolist()
+    mask_offsets = columns["mask_offsets"]
+    has_kpts = columns["has_keypoints"]
+    kpt_values = columns["keypoints_values"].tolist()
+    kpt_offsets = columns["keypoints_offsets"]
+    gated = columns.get("gated")
+
+    frames = []
+    for i, frame_number in enumerate(columns["frame_number"].tolist()):
+        frame = {
+            "frame_number": frame_number,
+            "centroid_x": None if cx[i] != cx[i] else cx[i],
+            "centroid_y": None if cy[i] != cy[i] else cy[i],
+            "roi": roi_labels[roi[i]] if roi[i] >= 0 else None,
+            "roi_index": roi_index[i] if roi_index[i] >= 0 else None,
+            "detection_method": methods[method[i]] if method[i] >= 0 else None,
+            "timestamp_sec": None if ts[i] != ts[i] else ts[i],
+        }
+        if conf[i] == conf[i]:
+            frame["confidence"] = conf[i]
+        if has_bbox[i]:
+            frame["bbox"] = bbox[i].tolist()
+        if has_mask[i]:
+            frame["mask"] = mask_points[mask_offsets[i]:mask_offsets[i + 1]]
+        if has_kpts[i]:
+            frame["keypoints"] = [
+                {"x": x, "y": y, "conf": c} for x, y, c in kpt_values[kpt_offsets[i]:kpt_offsets[i + 1]]
+            ]
+        if gated is not None and gated[i]:
+            frame["gated"] = True
+        frames.append(frame)
+    return frames
+
+
+def columnar_to_document(header: Dict[str, Any], columns: Columns) -> Dict[str, Any]:
+    """The JSON results document (header keys + tracking_data) for a columnar file."""
+    document = {k: v for k, v in header.items() if k != "columnar"}
+    document["tracking_data"] = columns_to_frames(header, columns)
+    return document
@@ -2,7 +2,7 @@
 
 import cv2
 import numpy as np
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
 Point = Tuple[int, int]
 
@@ -17,7 +17,7 @@ def calculate_centroid(mask: np.ndarray) -> Optional[Point]:
     Returns:
         Tuple of (center_x, center_y) or None if mask is empty
     """
-    moments = cv2.moments(mask.astype(np.uint8))
+    moments = cv2.moments(mask if mask.dtype == np.uint8 else mask.astype(np.uint8))
 
     if moments["m00"] > 0:
         center_x = int(moments["m10"] / moments["m00"])
@@ -27,6 +27,95 @@ def calculate_centroid(mask: np.ndarray) -> Optional[Point]:
     return None
 
 
+class TemplateMatcher:
+    """
+    Background-subtraction detector built once per task.
+
+    The masked background, the ROI mask and the morphology kernel never change
+    within a task, so they are prepared here once; the grayscale, difference,
+    threshold and morphology images are written into buffers that are reused
+    for every frame of the same size. The largest blob is rasterised only
+    inside its bounding box to compute the centroid.
+
+    Results are identical to template_matching. Not thread-safe: use one
+    instance per task.
+    """
+
+    def __init__(
+        self,
+        background_frame: np.ndarray,
+        roi_mask: Optional[np.ndarray] = None,
+        threshold: int = 25,
+    ):
+        """
+        Args:
+            background_frame: Background reference frame (grayscale)
+            roi_mask: Optional ROI mask to limit detection area
+            threshold: Threshold for difference detection (default: 25)
+        """
+        self._threshold = threshold
+        self._kernel = np.ones((3, 3), np.uint8)
+        # 255 inside the ROIs: AND-ing the difference with it equals masking both images first
+        self._roi_mask = None if roi_mask is None else np.where(roi_mask > 0, 255, 0).astype(np.uint8)
+        if self._roi_mask is not None:
+            self._background = cv2.bitwise_and(background_frame, background_frame, mask=roi_mask)
+        else:
+            self._background = background_frame
+        self._shape: Optional[tuple] = None
+
+    def _buffers(self, shape: tuple) -> None:
+        if shape != self._shape:
+            self._shape = shape
+            self._gray = np.empty(shape, np.uint8)
+            self._diff = np.empty(shape, np.uint8)
+            self._binary = np.empty(shape, np.uint8)
+            self._opened = np.empty(shape, np.uint8)
+            self._closed = np.empty(shape, np.uint8)
+            self._blob = np.empty(shape, np.uint8)
+
+    def match(self, frame: np.ndarray) -> Optional[Point]:
+        """
+        Detect the animal in one frame (BGR).
+
+        Returns:
+            Tuple of (center_x, center_y) or None if no detection
+        """
+        self._buffers(frame.shape[:2])
+        if frame.ndim == 3:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        else:
+            gray = frame
+
+        diff = cv2.absdiff(gray, self._background, dst=self._diff)
+        if self._roi_mask is not None:
+            cv2.bitwise_and(diff, self._roi_mask, dst=diff)
+
+        cv2.threshold(diff, self._threshold, 255, cv2.THRESH_BINARY, dst=self._binary)
+        # Remove small noise, then fill small holes
+        cv2.morphologyEx(self._binary, cv2.MORPH_OPEN, self._kernel, dst=self._opened, iterations=2)
+        cv2.morphologyEx(self._opened, cv2.MORPH_CLOSE, self._kernel, dst=self._closed, iterations=2)
+
+        contours, _ = cv2.findContours(self._closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return None
+
+        # Largest contour (assumed to be the animal), filled within its bounding box only
+        largest_contour = max(contours, key=cv2.contourArea)
+        x, y, w, h = cv2.boundingRect(largest_contour)
+        blob = self._blob[:h, :w]
+        blob.fill(0)
+        cv2.drawContours(blob, [largest_contour], -1, 255, -1, offset=(-x, -y))
+
+        moments = cv2.moments(blob)
+        if moments["m00"] > 0:
+            return (int(moments["m10"] / moments["m00"] + x), int(moments["m01"] / moments["m00"] + y))
+        return None
+
+    def match_batch(self, frames: List[np.ndarray]) -> List[Optional[Point]]:
+        """match() for every frame, in order."""
+        return [self.match(frame) for frame in frames]
+
+
 def template_matching(
     current_frame: np.ndarray,
     background_frame: np.ndarray,
@@ -36,6 +125,9 @@ def template_matching(
     """
     Detect animal using background subtraction and template matching.
 
+    One-off convenience around TemplateMatcher; tasks that match many frames
+    should build a TemplateMatcher once and reuse it.
+
     Args:
         current_frame: Current video frame (BGR)
         background_frame: Background reference frame (grayscale)
@@ -45,43 +137,4 @@ def template_matching(
     Returns:
         Tuple of (center_x, center_y) or None if no detection
     """
-    # Convert current frame to grayscale
-    gray_frame = cv2.cvtColor(current_frame, cv2.COLOR_BGR2GRAY)
-
-    # Apply ROI mask if provided
-    if roi_mask is not None:
-        gray_frame = cv2.bitwise_and(gray_frame, gray_frame, mask=roi_mask)
-        masked_background = cv2.bitwise_and(background_frame, background_frame, mask=roi_mask)
-    else:
-        masked_background = background_frame
-
-    # Calculate absolute difference
-    diff = cv2.absdiff(gray_frame, masked_background)
-
-    # Apply threshold
-    _, binary = cv2.threshold(diff, threshold, 255, cv2.THRESH_BINARY)
-
-    # Morphological operations to clean up
-    kernel = np.ones((3, 3), np.uint8)
-
-    # Remove small noise
-    opened = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel, iterations=2)
-
-    # Fill small holes
-    closed = cv2.morphologyEx(opened, cv2.MORPH_CLOSE, kernel, iterations=2)
-
-    # Find contours
-    contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-    if not contours:
-        return None
-
-    # Find largest contour (assumed to be the animal)
-    largest_contour = max(contours, key=cv2.contourArea)
-
-    # Create mask from largest contour
-    mask = np.zeros_like(binary)
-    cv2.drawContours(mask, [largest_contour], -1, 255, -1)
-
-    # Calculate centroid
-    return calculate_centroid(mask)
+    return TemplateMatcher(background_frame, roi_mask=roi_mask, threshold=threshold).match(current_frame)
@@ -0,0 +1,173 @@
+"""Byte offset index of the frames in a results JSON document.
+
+Reading a few hundred frames of a long run used to mean downloading (or
+parsing) the whole ``<task_id>_results.json``. The index, written next to it
+as ``<task_id>_results.index.npy``, is an (N, 3) int64 array with one row per
+``tracking_data`` entry: ``frame_number``, start byte, end byte. With it a
+page of frames costs a binary search plus one read of just those bytes:
+
+- `FrameIndexBuilder` collects the rows while the document is written (see
+  app.processing.results_writer).
+- `load_frame_index` memory-maps the saved index, or rebuilds it with one
+  streamed pass for results written before the index existed (and saves it).
+- `read_frames` returns a frame_number range of the document, optionally every
+  ``step``-th frame and only some fields, plus where the next page starts.
+"""
+
+import json
+import logging
+import os
+from array import array
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.processing.json_stream import ResultsStreamReader
+
+logger = logging.getLogger("pymice.frame_index")
+
+FRAME, START, END = 0, 1, 2
+DEFAULT_PAGE_FRAMES = 1000
+MAX_PAGE_FRAMES = 10000
+SLAB_MAX_GAP = 64 * 1024  # read one slab when the selected frames are no further apart than this
+
+
+class FrameIndexBuilder:
+    """Accumulates (frame_number, start, end) rows."""
+
+    def __init__(self):
+        self._rows = array("q")
+
+    def __len__(self) -> int:
+        return len(self._rows) // 3
+
+    def add(self, frame_number: int, start: int, end: int) -> None:
+        self._rows.extend((frame_number, start, end))
+
+    def array(self) -> np.ndarray:
+        return np.frombuffer(self._rows, dtype=np.int64).reshape(-1, 3).copy()
+
+    def save(self, path: str) -> str:
+        return save_frame_index(self.array(), path)
+
+
+def save_frame_index(index: np.ndarray, path: str) -> str:
+    """Write the index as .npy (via a temporary file, so readers never see half of it)."""
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, np.asarray(index, dtype=np.int64))
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def build_frame_index(results_path: str) -> np.ndarray:
+    """Index a results document with one streamed pass (frames are decoded, not kept)."""
+    builder = FrameIndexBuilder()
+    with open(results_path, "rb") as f:
+        reader = ResultsStreamReader(f)
+        for frame, start, end in reader.iter_frame_spans():
+            builder.add(frame["frame_number"], start, end)
+        reader.read_trailer()
+    # Offsets are counted in characters; they are byte offsets only for ASCII text
+    if reader.chars_read != reader.bytes_read:
+        raise ValueError("Results file is not ASCII; frames cannot be indexed by byte offset")
+    return builder.array()
+
+
+def _usable(index: np.ndarray, results_path: str) -> bool:
+    return index.ndim == 2 and index.shape[1] == 3 and (
+        len(index) == 0 or int(index[-1, END]) <= os.path.getsize(results_path))
+
+
+def load_frame_index(results_path: str, index_path: str) -> np.ndarray:
+    """
+    The frame index of results_path: memory-mapped from index_path, or built
+    (and saved there) when it is missing or older than the results file.
+    """
+    if os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(results_path):
+        try:
+            index = np.load(index_path, mmap_mode="r")
+            if _usable(index, results_path):
+                return index
+        except (OSError, ValueError) as e:
+            logger.warning("ignoring unreadable frame index %s: %s", index_path, e)
+    index = build_frame_index(results_path)
+    try:
+        save_frame_index(index, index_path)
+    except OSError as e:
+        logger.warning("could not save frame index %s: %s", index_path, e)
+    return index
+
+
+def _select(index: np.ndarray, start: int, end: Optional[int]) -> np.ndarray:
+    """Rows of index whose frame_number is in [start, end), in document order."""
+    frame_numbers = index[:, FRAME]
+    if len(frame_numbers) < 2 or bool(np.all(frame_numbers[1:] >= frame_numbers[:-1])):
+        lo = int(np.searchsorted(frame_numbers, start, side="left"))
+        hi = len(frame_numbers) if end is None else int(np.searchsorted(frame_numbers, end, side="left"))
+        return np.arange(lo, max(lo, hi))
+    # Unsorted (e.g. a merged file): fall back to a scan
+    keep = frame_numbers >= start
+    if end is not None:
+        keep &= frame_numbers < end
+    return np.flatnonzero(keep)
+
+
+def read_frames(
+    results_path: str,
+    index: np.ndarray,
+    start: int = 0,
+    end: Optional[int] = None,
+    step: int = 1,
+    limit: int = DEFAULT_PAGE_FRAMES,
+    fields: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """
+    One page of frames from a results document.
+
+    Args:
+        results_path: The results JSON document
+        index: Its frame index (see load_frame_index)
+        start: First frame_number (inclusive)
+        end: Last frame_number (exclusive); None = to the end
+        step: Return every step-th frame of the range
+        limit: Maximum frames returned
+        fields: Frame keys to return (frame_number is always included); None = all
+
+    Returns:
+        {"frames", "returned", "matched", "next_start"}; next_start is the
+        frame_number to pass as start for the following page, or None
+    """
+    rows = _select(index, start, end)[::step]
+    page = rows[:limit]
+    next_start = int(index[rows[limit], FRAME]) if len(rows) > limit else None
+
+    keep = None if fields is None else ["frame_number", *[f for f in fields if f != "frame_number"]]
+    frames: List[Dict[str, Any]] = []
+    if len(page):
+        spans = np.asarray(index[page][:, [START, END]])
+        with open(results_path, "rb") as f:
+            gaps = spans[1:, 0] - spans[:-1, 1]
+            if len(gaps) == 0 or int(gaps.max()) <= SLAB_MAX_GAP:
+                base = int(spans[0, 0])
+                f.seek(base)
+                slab = f.read(int(spans[-1, 1]) - base)
+                texts = (slab[s - base:e - base] for s, e in spans.tolist())
+            else:
+                texts = (_read_span(f, s, e) for s, e in spans.tolist())
+            for text in texts:
+                frame = json.loads(text)
+                if keep is not None:
+                    frame = {k: frame[k] for k in keep if k in frame}
+                frames.append(frame)
+
+    return {
+        "frames": frames,
+        "returned": len(frames),
+        "matched": int(len(rows)),
+        "next_start": next_start,
+    }
+
+
+def _read_span(f, start: int, end: int) -> bytes:
+    f.seek(start)
+    return f.read(end - start)
@@ -0,0 +1,275 @@
+"""Fast ingest of tracking results into NumPy columns.
+
+Validating a results document as ``TrackingData`` builds one Pydantic
+``TrackingFrame`` per frame, and every analysis endpoint then walks that list
+in Python to pull out the centroids. This module reads the same document (or
+the columnar ``.npz``, see app.processing.columnar) straight into the columns
+the analysis needs, without per-frame model objects:
+
+- ``frame_number`` (int64), ``x`` / ``y`` / ``t`` (float64, NaN = no
+  centroid), ``roi_index`` (int16, -1 = none) and ``method`` (int8 code into
+  ``METHODS``).
+- Each column is extracted with one list comprehension and converted in a
+  single ``np.array`` call; validation then runs on whole columns, in place of
+  the per-frame checks ``TrackingFrame`` did, and reports the first offending
+  frame.
+- `stream_frames_to_columns` does the same for a frame iterator (see
+  app.processing.json_stream) in chunks of ``DEFAULT_CHUNK_FRAMES``, so the
+  frame dicts of a multi-GB file never exist all at once.
+- `ingest_file` returns `IngestStats` (wall time and, with ``trace_memory``,
+  the tracemalloc peak of the parse + conversion).
+"""
+
+import hashlib
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.processing.columnar import Columns, load_columnar
+from app.processing.json_stream import ResultsStreamReader
+
+METHODS = ("yolo", "template", "interpolated", "none")  # TrackingFrame.detection_method
+METHOD_CODES = {name: code for code, name in enumerate(METHODS)}
+COLUMNS = ("frame_number", "x", "y", "t", "roi_index", "method")
+DEFAULT_CHUNK_FRAMES = 20000  # frame dicts held at once by stream_frames_to_columns
+
+# tracemalloc is process-wide: one traced ingest at a time
+_TRACE_LOCK = threading.Lock()
+
+
+@dataclass
+class IngestStats:
+    source: str
+    frames: int
+    ingest_ms: float
+    peak_bytes: Optional[int] = None  # tracemalloc peak, when traced
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _first_bad(mask: np.ndarray) -> int:
+    return int(np.argmax(mask))
+
+
+def _float_column(name: str, values: list, offset: int = 0) -> np.ndarray:
+    try:
+        return np.array(values, dtype=np.float64)  # None -> NaN
+    except (TypeError, ValueError):
+        for i, value in enumerate(values):
+            if value is not None and not isinstance(value, (int, float)):
+                raise ValueError(f"{name}: invalid value {value!r} at frame index {offset + i}")
+        raise
+
+
+def _integer_column(name: str, values: list, dtype, null: Optional[int] = None, offset: int = 0) -> np.ndarray:
+    column = _float_column(name, values, offset)
+    missing = np.isnan(column)
+    if null is None and missing.any():
+        raise ValueError(f"{name}: missing value at frame index {offset + _first_bad(missing)}")
+    present = column[~missing]
+    bad = (present != np.round(present)) | (present < 0) | (present > np.iinfo(dtype).max)
+    if bad.any():
+        i = int(np.flatnonzero(~missing)[_first_bad(bad)])
+        raise ValueError(f"{name}: invalid value {values[i]!r} at frame index {offset + i}")
+    column[missing] = null if null is not None else 0
+    return column.astype(dtype)
+
+
+def _method_column(values: list, offset: int = 0) -> np.ndarray:
+    column = np.fromiter((METHOD_CODES.get(m, -1) for m in values), dtype=np.int8, count=len(values))
+    if (column < 0).any():
+        i = _first_bad(column < 0)
+        raise ValueError(f"method: invalid value {values[i]!r} at frame index {offset + i}")
+    return column
+
+
+def validate_columns(columns: Columns, offset: int = 0) -> None:
+    """
+    Whole-column checks; raises ValueError naming the column and first bad frame
+    (offset: index of the first row, when validating one chunk of a document).
+    """
+    n = len(columns["frame_number"])
+    for name in COLUMNS:
+        if len(columns[name]) != n:
+            raise ValueError(f"{name}: {len(columns[name])} values for {n} frames")
+    x, y, t = columns["x"], columns["y"], columns["t"]
+    half = np.isnan(x) != np.isnan(y)
+    if half.any():
+        raise ValueError(f"centroid: only one of x/y set at frame index {offset + _first_bad(half)}")
+    for name, column in (("x", x), ("y", y), ("t", t)):
+        if np.isinf(column).any():
+            raise ValueError(f"{name}: infinite value at frame index {offset + _first_bad(np.isinf(column))}")
+    if np.isnan(t).any():
+        raise ValueError(f"t: missing timestamp_sec at frame index {offset + _first_bad(np.isnan(t))}")
+
+
+def frames_to_columns(frames: Iterable[Any], offset: int = 0) -> Columns:
+    """Columns from frame dicts (parsed JSON) or TrackingFrame-like objects."""
+    frames = frames if isinstance(frames, list) else list(frames)
+    if frames and not isinstance(frames[0], dict):
+        frames = [vars(f) if hasattr(f, "__dict__") else f for f in frames]
+    try:
+        columns = {
+            "frame_number": _integer_column(
+                "frame_number", [f.get("frame_number") for f in frames], np.int64, offset=offset),
+            "x": _float_column("x", [f.get("centroid_x") for f in frames], offset),
+            "y": _float_column("y", [f.get("centroid_y") for f in frames], offset),
+            "t": _float_column("t", [f.get("timestamp_sec") for f in frames], offset),
+            "roi_index": _integer_column(
+                "roi_index", [f.get("roi_index") for f in frames], np.int16, null=-1, offset=offset),
+            "method": _method_column([f.get("detection_method") for f in frames], offset),
+        }
+    except AttributeError:
+        raise ValueError("tracking_data must be a list of frame objects")
+    validate_columns(columns, offset)
+    return columns
+
+
+def columns_id(columns: Columns) -> str:
+    """Content hash of the ingest columns (the analysis dataset id)."""
+    digest = hashlib.blake2b(digest_size=12)
+    for name in COLUMNS:
+        digest.update(np.ascontiguousarray(columns[name]).tobytes())
+    return digest.hexdigest()
+
+
+def concat_columns(chunks: List[Columns]) -> Columns:
+    if not chunks:
+        return frames_to_columns([])
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in COLUMNS}
+
+
+def stream_frames_to_columns(
+    frames: Iterable[Dict[str, Any]],
+    chunk_frames: int = DEFAULT_CHUNK_FRAMES,
+    on_chunk: Optional[Callable[[int], None]] = None,
+) -> Columns:
+    """
+    Columns from a frame iterator, holding at most chunk_frames frame dicts at a time.
+
+    Args:
+        frames: Frame dicts, e.g. ResultsStreamReader.iter_frames()
+        chunk_frames: Frames converted (and validated) per chunk
+        on_chunk: Called with the running frame count after each chunk; may
+            raise to abort the ingest
+    """
+    chunks: List[Columns] = []
+    done = 0
+    for batch in _batched(frames, chunk_frames):
+        chunks.append(frames_to_columns(batch, offset=done))
+        done += len(batch)
+        del batch
+        if on_chunk is not None:
+            on_chunk(done)
+    return concat_columns(chunks)
+
+
+def _batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch: List[Any] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def columnar_to_columns(header: Dict[str, Any], columnar: Columns) -> Columns:
+    """Ingest columns from a columnar results file (already typed, so only re-coded)."""
+    table = header["columnar"]["detection_methods"]
+    unknown = [name for name in table if name not in METHOD_CODES]
+    if unknown:
+        raise ValueError(f"method: invalid value {unknown[0]!r}")
+    recode = np.array([METHOD_CODES[name] for name in table] + [-1], dtype=np.int8)
+    method = recode[columnar["detection_method"]]  # -1 (null) picks the sentinel
+    if (method < 0).any():
+        raise ValueError(f"method: missing value at frame index {_first_bad(method < 0)}")
+    columns = {
+        "frame_number": columnar["frame_number"].astype(np.int64),
+        "x": columnar["centroid_x"].astype(np.float64),
+        "y": columnar["centroid_y"].astype(np.float64),
+        "t": columnar["timestamp_sec"].astype(np.float64),
+        "roi_index": columnar["roi_index"].astype(np.int16),
+        "method": method,
+    }
+    validate_columns(columns)
+    return columns
+
+
+def ingest_document(document: Dict[str, Any]) -> Tuple[Dict[str, Any], Columns]:
+    """(header without tracking_data, columns) of a parsed results document."""
+    if not isinstance(document, dict) or not isinstance(document.get("tracking_data"), list):
+        raise ValueError("Not a tracking results document (no tracking_data list)")
+    header = {k: v for k, v in document.items() if k != "tracking_data"}
+    return header, frames_to_columns(document["tracking_data"])
+
+
+def measure_ingest(
+    load: Callable[[], Tuple[Dict[str, Any], Columns]], source: str, trace_memory: bool = False
+) -> Tuple[Dict[str, Any], Columns, IngestStats]:
+    """
+    Run load() -> (header, columns), timing it and optionally tracing its peak memory.
+
+    Traced ingests run one at a time. The peak is left out (None) when
+    something else already has tracemalloc running, since resetting its peak
+    would corrupt that measurement; it also counts allocations made by other
+    threads meanwhile.
+    """
+    if not trace_memory:
+        header, columns, ingest_ms = _timed(load)
+        peak = None
+    else:
+        with _TRACE_LOCK:
+            if tracemalloc.is_tracing():
+                header, columns, ingest_ms = _timed(load)
+                peak = None
+            else:
+                tracemalloc.start()
+                try:
+                    header, columns, ingest_ms = _timed(load)
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+    stats = IngestStats(source=source, frames=len(columns["frame_number"]),
+                        ingest_ms=round(ingest_ms, 1), peak_bytes=peak)
+    return header, columns, stats
+
+
+def _timed(load: Callable[[], Tuple[Dict[str, Any], Columns]]) -> Tuple[Dict[str, Any], Columns, float]:
+    t0 = time.perf_counter()
+    header, columns = load()
+    return header, columns, (time.perf_counter() - t0) * 1000
+
+
+def _load_file(path: str) -> Tuple[Dict[str, Any], Columns]:
+    if str(path).lower().endswith(".npz"):
+        header, columnar = load_columnar(path)
+        columns = columnar_to_columns(header, columnar)
+        return {k: v for k, v in header.items() if k != "columnar"}, columns
+    with open(path, "rb") as f:
+        reader = ResultsStreamReader(f)
+        header = reader.read_header()
+        columns = stream_frames_to_columns(reader.iter_frames())
+        header.update(reader.read_trailer())
+    return header, columns
+
+
+def ingest_file(path: str, trace_memory: bool = False) -> Tuple[Dict[str, Any], Columns, IngestStats]:
+    """
+    Read a results file (.json document, streamed; or columnar .npz) into columns.
+
+    Args:
+        path: Results file
+        trace_memory: Measure the peak Python allocation of the ingest with
+            tracemalloc (slows the JSON parse down)
+
+    Returns:
+        (header, columns, stats)
+    """
+    return measure_ingest(lambda: _load_file(path), str(path), trace_memory)
@@ -0,0 +1,197 @@
+"""Incremental reader for tracking results JSON documents.
+
+``json.load`` on a results file holds the whole text plus every frame dict
+at once, several times the file size. `ResultsStreamReader` reads the file
+in blocks instead and decodes one value at a time with the stdlib's C
+scanner (``JSONDecoder.raw_decode``):
+
+- `read_header` returns the document keys that precede ``tracking_data``
+  (``video_info``, ``statistics``, ``rois``, ...). Results files put
+  ``tracking_data`` last, so this is the whole header and costs a few
+  kilobytes of reading.
+- `iter_frames` then yields the frame dicts one by one, and `read_trailer`
+  any keys after the array. `iter_frame_spans` also gives the character
+  range of each frame in the text (used to index older results files, see
+  app.processing.frame_index).
+
+Only the current block and the value being decoded are buffered. A single
+value larger than ``max_value_chars`` is rejected rather than buffered.
+"""
+
+import codecs
+import json
+import re
+from typing import Any, BinaryIO, Dict, Iterator, Tuple
+
+BLOCK_SIZE = 1024 * 1024
+MAX_VALUE_CHARS = 256 * 1024 * 1024
+FRAMES_KEY = "tracking_data"
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class ResultsStreamReader:
+    """Reads one results document from a binary file object, front to back."""
+
+    def __init__(self, fileobj: BinaryIO, block_size: int = BLOCK_SIZE, max_value_chars: int = MAX_VALUE_CHARS):
+        self._file = fileobj
+        self._block_size = block_size
+        self._max_value_chars = max_value_chars
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._dropped = 0  # characters discarded from the front of the buffer
+        self._eof = False
+        self._state = "start"  # start -> frames -> trailer -> done
+        self.bytes_read = 0
+        self.chars_read = 0  # equals bytes_read for ASCII files
+
+    # --- public ---
+
+    def read_header(self) -> Dict[str, Any]:
+        """Document keys before tracking_data; the reader is then at the first frame."""
+        if self._state != "start":
+            raise RuntimeError("read_header() must be called first")
+        self._expect("{")
+        header = {}
+        if self._peek() == "}":
+            self._pos += 1
+            self._state = "done"
+            return header
+        while True:
+            key, value = self._member()
+            if key == FRAMES_KEY:
+                return header
+            header[key] = value
+            if self._after_member():
+                return header
+
+    def iter_frames(self) -> Iterator[Dict[str, Any]]:
+        """The tracking_data entries, decoded one at a time."""
+        for frame, _, _ in self.iter_frame_spans():
+            yield frame
+
+    def iter_frame_spans(self) -> Iterator[Tuple[Dict[str, Any], int, int]]:
+        """(frame, start, end): each entry with its character range in the document."""
+        if self._state == "start":
+            self.read_header()
+        if self._state != "frames":
+            return
+        self._state = "trailer"
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            self._peek()
+            start = self._dropped + self._pos
+            value = self._value()
+            yield value, start, self._dropped + self._pos
+            ch = self._peek()
+            self._pos += 1
+            if ch == "]":
+                return
+            if ch != ",":
+                self._error("',' or ']'", ch)
+
+    def read_trailer(self) -> Dict[str, Any]:
+        """Document keys after tracking_data (call once the frames are consumed)."""
+        for _ in self.iter_frames():
+            pass
+        trailer = {}
+        if self._state != "trailer" or self._after_member():
+            return trailer
+        while True:
+            key, value = self._member()
+            if key == FRAMES_KEY:
+                raise ValueError("Duplicate tracking_data key")
+            trailer[key] = value
+            if self._after_member():
+                return trailer
+
+    # --- internals ---
+
+    def _fill(self, min_chars: int = 0) -> bool:
+        """Append at least one more block to the buffer; False at end of file."""
+        if self._eof:
+            return False
+        self._buf = self._buf[self._pos:]
+        self._dropped += self._pos
+        self._pos = 0
+        chunks = []
+        wanted = max(self._block_size, min_chars)
+        got = 0
+        while got < wanted:
+            data = self._file.read(self._block_size)
+            if not data:
+                chunks.append(self._utf8.decode(b"", final=True))
+                self._eof = True
+                break
+            self.bytes_read += len(data)
+            got += len(data)
+            chunks.append(self._utf8.decode(data))
+        text = "".join(chunks)
+        self.chars_read += len(text)
+        self._buf += text
+        return True
+
+    def _peek(self) -> str:
+        """Next non-whitespace character ('' at end of file), without consuming it."""
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, ch: str) -> None:
+        found = self._peek()
+        if found != ch:
+            self._error(repr(ch), found)
+        self._pos += 1
+
+    def _error(self, expected: str, found: str) -> None:
+        raise ValueError(f"Expected {expected} but found {found or 'end of file'!r} "
+                         f"near byte {self.bytes_read - len(self._buf.encode('utf-8')) + self._pos}")
+
+    def _value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError as e:
+                # Only an error at the end of the buffer (or an open string) can be a cut-off value
+                cut_off = e.pos >= len(self._buf) - 8 or e.msg.startswith("Unterminated string")
+                if self._eof or not cut_off:
+                    raise
+                end = None
+            # A value that ends the buffer may be cut short (e.g. a number); read on to be sure
+            if end is not None and (end < len(self._buf) or self._eof):
+                self._pos = end
+                return value
+            pending = len(self._buf) - self._pos
+            if pending > self._max_value_chars:
+                raise ValueError(f"JSON value larger than {self._max_value_chars} characters")
+            self._fill(min_chars=pending)  # doubles the window, so huge values are not rescanned often
+
+    def _member(self) -> Tuple[str, Any]:
+        key = self._value()
+        if not isinstance(key, str):
+            raise ValueError(f"Expected an object key, found {key!r}")
+        self._expect(":")
+        if key == FRAMES_KEY and self._state == "start":
+            self._expect("[")
+            self._state = "frames"
+            return key, None
+        return key, self._value()
+
+    def _after_member(self) -> bool:
+        """Consume ',' (False: more members follow) or the closing '}' (True)."""
+        ch = self._peek()
+        self._pos += 1
+        if ch == "}":
+            self._state = "done"
+            return True
+        if ch != ",":
+            self._error("',' or '}'", ch)
+        return False
@@ -29,9 +29,19 @@ import numpy as np
 
 from app.models.schemas import ExperimentStartRequest, ROIPreset, TriggerRule
 from app.processing.segment_writer import SegmentedRecorder, WriterThread
-from app.processing.tracking import get_roi_containing_point, draw_rois
+from app.processing.tracking import (
+    create_roi_mask,
+    crop_inference_size,
+    draw_rois,
+    get_roi_containing_point,
+    roi_crop_box,
+)
 from app.processing.trigger_evaluator import TriggerEvaluator
 from app.services.event_bus import EventBus
+from app.services.cpu_governor import ThreadLease, cpu_governor
+from app.services.inference_backends import resolve_inference_model
+from app.services.model_registry import model_registry
+from app.utils.device import select_device
 
 logger = logging.getLogger("pymice.live_experiment")
 
@@ -40,10 +50,13 @@ def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def _load_yolo_model(model_path: str):
-    """Indirected for testability."""
-    from ultralytics import YOLO
-    return YOLO(model_path)
+def _load_yolo_model(model_path: str, device: Optional[str] = None):
+    """Lease a warmed-up model from the shared registry. Indirected for testability."""
+    return model_registry.acquire(model_path, device or select_device())
+
+
+def _release_yolo_model(model, discard: bool = False) -> None:
+    model_registry.release(model, discard=discard)
 
 
 def _probe_inference_device(model, model_path: str):
@@ -70,7 +83,8 @@ def _probe_inference_device(model, model_path: str):
             )
             # Reload model fresh and pin to CPU. A stale model that already
             # tried CUDA can carry partial state that re-fires the error.
-            model = _load_yolo_model(model_path)
+            _release_yolo_model(model, discard=True)
+            model = _load_yolo_model(model_path, "cpu")
             try:
                 model.predict(probe, device="cpu", verbose=False)
             except Exception as cpu_e:
@@ -175,6 +189,9 @@ class LiveExperiment:
             getattr(r, "name", f"roi_{i}") if False else f"roi_{i}"
             for i, r in enumerate(self._rois)
         ]
+        self._rois_version = 0
+        self._crop_key: Optional[tuple] = None  # (frame shape, rois version) the crop box was built for
+        self._crop_box: Optional[tuple] = None
         self._evaluator = TriggerEvaluator(list(request.triggers))
         self._paused_roi_eval = False
 
@@ -320,6 +337,7 @@ class LiveExperiment:
         with self._rois_lock:
             self._rois = list(new_preset.rois)
             self._roi_names = [f"roi_{i}" for i, _ in enumerate(self._rois)]
+            self._rois_version += 1
 
     def set_paused_roi_eval(self, paused: bool) -> None:
         self._paused_roi_eval = paused
@@ -390,6 +408,8 @@ class LiveExperiment:
                 "confidence_threshold": self.request.confidence_threshold,
                 "iou_threshold": self.request.iou_threshold,
                 "inference_size": self.request.inference_size,
+                "roi_crop": self.request.roi_crop,
+                "roi_crop_padding": self.request.roi_crop_padding,
                 "fps_target": self.request.fps_target,
                 "max_consecutive_drops": self.request.max_consecutive_drops,
                 "segment_max_mb": self.request.segment_max_mb,
@@ -411,6 +431,12 @@ class LiveExperiment:
             self._state = "stopped"
             return
 
+        # ONNX Runtime / OpenVINO on CPU boxes (falls back to the .pt elsewhere)
+        model_path, inference_backend = resolve_inference_model(
+            model_path, self.request.inference_backend, select_device()
+        )
+        logger.info("live inference backend: %s", inference_backend)
+
         try:
             model = _load_yolo_model(model_path)
         except Exception as e:
@@ -421,6 +447,7 @@ class LiveExperiment:
         try:
             model, inference_device = _probe_inference_device(model, model_path)
         except Exception as e:
+            _release_yolo_model(model, discard=True)
             self._emit({"type": "stopped", "reason": f"inference_probe_failed: {e}"})
             self._state = "stopped"
             return
@@ -434,6 +461,27 @@ class LiveExperiment:
                            "Inference will be slower.",
             })
 
+        # Live experiments get priority over offline jobs for CPU threads
+        thread_lease = cpu_governor.lease(self.exp_id, "live")
+        try:
+            self._detect_loop(model, inference_device, thread_lease)
+        finally:
+            thread_lease.release()
+            _release_yolo_model(model)
+
+    def _current_crop_box(self, frame_shape: tuple) -> Optional[tuple]:
+        """Crop box of the current ROIs (None = full frame), rebuilt when the ROIs or frame size change."""
+        if not self.request.roi_crop:
+            return None
+        with self._rois_lock:
+            key = (tuple(frame_shape[:2]), self._rois_version)
+            if key != self._crop_key:
+                mask = create_roi_mask(self._rois, frame_shape[:2]) if self._rois else None
+                self._crop_box = roi_crop_box(mask, self.request.roi_crop_padding)
+                self._crop_key = key
+            return self._crop_box
+
+    def _detect_loop(self, model, inference_device: Optional[str], thread_lease: ThreadLease) -> None:
         consecutive_drops = 0
         max_drops = self.request.max_consecutive_drops
         tick_interval = 1.0
@@ -472,22 +520,34 @@ class LiveExperiment:
             frame_idx = self._frames_processed
             t = self._t_since_start()
 
+            crop_box = self._current_crop_box(frame.shape)
             try:
+                source, imgsz = frame, self.request.inference_size
+                if crop_box is not None:
+                    x1, y1, x2, y2 = crop_box
+                    source = frame[y1:y2, x1:x2]
+                    imgsz = crop_inference_size(crop_box, frame.shape[:2], imgsz)
                 predict_kwargs = dict(
                     conf=self.request.confidence_threshold,
                     iou=self.request.iou_threshold,
-                    imgsz=self.request.inference_size,
+                    imgsz=imgsz,
                     verbose=False,
                 )
                 if inference_device is not None:
                     predict_kwargs["device"] = inference_device
-                results = model.predict(frame, **predict_kwargs)
+                thread_lease.apply()
+                results = model.predict(source, **predict_kwargs)
             except Exception as e:
                 self._emit({"type": "stopped", "reason": f"detector_error: {e}"})
                 self._state = "stopped"
                 break
 
             detection = _best_detection(results)
+            if detection is not None and crop_box is not None:
+                # Back to full-frame coordinates
+                dx, dy = crop_box[:2]
+                cx, cy, bbox, conf = detection
+                detection = (cx + dx, cy + dy, [bbox[0] + dx, bbox[1] + dy, bbox[2] + dx, bbox[3] + dy], conf)
             if detection is not None:
                 cx, cy, bbox, conf = detection
                 self._detections += 1
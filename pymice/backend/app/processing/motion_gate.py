@@ -0,0 +1,104 @@
+"""Motion gate: skip inference while the scene inside the ROIs is static.
+
+Mice spend long stretches immobile, and inferring those frames gives the same
+answer every time. The gate keeps a small, blurred grayscale copy of the last
+frame that was actually inferred (the reference). Each new frame is reduced
+the same way and compared with it inside the ROI mask: if fewer than
+`threshold` (a fraction of the ROI pixels) changed by more than
+``PIXEL_DIFF_THRESHOLD`` gray levels, the frame is gated and reuses the last
+result, tagged ``"gated": true``.
+
+Comparing against the last inferred frame rather than the previous frame
+means slow drift accumulates until it triggers inference. A frame is also
+inferred after ``MAX_GATED_FRAMES`` consecutive gated frames, so a result is
+never reused for too long.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+GATE_WIDTH = 160  # width (px) of the downscaled comparison frame
+PIXEL_DIFF_THRESHOLD = 25  # gray levels, as for template matching
+DEFAULT_GATE_THRESHOLD = 0.001  # fraction of ROI pixels that must change to run inference
+MAX_GATED_FRAMES = 150
+
+# (frame_numbers, frames) -> one frame_data dict per frame
+InferFn = Callable[[List[int], List[np.ndarray]], List[Dict[str, Any]]]
+
+
+class MotionGate:
+    """Decides, frame by frame and in order, whether the model needs to run."""
+
+    def __init__(
+        self,
+        roi_mask: Optional[np.ndarray] = None,
+        threshold: float = DEFAULT_GATE_THRESHOLD,
+        width: int = GATE_WIDTH,
+        max_gated: int = MAX_GATED_FRAMES,
+    ):
+        self._roi_mask = roi_mask
+        self._threshold = threshold
+        self._width = width
+        self._max_gated = max_gated
+        self._mask_small: Optional[np.ndarray] = None
+        self._reference: Optional[np.ndarray] = None
+        self._last_result: Optional[Dict[str, Any]] = None
+        self._run_length = 0
+        self.checked = 0
+        self.gated = 0
+
+    def _reduce(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        size = (self._width, max(1, round(height * self._width / width)))
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        small = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+        if self._mask_small is None:
+            if self._roi_mask is not None:
+                self._mask_small = cv2.resize(self._roi_mask, size, interpolation=cv2.INTER_NEAREST) > 0
+            else:
+                self._mask_small = np.ones(small.shape, dtype=bool)
+        return cv2.GaussianBlur(small, (3, 3), 0)
+
+    def changed_fraction(self, small: np.ndarray) -> float:
+        """Fraction of ROI pixels of a reduced frame that differ from the reference."""
+        diff = cv2.absdiff(small, self._reference) > PIXEL_DIFF_THRESHOLD
+        return float(np.count_nonzero(diff & self._mask_small)) / max(1, int(np.count_nonzero(self._mask_small)))
+
+    def should_infer(self, frame: np.ndarray) -> bool:
+        """True if the frame must go through the model; it then becomes the reference."""
+        self.checked += 1
+        small = self._reduce(frame)
+        if (self._reference is not None and self._run_length < self._max_gated
+                and self.changed_fraction(small) < self._threshold):
+            self._run_length += 1
+            self.gated += 1
+            return False
+        self._reference = small
+        self._run_length = 0
+        return True
+
+    def infer(self, frame_numbers: List[int], frames: List[np.ndarray], infer_fn: InferFn) -> List[Dict[str, Any]]:
+        """infer_fn on the frames that moved; static frames get a copy of the last inferred result."""
+        run = [self.should_infer(frame) for frame in frames]
+        indices = [i for i, needed in enumerate(run) if needed]
+        inferred = infer_fn([frame_numbers[i] for i in indices], [frames[i] for i in indices]) if indices else []
+        by_index = dict(zip(indices, inferred))
+
+        results = []
+        for i, frame_number in enumerate(frame_numbers):
+            if run[i]:
+                # Own copy: downstream stages may add keys to the returned dict
+                self._last_result = dict(by_index[i])
+                results.append(by_index[i])
+            else:
+                results.append({**self._last_result, "frame_number": frame_number, "gated": True})
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "checked_frames": self.checked,
+            "gated_frames": self.gated,
+            "hit_rate": round(self.gated / self.checked, 4) if self.checked else 0.0,
+        }
@@ -0,0 +1,289 @@
+"""Staged decode → infer → postprocess pipeline for offline tracking.
+
+Three stages connected by bounded queues:
+
+  decoder thread  --frame_queue-->  inference (caller's thread)  --result_queue-->  postprocess thread
+
+- The decoder reads frames ahead of the model, so video decoding overlaps
+  inference instead of adding to it. The bounded frame queue caps how many
+  decoded frames can sit in memory.
+- Inference runs in the thread that called run(), which keeps the model on
+  the task thread that loaded it. It pulls up to `batch_size` frames per call.
+- Postprocessing (result bookkeeping, preview, progress) runs in its own
+  thread. Results are reassembled by frame_number before the postprocess
+  callback sees them, so callbacks always observe frames in order.
+
+Each stage keeps its own counters (items, busy time, input queue depth) so a
+slow stage is visible in the task progress.
+
+With a FrameSampler (see app.processing.sampling) only keyframes reach the
+model: the decoder grabs frames that are certain to be skipped without
+decoding them, the inference stage forwards skipped frames without a result,
+and the postprocess stage fills them in once the next keyframe is known.
+The postprocess callback then receives frame=None for filled-in frames.
+"""
+
+import heapq
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.processing.sampling import FrameSampler
+
+# (frame, timestamp_sec) or None at end of stream
+FrameReader = Callable[[], Optional[Tuple[np.ndarray, float]]]
+# Advance one frame without decoding it: timestamp_sec or None at end of stream
+FrameGrabber = Callable[[], Optional[float]]
+# (frame_numbers, frames) -> one frame_data dict per frame
+InferenceFn = Callable[[List[int], List[np.ndarray]], List[Dict[str, Any]]]
+# (frame_number, frame or None, timestamp_sec, frame_data) -> None
+PostprocessFn = Callable[[int, np.ndarray, float, Dict[str, Any]], None]
+
+_QUEUE_POLL_SEC = 0.1
+_END = object()
+
+
+@dataclass
+class StageStats:
+    """Per-stage counters. busy_sec excludes time spent waiting on queues."""
+
+    name: str
+    items: int = 0
+    busy_sec: float = 0.0
+    queue_depth: Optional[int] = None  # items waiting in the stage's input queue; None: no input queue
+
+    def snapshot(self, elapsed_sec: float) -> dict:
+        return {
+            "items": self.items,
+            "busy_sec": round(self.busy_sec, 3),
+            "utilization": round(self.busy_sec / elapsed_sec, 3) if elapsed_sec > 0 else 0.0,
+            "queue_depth": self.queue_depth,
+        }
+
+
+class TrackingPipeline:
+    """Runs read_frame → infer → postprocess with the stages overlapping.
+
+    stop_requested is polled by the decode and inference stages; once it
+    returns True no new batch is inferred, and frames already inferred are
+    still postprocessed before run() returns.
+    """
+
+    def __init__(
+        self,
+        read_frame: FrameReader,
+        infer: InferenceFn,
+        postprocess: PostprocessFn,
+        batch_size: int = 1,
+        queue_size: int = 32,
+        start_frame: int = 0,
+        stop_requested: Callable[[], bool] = lambda: False,
+        sampler: Optional[FrameSampler] = None,
+        grab_frame: Optional[FrameGrabber] = None,
+    ):
+        """batch_size counts inferred frames; with a sampler, skipped frames do not fill batches."""
+        self._read_frame = read_frame
+        self._grab_frame = grab_frame
+        self._sampler = sampler if sampler is not None and sampler.sampling else None
+        self._infer = infer
+        self._postprocess = postprocess
+        self._batch_size = max(1, batch_size)
+        self._start_frame = start_frame
+        self._stop_requested = stop_requested
+
+        # The frame queue must hold at least one full batch
+        self._frame_q: "queue.Queue" = queue.Queue(maxsize=max(queue_size, self._batch_size))
+        self._result_q: "queue.Queue" = queue.Queue(maxsize=max(queue_size, self._batch_size))
+        self._abort = threading.Event()
+        self._inference_done = threading.Event()
+        self._errors: List[BaseException] = []
+
+        self.decode_stats = StageStats("decode")
+        self.inference_stats = StageStats("inference")
+        self.postprocess_stats = StageStats("postprocess")
+        self._started_at: Optional[float] = None
+
+    # --- public ---
+
+    def run(self) -> int:
+        """Process the whole stream. Returns the number of postprocessed frames.
+
+        Re-raises the first exception raised by any stage.
+        """
+        self._started_at = time.monotonic()
+        decoder = threading.Thread(target=self._guard, args=(self._decode_loop,), daemon=True)
+        post = threading.Thread(target=self._guard, args=(self._postprocess_loop,), daemon=True)
+        decoder.start()
+        post.start()
+
+        try:
+            self._inference_loop()
+        except BaseException as e:
+            self._errors.append(e)
+            self._abort.set()
+        finally:
+            self._inference_done.set()
+            self._put(self._result_q, _END, give_up=self._abort.is_set)
+            decoder.join()
+            post.join()
+
+        if self._errors:
+            raise self._errors[0]
+        return self.postprocess_stats.items
+
+    def stats(self) -> dict:
+        """Per-stage snapshot, safe to call from any thread while running."""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        # decode reads the video directly; only the two hand-off queues have a depth
+        self.inference_stats.queue_depth = self._frame_q.qsize()
+        self.postprocess_stats.queue_depth = self._result_q.qsize()
+        stats = {
+            "elapsed_sec": round(elapsed, 3),
+            "decode": self.decode_stats.snapshot(elapsed),
+            "inference": self.inference_stats.snapshot(elapsed),
+            "postprocess": self.postprocess_stats.snapshot(elapsed),
+        }
+        if self._sampler is not None:
+            stats["sampling"] = self._sampler.stats()
+        return stats
+
+    # --- stages ---
+
+    def _guard(self, loop: Callable[[], None]) -> None:
+        try:
+            loop()
+        except BaseException as e:
+            self._errors.append(e)
+            self._abort.set()
+
+    def _should_stop(self) -> bool:
+        return self._abort.is_set() or self._stop_requested()
+
+    def _put(self, q: "queue.Queue", item, give_up: Callable[[], bool]) -> bool:
+        """Blocking put that returns False once give_up() says nobody will consume."""
+        while not give_up():
+            try:
+                q.put(item, timeout=_QUEUE_POLL_SEC)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _decoder_should_give_up(self) -> bool:
+        return self._abort.is_set() or self._inference_done.is_set()
+
+    def _decode_loop(self) -> None:
+        frame_number = self._start_frame
+        try:
+            while not self._should_stop():
+                t0 = time.perf_counter()
+                if (self._grab_frame is not None and self._sampler is not None
+                        and not self._sampler.must_decode(frame_number)):
+                    timestamp_sec = self._grab_frame()
+                    item = None if timestamp_sec is None else (None, timestamp_sec)
+                else:
+                    item = self._read_frame()
+                self.decode_stats.busy_sec += time.perf_counter() - t0
+                if item is None:
+                    break
+                frame, timestamp_sec = item
+                if not self._put(
+                    self._frame_q, (frame_number, frame, timestamp_sec), self._decoder_should_give_up
+                ):
+                    break
+                self.decode_stats.items += 1
+                frame_number += 1
+        finally:
+            self._put(self._frame_q, _END, self._decoder_should_give_up)
+
+    def _inference_loop(self) -> None:
+        ended = False
+        while not ended and not self._should_stop():
+            batch = []
+            while len(batch) < self._batch_size:
+                try:
+                    item = self._frame_q.get(timeout=_QUEUE_POLL_SEC)
+                except queue.Empty:
+                    if self._abort.is_set():
+                        return
+                    continue
+                if item is _END:
+                    ended = True
+                    break
+                if self._sampler is not None and not self._sampler.select(item[0]):
+                    # Skipped: no result yet, postprocess fills it in (the image is not needed)
+                    frame_number, _, timestamp_sec = item
+                    if not self._put(self._result_q, (frame_number, None, timestamp_sec, None, None),
+                                     self._abort.is_set):
+                        return
+                    continue
+                batch.append(item)
+
+            if not batch:
+                break
+
+            frame_numbers = [fn for fn, _, _ in batch]
+            frames = [frame for _, frame, _ in batch]
+            t0 = time.perf_counter()
+            batch_data = self._infer(frame_numbers, frames)
+            self.inference_stats.busy_sec += time.perf_counter() - t0
+            self.inference_stats.items += len(batch)
+
+            for (frame_number, frame, timestamp_sec), frame_data in zip(batch, batch_data):
+                stride = self._sampler.observe(frame_data) if self._sampler is not None else None
+                if not self._put(
+                    self._result_q, (frame_number, frame, timestamp_sec, frame_data, stride), self._abort.is_set
+                ):
+                    return
+
+    def _postprocess_loop(self) -> None:
+        pending: List[tuple] = []
+        gap: List[Tuple[int, float]] = []  # skipped frames waiting for the next keyframe
+        next_frame = self._start_frame
+        while True:
+            try:
+                item = self._result_q.get(timeout=_QUEUE_POLL_SEC)
+            except queue.Empty:
+                if self._abort.is_set():
+                    return
+                continue
+            if item is _END:
+                break
+            heapq.heappush(pending, (item[0], item))
+
+            # Release results strictly in frame order
+            while pending and pending[0][0] == next_frame:
+                _, (frame_number, frame, timestamp_sec, frame_data, stride) = heapq.heappop(pending)
+                next_frame += 1
+                if self._sampler is None:
+                    self._emit(frame_number, frame, timestamp_sec, frame_data)
+                elif frame_data is None:
+                    gap.append((frame_number, timestamp_sec))
+                else:
+                    self._emit_gap(gap, frame_data)
+                    self._sampler.emit(frame_data, stride)
+                    self._emit(frame_number, frame, timestamp_sec, frame_data)
+
+        # Frames after the last keyframe repeat it, unless the run was stopped:
+        # then the last result written is a keyframe, which a checkpoint can resume from
+        if gap and not self._abort.is_set() and not self._stop_requested():
+            self._emit_gap(gap, None)
+
+    def _emit_gap(self, gap: List[Tuple[int, float]], keyframe: Optional[Dict[str, Any]]) -> None:
+        if not gap:
+            return
+        filled = self._sampler.fill([fn for fn, _ in gap], keyframe)
+        for (frame_number, timestamp_sec), frame_data in zip(gap, filled):
+            self._emit(frame_number, None, timestamp_sec, frame_data)
+        gap.clear()
+
+    def _emit(self, frame_number: int, frame: Optional[np.ndarray], timestamp_sec: float,
+              frame_data: Dict[str, Any]) -> None:
+        t0 = time.perf_counter()
+        self._postprocess(frame_number, frame, timestamp_sec, frame_data)
+        self.postprocess_stats.busy_sec += time.perf_counter() - t0
+        self.postprocess_stats.items += 1
@@ -0,0 +1,83 @@
+"""On-demand live preview for tracking tasks.
+
+The tracking loop used to copy, annotate and JPEG-encode frames for the
+preview whether or not anyone was watching. LazyPreview inverts that: the
+loop only hands over a reference to the latest raw frame and its result
+(`update()`, no copy, no drawing), and the overlay + encode run when a client
+asks for the preview (`jpeg()`), at most `max_fps` times per second. Between
+renders, and when no new frame has arrived, the cached JPEG is returned.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import cv2
+import numpy as np
+
+DEFAULT_PREVIEW_MAX_FPS = 5.0
+DEFAULT_JPEG_QUALITY = 70
+
+# (frame copy to draw on, frame_data, frame_number) -> annotated frame
+RenderFn = Callable[[np.ndarray, Dict[str, Any], int], np.ndarray]
+
+
+class LazyPreview:
+    """Latest (frame, result) of a running task, rendered to JPEG only when requested."""
+
+    def __init__(
+        self,
+        render: RenderFn,
+        max_fps: float = DEFAULT_PREVIEW_MAX_FPS,
+        jpeg_quality: int = DEFAULT_JPEG_QUALITY,
+        placeholder: Optional[bytes] = None,
+    ):
+        self._render = render
+        self._min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self._encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self._lock = threading.Lock()
+        self._latest: Optional[tuple] = None  # (frame, frame_data, frame_number)
+        self._seq = 0
+        self._rendered_seq = -1
+        self._rendered_at = 0.0
+        self._cached = placeholder  # served until the first frame arrives
+        self.renders = 0
+
+    def update(self, frame: np.ndarray, frame_data: Dict[str, Any], frame_number: int) -> None:
+        """Called from the hot loop: keeps references only. The frame must not be modified afterwards."""
+        with self._lock:
+            self._latest = (frame, frame_data, frame_number)
+            self._seq += 1
+
+    def jpeg(self) -> Optional[bytes]:
+        """JPEG of the latest frame, re-rendered only if it changed and the rate limit allows."""
+        with self._lock:
+            latest, seq = self._latest, self._seq
+            stale = seq != self._rendered_seq
+            due = time.monotonic() - self._rendered_at >= self._min_interval
+            if latest is None or not stale or (self._rendered_seq >= 0 and not due):
+                return self._cached
+            # Claim this render so concurrent pollers reuse the cache meanwhile
+            self._rendered_seq = seq
+            self._rendered_at = time.monotonic()
+
+        frame, frame_data, frame_number = latest
+        vis_frame = self._render(frame.copy(), frame_data, frame_number)
+        ok, buffer = cv2.imencode('.jpg', vis_frame, self._encode_params)
+        if not ok:
+            return self._cached
+        data = buffer.tobytes()
+        with self._lock:
+            if self._rendered_seq == seq:
+                self._cached = data
+            self.renders += 1
+        return data
+
+    def finalize(self) -> Optional[bytes]:
+        """Render the last frame regardless of the rate limit and drop the frame reference."""
+        with self._lock:
+            self._rendered_at = 0.0
+        data = self.jpeg()
+        with self._lock:
+            self._latest = None
+        return data
@@ -0,0 +1,197 @@
+"""Append-only results writer for offline tracking.
+
+Instead of collecting every frame dict in a list and `json.dump`-ing the
+whole document at the end, the tracking task appends each frame to a JSONL
+file next to the results (``<task>_frames.jsonl``), flushed every
+`flush_every` frames. Memory stays flat regardless of video length, and
+frames already processed are on disk if the task dies.
+
+`finalize(header)` then streams the usual results document — the header
+keys followed by ``"tracking_data": [...]`` — into ``<task>_results.json``,
+reading the JSONL back one line at a time. The output is byte-for-byte what
+``json.dump(results, f, indent=2)`` produced before. The same pass can also
+write the compact columnar file (see app.processing.columnar), the byte
+offset index of the frames (see app.processing.frame_index) and the
+memory-mapped column store for analysis (see app.processing.column_store).
+"""
+
+import json
+import logging
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.processing.column_store import ColumnStoreBuilder
+from app.processing.columnar import ColumnarBuilder
+from app.processing.frame_index import FrameIndexBuilder
+
+logger = logging.getLogger("pymice.results_writer")
+
+DEFAULT_FLUSH_EVERY = 256
+
+
+def _task_base(results_path: str) -> str:
+    for suffix in ("_results.json", "_results.npz"):
+        if results_path.endswith(suffix):
+            return results_path[:-len(suffix)]
+    return os.path.splitext(results_path)[0]
+
+
+def frames_path_for(results_path: str) -> str:
+    """``x_results.json`` -> ``x_frames.jsonl``."""
+    return f"{_task_base(results_path)}_frames.jsonl"
+
+
+def columnar_path_for(results_path: str) -> str:
+    """``x_results.json`` -> ``x_results.npz``."""
+    return f"{_task_base(results_path)}_results.npz"
+
+
+def frame_index_path_for(results_path: str) -> str:
+    """``x_results.json`` -> ``x_results.index.npy``."""
+    return f"{_task_base(results_path)}_results.index.npy"
+
+
+def column_store_path_for(results_path: str) -> str:
+    """``x_results.json`` (or ``.npz``) -> ``x_results.columns`` (a directory)."""
+    return f"{_task_base(results_path)}_results.columns"
+
+
+def iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_results_document(out, header: Dict[str, Any], frames: Iterator[Dict[str, Any]],
+                           key: str = "tracking_data", index: Optional[FrameIndexBuilder] = None) -> int:
+    """Stream `{**header, key: [*frames]}` to `out` as indent=2 JSON. Returns the frame count.
+
+    With index, the byte range of every frame is recorded (json.dumps escapes
+    non-ASCII, so characters written == bytes written).
+    """
+    head = json.dumps(header, indent=2)
+    if head == "{}":
+        head = "{\n  "
+    else:
+        head = head[:-2] + ",\n  "  # drop the closing "\n}"
+    head += json.dumps(key) + ": "
+    out.write(head)
+    position = len(head)
+
+    count = 0
+    for frame in frames:
+        separator = "[\n    " if count == 0 else ",\n    "
+        # Nested one level deeper than a top-level dump; escaped strings never contain raw newlines
+        text = json.dumps(frame, indent=2).replace("\n", "\n    ")
+        out.write(separator)
+        out.write(text)
+        position += len(separator)
+        if index is not None:
+            index.add(frame["frame_number"], position, position + len(text))
+        position += len(text)
+        count += 1
+    out.write("[]" if count == 0 else "\n  ]")
+    out.write("\n}")
+    return count
+
+
+class StreamingResultsWriter:
+    """Per-frame JSONL sink with a final streamed conversion to the results document."""
+
+    def __init__(self, results_path: str, flush_every: int = DEFAULT_FLUSH_EVERY,
+                 frames_path: Optional[str] = None, resume_offset: Optional[int] = None,
+                 resume_count: int = 0):
+        """resume_offset/resume_count continue an existing JSONL file (see
+        app.processing.checkpoint): anything after resume_offset is discarded."""
+        self.results_path = results_path
+        self.frames_path = frames_path or frames_path_for(results_path)
+        self._flush_every = max(1, flush_every)
+        self._pending: List[str] = []
+        if resume_offset is None:
+            self._count = 0
+            self._file = open(self.frames_path, "wb")
+        else:
+            self._count = resume_count
+            self._file = open(self.frames_path, "r+b")
+            self._file.truncate(resume_offset)
+            self._file.seek(resume_offset)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, frame_data: Dict[str, Any]) -> None:
+        self._pending.append(json.dumps(frame_data))
+        self._count += 1
+        if len(self._pending) >= self._flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._pending and self._file is not None:
+            self._file.write(("\n".join(self._pending) + "\n").encode("utf-8"))
+            self._pending.clear()
+            self._file.flush()
+
+    def offset(self) -> int:
+        """Flush, then return the JSONL size in bytes (all appended frames are on disk)."""
+        self.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self) -> None:
+        """Flush and close the JSONL file (kept on disk)."""
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def iter_frames(self) -> Iterator[Dict[str, Any]]:
+        self.flush()
+        return iter_jsonl(self.frames_path)
+
+    def finalize(self, header: Dict[str, Any], key: str = "tracking_data",
+                 columnar_path: Optional[str] = None, keep_frames: bool = False,
+                 index_path: Optional[str] = None, store_path: Optional[str] = None) -> str:
+        """Write the results document and remove the JSONL file. Returns results_path.
+
+        With columnar_path, the columnar .npz is built in the same pass over the frames;
+        with index_path, the frame offset index (.npy) and with store_path, the
+        column store directory too. A column store that cannot be built (frames
+        the analysis would reject) is skipped with a warning, not an error.
+        keep_frames leaves the JSONL in place so a resumed task can append to it.
+        """
+        self.close()
+        builder = ColumnarBuilder() if columnar_path else None
+        index = FrameIndexBuilder() if index_path else None
+        store = ColumnStoreBuilder() if store_path else None
+
+        def frames():
+            nonlocal store
+            for frame in iter_jsonl(self.frames_path):
+                if builder is not None:
+                    builder.append(frame)
+                if store is not None:
+                    try:
+                        store.append(frame)
+                    except ValueError as e:
+                        logger.warning("not writing column store %s: %s", store_path, e)
+                        store = None
+                yield frame
+
+        tmp_path = self.results_path + ".tmp"
+        with open(tmp_path, "w") as out:
+            write_results_document(out, header, frames(), key=key, index=index)
+        if builder is not None:
+            builder.save(columnar_path + ".tmp", header)
+            os.replace(columnar_path + ".tmp", columnar_path)
+        if index is not None:
+            index.save(index_path)
+        if store is not None:
+            try:
+                store.save(store_path, header)
+            except ValueError as e:
+                logger.warning("not writing column store %s: %s", store_path, e)
+        os.replace(tmp_path, self.results_path)  # readers never see a half-written file
+        if not keep_frames:
+            os.remove(self.frames_path)
+        return self.results_path
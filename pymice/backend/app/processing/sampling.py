@@ -0,0 +1,172 @@
+"""Frame sampling for offline tracking: which frames go through the model.
+
+Many protocols do not need a detection on every frame of a 30 fps video.
+A `FrameSampler` picks the keyframes that are inferred; every other frame is
+filled in from the two surrounding keyframes, so the results keep one entry
+per frame and /analysis/* works unchanged.
+
+Modes (TrackingRequest.sampling_mode):
+
+- ``every_frame``: every frame is a keyframe (no sampling).
+- ``stride``: every k-th frame is a keyframe. Skipped frames are only
+  grabbed from the decoder, never decoded into an image.
+- ``adaptive``: the stride doubles (up to ``max_stride``) while the animal
+  barely moves and drops back so that the expected displacement between
+  keyframes stays under ``ADAPTIVE_MAX_GAP_PX``. Frames are still decoded,
+  since the next keyframe is only known once the previous one was inferred.
+
+Filled-in frames get ``detection_method: "interpolated"`` and a centroid
+linearly interpolated between the keyframes (ROI recomputed from it). If
+either keyframe has no centroid, the gap is reported as ``"none"``. Frames
+after the last keyframe repeat it.
+
+The inference stage calls `select()` / `observe()`; the postprocess stage
+calls `fill()` / `emit()`. Both walk the frames in order, which keeps the
+choice of keyframes deterministic for a given batch size.
+"""
+
+import math
+from typing import Any, Dict, List, Optional
+
+from app.models.schemas import ROI
+from app.processing.tracking import get_roi_containing_point
+
+SAMPLING_MODES = ("every_frame", "stride", "adaptive")
+DEFAULT_MAX_STRIDE = 8
+ADAPTIVE_MAX_GAP_PX = 10.0  # expected centroid motion (px) tolerated between keyframes
+
+
+def _centroid(frame_data: Optional[Dict[str, Any]]) -> Optional[tuple]:
+    if not frame_data or frame_data.get("centroid_x") is None or frame_data.get("centroid_y") is None:
+        return None
+    return frame_data["centroid_x"], frame_data["centroid_y"]
+
+
+def interpolate_frame(
+    frame_number: int,
+    before: Optional[Dict[str, Any]],
+    after: Optional[Dict[str, Any]],
+    rois: List[ROI],
+) -> Dict[str, Any]:
+    """Frame data for a skipped frame between the keyframes before and after (after may be None)."""
+    start = _centroid(before)
+    end = _centroid(after) if after is not None else start
+    centroid = None
+    if start is not None and end is not None:
+        if after is None:
+            centroid = start
+        else:
+            t = (frame_number - before["frame_number"]) / (after["frame_number"] - before["frame_number"])
+            centroid = (start[0] + (end[0] - start[0]) * t, start[1] + (end[1] - start[1]) * t)
+
+    roi_index = None
+    if centroid is not None and rois:
+        roi_index = get_roi_containing_point((int(centroid[0]), int(centroid[1])), rois)
+    return {
+        "frame_number": frame_number,
+        "centroid_x": float(centroid[0]) if centroid else None,
+        "centroid_y": float(centroid[1]) if centroid else None,
+        "roi": f"roi_{roi_index}" if roi_index is not None else None,
+        "roi_index": roi_index,
+        "detection_method": "interpolated" if centroid else "none",
+    }
+
+
+class FrameSampler:
+    """Keyframe selection (inference side) and gap filling (postprocess side)."""
+
+    def __init__(
+        self,
+        mode: str = "every_frame",
+        stride: int = 1,
+        max_stride: int = DEFAULT_MAX_STRIDE,
+        rois: Optional[List[ROI]] = None,
+        start_frame: int = 0,
+        last_frame: Optional[int] = None,
+        state: Optional[Dict[str, Any]] = None,
+    ):
+        """last_frame (usually total_frames - 1) is always inferred so the tail is not
+        extrapolated. state is a `state()` snapshot to continue from (checkpoint resume)."""
+        if mode not in SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling mode: {mode}")
+        self.mode = mode
+        self._fixed_stride = max(1, stride) if mode == "stride" else 1
+        self._max_stride = max(1, max_stride)
+        self._rois = rois or []
+        self._last_frame = last_frame
+
+        # Inference side
+        anchor = (state or {}).get("anchor")
+        self._stride = (state or {}).get("stride", self._fixed_stride)
+        self._observed = anchor
+        self._origin = anchor["frame_number"] if anchor else start_frame
+        self._next_keyframe = anchor["frame_number"] + self._stride if anchor else start_frame
+
+        # Postprocess side: last emitted keyframe and the stride chosen after it
+        self._anchor = anchor
+        self._anchor_stride = self._stride
+        self.inferred = 0
+        self.interpolated = 0
+
+    @property
+    def sampling(self) -> bool:
+        return self.mode != "every_frame"
+
+    # --- decode side ---
+
+    def must_decode(self, frame_number: int) -> bool:
+        """False only for frames that are certain to be skipped (stride mode)."""
+        if self.mode != "stride" or frame_number == self._last_frame:
+            return True
+        return (frame_number - self._origin) % self._fixed_stride == 0
+
+    # --- inference side ---
+
+    def select(self, frame_number: int) -> bool:
+        """Call once per frame, in order: whether the frame is inferred."""
+        if frame_number >= self._next_keyframe or frame_number == self._last_frame:
+            self._next_keyframe = frame_number + self._stride
+            return True
+        return False
+
+    def observe(self, frame_data: Dict[str, Any]) -> int:
+        """Record an inferred keyframe (in order). Returns the stride used after it."""
+        if self.mode == "adaptive":
+            previous, current = _centroid(self._observed), _centroid(frame_data)
+            if previous is None or current is None:
+                self._stride = 1
+            else:
+                gap = frame_data["frame_number"] - self._observed["frame_number"]
+                speed = math.hypot(current[0] - previous[0], current[1] - previous[1]) / max(1, gap)
+                target = ADAPTIVE_MAX_GAP_PX / speed if speed > 0 else self._max_stride
+                self._stride = int(max(1, min(self._stride * 2, target, self._max_stride)))
+            self._next_keyframe = frame_data["frame_number"] + self._stride
+        self._observed = frame_data
+        return self._stride
+
+    # --- postprocess side ---
+
+    def fill(self, frame_numbers: List[int], keyframe: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Frame data for skipped frames preceding keyframe (None: end of video)."""
+        self.interpolated += len(frame_numbers)
+        return [interpolate_frame(n, self._anchor, keyframe, self._rois) for n in frame_numbers]
+
+    def emit(self, keyframe: Dict[str, Any], stride: int) -> None:
+        """The keyframe was handed to postprocessing; it anchors the next gap."""
+        self._anchor = keyframe
+        self._anchor_stride = stride
+        self.inferred += 1
+
+    def state(self) -> Dict[str, Any]:
+        """Snapshot as of the last emitted keyframe, for checkpoints."""
+        if not self.sampling or self._anchor is None:
+            return {}
+        return {"anchor": self._anchor, "stride": self._anchor_stride}
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "stride": self._anchor_stride,
+            "inferred_frames": self.inferred,
+            "interpolated_frames": self.interpolated,
+        }
@@ -0,0 +1,228 @@
+"""Multi-process sharded tracking of a single video.
+
+The frame range is split into N contiguous shards. Each shard is tracked in
+its own spawned worker process with its own model instance, so a long video
+uses as many cores as there are shards instead of a single task thread.
+
+Workers write their per-frame results to one JSONL file per shard and report
+progress through a shared counter array. The parent merges the shard files by
+frame_number into the task's results stream.
+
+Every worker seeks once to its shard start; OpenCV decodes forward from the
+preceding keyframe, so frame numbering and timestamps stay exact.
+"""
+
+import heapq
+import json
+import multiprocessing as mp
+import os
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.models.schemas import ROI
+
+Shard = Tuple[int, int]  # [start_frame, end_frame)
+
+PROGRESS_POLL_SEC = 0.5
+
+
+@dataclass
+class ShardConfig:
+    """Everything a worker process needs; must stay picklable."""
+
+    video_path: str
+    model_path: str
+    rois: List[ROI]
+    confidence_threshold: float
+    iou_threshold: float
+    device: str
+    inference_size: int
+    batch_size: int
+    model_name: str
+    background_frame: Optional[np.ndarray]
+    torch_threads: int = 1
+    roi_crop_padding: Optional[int] = None  # None = full-frame inference, else see roi_crop_box
+    motion_gate_threshold: Optional[float] = None  # None = infer every frame, else see MotionGate
+    search_window_size: Optional[int] = None  # None = full-frame tracking, else see SearchWindow
+    search_window_min_confidence: float = 0.5
+
+
+def plan_shards(total_frames: int, num_shards: int) -> List[Shard]:
+    """Split [0, total_frames) into at most num_shards contiguous, near-equal ranges."""
+    num_shards = max(1, min(num_shards, total_frames))
+    bounds = np.linspace(0, total_frames, num_shards + 1).astype(int)
+    return [(int(bounds[i]), int(bounds[i + 1])) for i in range(num_shards) if bounds[i + 1] > bounds[i]]
+
+
+def _read_shard_file(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def merge_shard_results(paths: List[str]) -> Iterator[Dict[str, Any]]:
+    """Merge per-shard JSONL files into one frame stream ordered by frame_number."""
+    return heapq.merge(*(_read_shard_file(p) for p in paths), key=lambda d: d["frame_number"])
+
+
+def _shard_worker(
+    shard_index: int,
+    shard: Shard,
+    config: ShardConfig,
+    out_path: str,
+    progress,
+    stop_event,
+    errors,
+) -> None:
+    """Worker process entry point: track frames [start, end) into out_path."""
+    cap = None
+    try:
+        import cv2
+        import torch
+        from ultralytics import YOLO
+
+        from app.processing.detection import TemplateMatcher
+        from app.processing.motion_gate import MotionGate
+        from app.processing.tracking import SearchWindow, create_roi_mask, process_frames_batch, roi_crop_box
+
+        # One model per process; keep intra-op threads to this worker's share
+        torch.set_num_threads(max(1, config.torch_threads))
+
+        model = YOLO(config.model_path)
+        if config.device != "cpu":
+            model.to(config.device)
+
+        start, end = shard
+        cap = cv2.VideoCapture(config.video_path)
+        if not cap.isOpened():
+            raise RuntimeError(f"Failed to open video file: {config.video_path}")
+        if start > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+        frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        roi_mask = create_roi_mask(config.rois, (frame_height, frame_width)) if config.rois else None
+        crop_box = roi_crop_box(roi_mask, config.roi_crop_padding) if config.roi_crop_padding is not None else None
+        gate = MotionGate(roi_mask, config.motion_gate_threshold) if config.motion_gate_threshold is not None else None
+        template_matcher = None
+        if config.background_frame is not None:
+            template_matcher = TemplateMatcher(config.background_frame, roi_mask=roi_mask)
+        search_window = None
+        if config.search_window_size is not None:
+            search_window = SearchWindow(config.search_window_size, config.search_window_min_confidence)
+
+        def infer(frame_numbers, frames):
+            return process_frames_batch(
+                frames=frames,
+                frame_numbers=frame_numbers,
+                model=model,
+                background_frame=config.background_frame,
+                rois=config.rois,
+                roi_mask=roi_mask,
+                confidence_threshold=config.confidence_threshold,
+                iou_threshold=config.iou_threshold,
+                device=config.device,
+                inference_size=config.inference_size,
+                model_name=config.model_name,
+                crop_box=crop_box,
+                search_window=search_window,
+                template_matcher=template_matcher,
+            )
+
+        frame_number = start
+        batch_size = max(1, config.batch_size)
+        with open(out_path, "w") as out:
+            while frame_number < end and not stop_event.is_set():
+                frames = []
+                timestamps = []
+                while len(frames) < batch_size and frame_number + len(frames) < end:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    frames.append(frame)
+                    timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+                if not frames:
+                    break
+
+                frame_numbers = list(range(frame_number, frame_number + len(frames)))
+                if gate is not None:
+                    batch_data = gate.infer(frame_numbers, frames, infer)
+                else:
+                    batch_data = infer(frame_numbers, frames)
+                for frame_data, timestamp_sec in zip(batch_data, timestamps):
+                    frame_data["timestamp_sec"] = timestamp_sec
+                    out.write(json.dumps(frame_data) + "\n")
+
+                frame_number += len(frames)
+                progress[shard_index] = frame_number - start
+    except BaseException:
+        errors.put((shard_index, traceback.format_exc()))
+        raise
+    finally:
+        if cap is not None:
+            cap.release()
+
+
+def run_sharded_tracking(
+    config: ShardConfig,
+    shards: List[Shard],
+    work_dir: str,
+    task_id: str,
+    on_progress: Callable[[List[int]], None],
+    stop_requested: Callable[[], bool] = lambda: False,
+) -> List[str]:
+    """Track every shard in its own process and wait for all of them.
+
+    on_progress receives the per-shard processed-frame counts every
+    PROGRESS_POLL_SEC. Returns the shard result files in shard order; raises
+    RuntimeError if any worker failed.
+    """
+    ctx = mp.get_context("spawn")  # fork is unsafe once torch/OpenCV threads exist
+    progress = ctx.Array("q", len(shards), lock=False)
+    stop_event = ctx.Event()
+    errors = ctx.Queue()
+
+    paths = [os.path.join(work_dir, f"{task_id}_shard{i:02d}.jsonl") for i in range(len(shards))]
+    workers = [
+        ctx.Process(
+            target=_shard_worker,
+            args=(i, shard, config, paths[i], progress, stop_event, errors),
+            daemon=True,
+        )
+        for i, shard in enumerate(shards)
+    ]
+    for w in workers:
+        w.start()
+
+    failures = []
+    try:
+        while any(w.is_alive() for w in workers):
+            while not errors.empty():
+                failures.append(errors.get())
+            # One failed shard fails the task: stop the others instead of finishing work that is discarded
+            crashed = any(w.exitcode not in (None, 0) for w in workers)
+            if failures or crashed or stop_requested():
+                stop_event.set()
+            on_progress(list(progress))
+            time.sleep(PROGRESS_POLL_SEC)
+    finally:
+        stop_event.set()
+        for w in workers:
+            w.join()
+    on_progress(list(progress))
+
+    while not errors.empty():
+        failures.append(errors.get())
+    for i, w in enumerate(workers):
+        if w.exitcode != 0 and not any(idx == i for idx, _ in failures):
+            failures.append((i, f"exit code {w.exitcode}"))
+    if failures:
+        idx, detail = sorted(failures)[0]
+        raise RuntimeError(f"Shard {idx} failed: {detail.strip().splitlines()[-1]}")
+
+    return paths
@@ -2,15 +2,21 @@
 
 import cv2
 import gc
+import math
 import numpy as np
 import torch
+from dataclasses import dataclass
 from typing import Optional, List, Dict, Any
 from ultralytics import YOLO
 
 from app.models.schemas import ROI
-from app.processing.detection import calculate_centroid, template_matching
+from app.processing.background import estimate_background
+from app.processing.detection import TemplateMatcher, calculate_centroid
 
 Point = tuple[int, int]
+CropBox = tuple[int, int, int, int]  # (x1, y1, x2, y2), x2/y2 exclusive
+
+CROP_SIZE_MULTIPLE = 32  # YOLO input sizes must be multiples of the model stride
 
 
 def get_gpu_memory_info() -> Dict[str, float]:
@@ -104,6 +110,103 @@ def create_roi_mask(rois: List[ROI], frame_shape: tuple[int, int]) -> Optional[n
 
     return mask
 
+
+def roi_crop_box(roi_mask: Optional[np.ndarray], padding: int = 0) -> Optional[CropBox]:
+    """
+    Bounding box of the union of the ROIs, grown by padding and clipped to the frame.
+
+    Args:
+        roi_mask: Mask from create_roi_mask
+        padding: Pixels added on every side
+
+    Returns:
+        (x1, y1, x2, y2), or None if there is no mask or the box is the whole
+        frame (nothing to crop)
+    """
+    if roi_mask is None or not roi_mask.any():
+        return None
+    height, width = roi_mask.shape[:2]
+    x, y, w, h = cv2.boundingRect(roi_mask)
+    box = (max(0, x - padding), max(0, y - padding),
+           min(width, x + w + padding), min(height, y + h + padding))
+    if box == (0, 0, width, height):
+        return None
+    return box
+
+
+def crop_inference_size(crop_box: CropBox, frame_shape: tuple[int, int], inference_size: int) -> int:
+    """
+    YOLO image size for a crop that keeps the scale of full-frame inference.
+
+    The crop is resized by the same factor the whole frame would have been, so
+    objects cover as many input pixels as before while the input is smaller.
+    """
+    x1, y1, x2, y2 = crop_box
+    scale = inference_size / max(frame_shape[:2])
+    size = math.ceil(max(x2 - x1, y2 - y1) * scale / CROP_SIZE_MULTIPLE) * CROP_SIZE_MULTIPLE
+    return max(CROP_SIZE_MULTIPLE, min(size, inference_size))
+
+
+def _offset_detection(detection: tuple, dx: int, dy: int) -> tuple:
+    """Map a (centroid, mask_data, keypoints_data) detection from crop to frame coordinates."""
+    centroid, mask_data, keypoints_data = detection
+    if centroid is None:
+        return detection
+    centroid = (centroid[0] + dx, centroid[1] + dy)
+    if mask_data is not None:
+        mask_data = [[x + dx, y + dy] for x, y in mask_data]
+    if keypoints_data is not None:
+        keypoints_data = [{**kpt, "x": kpt["x"] + dx, "y": kpt["y"] + dy} for kpt in keypoints_data]
+    return centroid, mask_data, keypoints_data
+
+
+@dataclass
+class SearchWindow:
+    """
+    Search-window tracking state: where to look for the animal in the next batch.
+
+    Once the animal has been found, YOLO first runs on a size x size window
+    centred on its last centroid (at the image size that keeps the full-frame
+    scale, see crop_inference_size). Frames where the window gives no detection,
+    or one below min_confidence, are re-run on the full frame. When the last
+    frame of a batch has no YOLO detection the centre is cleared, so the next
+    batch starts from the full frame again.
+    """
+
+    size: int = 320
+    min_confidence: float = 0.5
+    center: Optional[Point] = None
+    window_hits: int = 0
+    fallbacks: int = 0
+
+    def box(self, frame_shape: tuple[int, int]) -> Optional[CropBox]:
+        """Window around the last centroid, shifted inside the frame; None: search the full frame."""
+        height, width = frame_shape[:2]
+        if self.center is None or (self.size >= width and self.size >= height):
+            return None
+        w, h = min(self.size, width), min(self.size, height)
+        x1 = min(max(0, int(self.center[0]) - w // 2), width - w)
+        y1 = min(max(0, int(self.center[1]) - h // 2), height - h)
+        return x1, y1, x1 + w, y1 + h
+
+    def update(self, results: List[Dict[str, Any]]) -> None:
+        """Follow the last frame of a processed batch if YOLO found the animal there."""
+        last = results[-1] if results else None
+        # Template-matching positions are not followed: YOLO missed the animal there anyway
+        if last is not None and last["detection_method"] == "yolo" and last["centroid_x"] is not None:
+            self.center = (int(last["centroid_x"]), int(last["centroid_y"]))
+        else:
+            self.center = None
+
+    def stats(self) -> dict:
+        searched = self.window_hits + self.fallbacks
+        return {
+            "window_hits": self.window_hits,
+            "full_frame_fallbacks": self.fallbacks,
+            "hit_rate": round(self.window_hits / searched, 4) if searched else 0.0,
+        }
+
+
 def point_in_roi(point: Point, roi: ROI) -> bool:
     """
     Check if a point is inside an ROI.
@@ -198,190 +301,226 @@ def draw_rois(frame: np.ndarray, rois: List[ROI], color: tuple = (0, 255, 0),
             cv2.polylines(frame, [points], True, roi_color, thickness)
 
 
-def process_frame(
-    frame: np.ndarray,
-    frame_number: int,
+def _run_yolo(
     model: YOLO,
-    background_frame: Optional[np.ndarray],
-    rois: List[ROI],
-    roi_mask: Optional[np.ndarray],
+    source,
     confidence_threshold: float,
     iou_threshold: float,
     device: str,
-    inference_size: int = 640,
-    model_name: str = "",
-) -> Dict[str, Any]:
+    inference_size: int,
+):
+    """Run one Ultralytics predictor call on a frame or a list of frames."""
+    # Use torch.cuda.amp.autocast for more efficient GPU memory usage
+    if device == "cuda":
+        with torch.amp.autocast(device_type="cuda"):
+            return model(
+                source,
+                verbose=False,
+                conf=confidence_threshold,
+                iou=iou_threshold,
+                device=device,
+                imgsz=inference_size,
+                half=True,  # Use FP16 on CUDA to save memory
+            )
+    return model(
+        source,
+        verbose=False,
+        conf=confidence_threshold,
+        iou=iou_threshold,
+        device=device,
+        imgsz=inference_size,
+        half=False,
+    )
+
+
+def _mask_contour_points(binary_mask: np.ndarray) -> Optional[List[List[int]]]:
+    """Simplified outline of the largest blob in a binary mask, as [[x, y], ...]."""
+    contours, _ = cv2.findContours(binary_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    # Get largest contour
+    largest_contour = max(contours, key=cv2.contourArea)
+    # Simplify contour and convert to list of points
+    epsilon = 0.005 * cv2.arcLength(largest_contour, True)
+    approx = cv2.approxPolyDP(largest_contour, epsilon, True)
+    return approx.reshape(-1, 2).tolist()
+
+
+def extract_batch_detections(
+    results,
+    frame_shape: tuple[int, int],
+    model_task: str = "detect",
+) -> List[tuple]:
     """
-    Process a single frame with YOLO detection and template matching fallback.
+    Pick the best detection of every image in a batch of Ultralytics results.
+
+    Boxes of the whole batch are concatenated and reduced in one pass, so the
+    per-image argmax, bbox centres, mask resizing/thresholding and keypoint
+    averaging run as array operations instead of once per frame.
 
     Args:
-        frame: Current video frame (BGR)
-        frame_number: Frame index (0-based)
-        model: YOLO model instance
-        background_frame: Background reference frame (grayscale)
-        rois: List of ROI objects
-        roi_mask: Binary ROI mask
-        confidence_threshold: YOLO confidence threshold (0.0-1.0)
-        iou_threshold: YOLO IOU threshold (0.0-1.0)
-        device: Device to run inference on ('cuda', 'mps', or 'cpu')
-        inference_size: YOLO inference image size (default: 640, smaller = less GPU memory)
-        model_name: Name of the YOLO model file (to detect seg/pose types)
+        results: List of Ultralytics Results (one per image)
+        frame_shape: (height, width) of the original frames
+        model_task: Ultralytics task ('detect', 'segment' or 'pose')
 
     Returns:
-        Dictionary with frame data:
-        {
-            "frame_number": int,
-            "centroid_x": float or None,
-            "centroid_y": float or None,
-            "roi": str or None,
-            "detection_method": "yolo"|"template"|"none",
-            "mask": list of mask points (if segmentation model),
-            "keypoints": list of keypoints (if pose model)
-        }
+        One (centroid, mask_data, keypoints_data) tuple per image; entries are
+        None where the image had no usable detection.
     """
-    centroid: Optional[Point] = None
-    detection_method = "none"
-    mask_data = None
-    keypoints_data = None
+    detections: List[tuple] = [(None, None, None) for _ in range(len(results))]
+
+    counts = [
+        len(r.boxes) if getattr(r, "boxes", None) is not None else 0
+        for r in results
+    ]
+    valid = [i for i, count in enumerate(counts) if count > 0]
+    if not valid:
+        return detections
+
+    valid_counts = np.array([counts[i] for i in valid])
+    confidences = torch.cat([results[i].boxes.conf for i in valid]).cpu().numpy()
+    owner = np.repeat(np.arange(len(valid)), valid_counts)
+
+    # Highest confidence per image; lexsort is stable so ties resolve to the
+    # first box, matching np.argmax on a single image.
+    order = np.lexsort((-confidences, owner))
+    first = np.concatenate(([0], np.flatnonzero(np.diff(owner[order])) + 1))
+    best_flat = order[first]
+    best_local = best_flat - np.concatenate(([0], np.cumsum(valid_counts)[:-1]))
 
-    # Detect model type from model task
-    # Standard Ultralytics YOLO models have a .task property
-    model_task = getattr(model, 'task', 'detect')
-    is_seg_model = model_task == 'segment'
-    is_pose_model = model_task == 'pose'
-
-    # Try YOLO detection first
-    try:
-        # Use torch.no_grad() to prevent memory accumulation
-        with torch.no_grad():
-            # Use torch.cuda.amp.autocast for more efficient GPU memory usage
-            if device == "cuda":
-                with torch.amp.autocast(device_type="cuda"):
-                    results = model(
-                        frame,
-                        verbose=False,
-                        conf=confidence_threshold,
-                        iou=iou_threshold,
-                        device=device,
-                        imgsz=inference_size,
-                        half=True,  # Use FP16 on CUDA to save memory
-                    )
-            else:
-                results = model(
-                    frame,
-                    verbose=False,
-                    conf=confidence_threshold,
-                    iou=iou_threshold,
-                    device=device,
-                    imgsz=inference_size,
-                    half=False,
-                )
-
-            # Check if we got any detections
-            if results and len(results) > 0:
-                boxes = results[0].boxes
-
-                if boxes is not None and len(boxes) > 0:
-                    confidences = boxes.conf.cpu().numpy()
-                    best_idx = np.argmax(confidences)
-
-                    # Process segmentation masks
-                    if is_seg_model and getattr(results[0], 'masks', None) is not None:
-                        masks = results[0].masks.data.cpu().numpy()
-
-                        if masks is not None and len(masks) > best_idx:
-                            mask = masks[best_idx]
-
-                            # Resize mask to frame size
-                            mask_resized = cv2.resize(mask, (frame.shape[1], frame.shape[0]))
-
-                            # Threshold mask to binary
-                            binary_mask = (mask_resized > 0.5).astype(np.uint8) * 255
-
-                            # Calculate centroid from mask
-                            centroid = calculate_centroid(binary_mask)
-
-                            if centroid is not None:
-                                detection_method = "yolo"
-
-                                # Save mask contours for visualization
-                                contours, _ = cv2.findContours(binary_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                                if contours:
-                                    # Get largest contour
-                                    largest_contour = max(contours, key=cv2.contourArea)
-                                    # Simplify contour and convert to list of points
-                                    epsilon = 0.005 * cv2.arcLength(largest_contour, True)
-                                    approx = cv2.approxPolyDP(largest_contour, epsilon, True)
-                                    mask_data = approx.reshape(-1, 2).tolist()
-
-                            # Explicitly delete mask tensors
-                            del masks, mask, mask_resized, binary_mask
-
-                    # Process pose keypoints
-                    elif is_pose_model and results[0].keypoints is not None:
-                        keypoints = results[0].keypoints.data.cpu().numpy()
-
-                        if len(keypoints) > 0:
-                            kpts = keypoints[best_idx]  # Shape: (num_keypoints, 3) - x, y, confidence
-
-                            # Calculate centroid from visible keypoints
-                            visible_kpts = kpts[kpts[:, 2] > 0.5]  # Filter by confidence
-                            if len(visible_kpts) > 0:
-                                centroid = (
-                                    int(np.mean(visible_kpts[:, 0])),
-                                    int(np.mean(visible_kpts[:, 1]))
-                                )
-                                detection_method = "yolo"
-
-                                # Save all keypoints with confidence > 0.3
-                                keypoints_data = [
-                                    {"x": float(kpt[0]), "y": float(kpt[1]), "conf": float(kpt[2])}
-                                    for kpt in kpts if kpt[2] > 0.3
-                                ]
-
-                            # Explicitly delete keypoints tensors
-                            del keypoints, kpts
-
-                    # Process regular detection (bbox only)
-                    elif not is_seg_model and not is_pose_model:
-                        # Use bounding box center as centroid
-                        box = boxes.xyxy[best_idx].cpu().numpy()
-                        x1, y1, x2, y2 = box
-                        centroid = (int((x1 + x2) / 2), int((y1 + y2) / 2))
-                        detection_method = "yolo"
-
-                # Explicitly delete results to free memory
-                del boxes, confidences
-
-            # Delete results object
-            del results
+    height, width = frame_shape
 
-            # Clear GPU cache periodically to prevent memory buildup
-            # More frequent cleanup: every 30 frames instead of 50
-            if device == "cuda" and frame_number % 30 == 0:
-                cleanup_gpu_memory(force=(frame_number % 150 == 0))
+    if model_task == "segment":
+        # Only images whose result carries masks are usable
+        seg_rows = [
+            row for row, i in enumerate(valid)
+            if getattr(results[i], "masks", None) is not None
+            and len(results[i].masks.data) > best_local[row]
+        ]
+        if not seg_rows:
+            return detections
+
+        masks = torch.stack([
+            results[valid[row]].masks.data[int(best_local[row])] for row in seg_rows
+        ]).cpu().numpy()
+
+        # Resize all masks in one call by stacking them as channels
+        stacked = np.ascontiguousarray(masks.transpose(1, 2, 0))
+        resized = cv2.resize(stacked, (width, height)).reshape(height, width, len(seg_rows))
+        binary_masks = (resized > 0.5).astype(np.uint8) * 255
+
+        for channel, row in enumerate(seg_rows):
+            binary_mask = np.ascontiguousarray(binary_masks[:, :, channel])
+            centroid = calculate_centroid(binary_mask)
+            if centroid is not None:
+                detections[valid[row]] = (centroid, _mask_contour_points(binary_mask), None)
+
+        # Explicitly delete mask arrays
+        del masks, stacked, resized, binary_masks
+
+    elif model_task == "pose":
+        pose_rows = [
+            row for row, i in enumerate(valid)
+            if getattr(results[i], "keypoints", None) is not None
+            and len(results[i].keypoints.data) > 0
+        ]
+        if not pose_rows:
+            return detections
+
+        # Shape: (batch, num_keypoints, 3) - x, y, confidence
+        kpts = torch.stack([
+            results[valid[row]].keypoints.data[int(best_local[row])] for row in pose_rows
+        ]).cpu().numpy()
+
+        # Calculate centroids from visible keypoints (confidence > 0.5)
+        visible = kpts[:, :, 2] > 0.5
+        visible_counts = visible.sum(axis=1)
+        safe_counts = np.maximum(visible_counts, 1)
+        mean_x = np.where(visible, kpts[:, :, 0], 0).sum(axis=1) / safe_counts
+        mean_y = np.where(visible, kpts[:, :, 1], 0).sum(axis=1) / safe_counts
+
+        for k, row in enumerate(pose_rows):
+            if visible_counts[k] == 0:
+                continue
+            centroid = (int(mean_x[k]), int(mean_y[k]))
+            # Save all keypoints with confidence > 0.3
+            keypoints_data = [
+                {"x": float(kpt[0]), "y": float(kpt[1]), "conf": float(kpt[2])}
+                for kpt in kpts[k] if kpt[2] > 0.3
+            ]
+            detections[valid[row]] = (centroid, None, keypoints_data)
+
+        del kpts
+
+    else:
+        # Regular detection (bbox only): use bounding box center as centroid
+        boxes = torch.cat([results[i].boxes.xyxy for i in valid]).cpu().numpy()[best_flat]
+        centers = ((boxes[:, :2] + boxes[:, 2:]) / 2).astype(int)
+        for row, i in enumerate(valid):
+            detections[i] = ((int(centers[row, 0]), int(centers[row, 1])), None, None)
+
+    return detections
+
+
+def _detect_batch(
+    frames: List[np.ndarray],
+    model: YOLO,
+    model_task: str,
+    confidence_threshold: float,
+    iou_threshold: float,
+    device: str,
+    inference_size: int,
+    crop_box: Optional[CropBox] = None,
+) -> tuple[List[tuple], List[Optional[float]]]:
+    """
+    One YOLO call over frames (or their crop_box region) and the best detection of each.
 
-    except Exception as e:
-        print(f"YOLO detection failed for frame {frame_number}: {e}")
-        # Cleanup on error
-        if device == "cuda":
-            cleanup_gpu_memory(force=True)
+    Returns:
+        (detections, confidences): detections as in extract_batch_detections,
+        in full-frame coordinates; confidence of the best box per frame, or None
+    """
+    yolo_frames = frames
+    yolo_size = inference_size
+    if crop_box is not None:
+        x1, y1, x2, y2 = crop_box
+        yolo_frames = [frame[y1:y2, x1:x2] for frame in frames]
+        yolo_size = crop_inference_size(crop_box, frames[0].shape[:2], inference_size)
+
+    source = yolo_frames[0] if len(yolo_frames) == 1 else list(yolo_frames)
+    results = _run_yolo(
+        model, source, confidence_threshold, iou_threshold, device, yolo_size
+    )
+
+    detections: List[tuple] = [(None, None, None) for _ in frames]
+    confidences: List[Optional[float]] = [None for _ in frames]
+    if results and len(results) > 0:
+        detections = extract_batch_detections(results, yolo_frames[0].shape[:2], model_task)
+        if crop_box is not None:
+            detections = [_offset_detection(d, crop_box[0], crop_box[1]) for d in detections]
+        confidences = [
+            float(r.boxes.conf.max()) if getattr(r, "boxes", None) is not None and len(r.boxes) > 0 else None
+            for r in results
+        ]
+
+    # Delete results object
+    del results
+    return detections, confidences
+
+
+def _finalize_frame_result(
+    frame_number: int,
+    detection: tuple,
+    template_centroid: Optional[Point],
+    rois: List[ROI],
+) -> Dict[str, Any]:
+    """Apply the template-matching fallback and ROI lookup to one detection."""
+    centroid, mask_data, keypoints_data = detection
+    detection_method = "yolo" if centroid is not None else "none"
 
     # Fallback to template matching if YOLO failed
-    if centroid is None and background_frame is not None:
-        try:
-            centroid = template_matching(
-                frame,
-                background_frame,
-                roi_mask=roi_mask,
-                threshold=25,
-            )
-
-            if centroid is not None:
-                detection_method = "template"
-
-        except Exception as e:
-            print(f"Template matching failed for frame {frame_number}: {e}")
+    if centroid is None and template_centroid is not None:
+        centroid = template_centroid
+        detection_method = "template"
 
     # Determine which ROI the centroid is in (if any)
     roi_index = None
@@ -411,61 +550,279 @@ def process_frame(
     return result
 
 
-def calculate_background(video_path: str, sample_frames: int = 100) -> Optional[np.ndarray]:
+def process_frames_batch(
+    frames: List[np.ndarray],
+    frame_numbers: List[int],
+    model: YOLO,
+    background_frame: Optional[np.ndarray],
+    rois: List[ROI],
+    roi_mask: Optional[np.ndarray],
+    confidence_threshold: float,
+    iou_threshold: float,
+    device: str,
+    inference_size: int = 640,
+    model_name: str = "",
+    crop_box: Optional[CropBox] = None,
+    search_window: Optional[SearchWindow] = None,
+    template_matcher: Optional[TemplateMatcher] = None,
+) -> List[Dict[str, Any]]:
     """
-    Calculate median background frame from video using frames from the middle section.
-    Uses seeking (cap.set) for high performance instead of sequential reading.
+    Process a batch of frames with one YOLO call and template matching fallback.
+
+    All frames go through a single Ultralytics predictor call, which amortises
+    pre/post-processing and the tensor-to-NumPy transfer over the batch. Frames
+    must share the same shape (consecutive frames of one video).
+
+    With crop_box (see roi_crop_box), YOLO only sees that part of each frame,
+    at the size given by crop_inference_size; detections are mapped back to
+    full-frame coordinates. Template matching still uses the whole frame.
+
+    With search_window, YOLO first looks around the last known centroid and
+    only frames without a confident detection there go through the full
+    frame (or crop_box) call. The window is moved after the batch.
+
+    Frames YOLO missed fall back to template_matcher; pass one built once per
+    task (otherwise a TemplateMatcher is built from background_frame and
+    roi_mask for this call).
 
     Args:
-        video_path: Path to video file
-        sample_frames: Number of frames to sample (default: 100)
+        frames: Video frames (BGR), all of the same shape
+        frame_numbers: Frame index (0-based) of every frame
+        (remaining arguments as in process_frame)
 
     Returns:
-        Grayscale background frame (uint8) or None if failed
+        One frame data dictionary per input frame, in input order
+        (see process_frame for the layout)
     """
-    cap = cv2.VideoCapture(video_path)
+    detections: List[tuple] = [(None, None, None) for _ in frames]
 
-    if not cap.isOpened():
-        return None
+    # Detect model type from model task
+    # Standard Ultralytics YOLO models have a .task property
+    model_task = getattr(model, 'task', 'detect')
 
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    if total_frames <= 0:
-        # Fallback for videos where frame count is not reported
-        cap.set(cv2.CAP_PROP_POS_FRAMES, 1e9)
-        total_frames = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
-        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-        
-    if total_frames <= 0:
-        cap.release()
-        return None
+    # Try YOLO detection first
+    try:
+        # Use torch.no_grad() to prevent memory accumulation
+        with torch.no_grad():
+            pending = list(range(len(frames)))
+
+            window = search_window.box(frames[0].shape[:2]) if search_window is not None else None
+            if window is not None:
+                found, confidences = _detect_batch(
+                    frames, model, model_task, confidence_threshold, iou_threshold, device,
+                    inference_size, crop_box=window,
+                )
+                for i, (detection, confidence) in enumerate(zip(found, confidences)):
+                    if detection[0] is not None and confidence is not None and confidence >= search_window.min_confidence:
+                        detections[i] = detection
+                pending = [i for i in pending if detections[i][0] is None]
+                search_window.window_hits += len(frames) - len(pending)
+                search_window.fallbacks += len(pending)
+
+            if pending:
+                found, _ = _detect_batch(
+                    [frames[i] for i in pending], model, model_task, confidence_threshold,
+                    iou_threshold, device, inference_size, crop_box=crop_box,
+                )
+                for i, detection in zip(pending, found):
+                    detections[i] = detection
 
-    # Use middle 50% of video (from 25% to 75%)
-    start_frame = int(total_frames * 0.25)
-    end_frame = int(total_frames * 0.75)
-    middle_frames_count = end_frame - start_frame
+            # Clear GPU cache periodically to prevent memory buildup
+            # More frequent cleanup: every 30 frames instead of 50
+            if device == "cuda":
+                for frame_number in frame_numbers:
+                    if frame_number % 30 == 0:
+                        cleanup_gpu_memory(force=(frame_number % 150 == 0))
+                        break
 
-    # Calculate indices to sample
-    indices = np.linspace(start_frame, end_frame, sample_frames, dtype=int)
+    except Exception as e:
+        if len(frame_numbers) == 1:
+            print(f"YOLO detection failed for frame {frame_numbers[0]}: {e}")
+        else:
+            print(f"YOLO detection failed for frames {frame_numbers[0]}-{frame_numbers[-1]}: {e}")
+        # Cleanup on error
+        if device == "cuda":
+            cleanup_gpu_memory(force=True)
 
-    frames = []
-    print(f"Calculating background from {len(indices)} frames...")
-    
-    for idx in indices:
-        cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
-        ret, frame = cap.read()
-        if not ret:
-            continue
-            
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        frames.append(gray)
+    # Template-matching fallback for the frames YOLO missed
+    template_centroids: Dict[int, Optional[Point]] = {}
+    missing = [i for i, detection in enumerate(detections) if detection[0] is None]
+    if missing and template_matcher is None and background_frame is not None:
+        template_matcher = TemplateMatcher(background_frame, roi_mask=roi_mask, threshold=25)
+    if missing and template_matcher is not None:
+        try:
+            template_centroids = dict(zip(missing, template_matcher.match_batch([frames[i] for i in missing])))
+        except Exception as e:
+            print(f"Template matching failed for frames {frame_numbers[missing[0]]}-{frame_numbers[missing[-1]]}: {e}")
 
-    cap.release()
+    results = [
+        _finalize_frame_result(frame_number, detection, template_centroids.get(i), rois)
+        for i, (frame_number, detection) in enumerate(zip(frame_numbers, detections))
+    ]
+    if search_window is not None:
+        search_window.update(results)
+    return results
 
-    if not frames:
-        return None
 
-    # Calculate median background
-    # Use float32 for median calculation to avoid precision issues
-    background = np.median(np.array(frames, dtype=np.float32), axis=0).astype(np.uint8)
+def process_frame(
+    frame: np.ndarray,
+    frame_number: int,
+    model: YOLO,
+    background_frame: Optional[np.ndarray],
+    rois: List[ROI],
+    roi_mask: Optional[np.ndarray],
+    confidence_threshold: float,
+    iou_threshold: float,
+    device: str,
+    inference_size: int = 640,
+    model_name: str = "",
+    crop_box: Optional[CropBox] = None,
+    search_window: Optional[SearchWindow] = None,
+    template_matcher: Optional[TemplateMatcher] = None,
+) -> Dict[str, Any]:
+    """
+    Process a single frame with YOLO detection and template matching fallback.
+
+    Args:
+        frame: Current video frame (BGR)
+        frame_number: Frame index (0-based)
+        model: YOLO model instance
+        background_frame: Background reference frame (grayscale)
+        rois: List of ROI objects
+        roi_mask: Binary ROI mask
+        confidence_threshold: YOLO confidence threshold (0.0-1.0)
+        iou_threshold: YOLO IOU threshold (0.0-1.0)
+        device: Device to run inference on ('cuda', 'mps', or 'cpu')
+        inference_size: YOLO inference image size (default: 640, smaller = less GPU memory)
+        model_name: Name of the YOLO model file (to detect seg/pose types)
+        crop_box: Run YOLO on this region only (see roi_crop_box)
+        search_window: Look around the previous centroid first (see SearchWindow)
+        template_matcher: Reusable template-matching fallback (see TemplateMatcher)
+
+    Returns:
+        Dictionary with frame data:
+        {
+            "frame_number": int,
+            "centroid_x": float or None,
+            "centroid_y": float or None,
+            "roi": str or None,
+            "detection_method": "yolo"|"template"|"none",
+            "mask": list of mask points (if segmentation model),
+            "keypoints": list of keypoints (if pose model)
+        }
+    """
+    return process_frames_batch(
+        [frame],
+        [frame_number],
+        model=model,
+        background_frame=background_frame,
+        rois=rois,
+        roi_mask=roi_mask,
+        confidence_threshold=confidence_threshold,
+        iou_threshold=iou_threshold,
+        device=device,
+        inference_size=inference_size,
+        model_name=model_name,
+        crop_box=crop_box,
+        search_window=search_window,
+        template_matcher=template_matcher,
+    )[0]
+
+
+def draw_tracking_overlay(
+    frame: np.ndarray,
+    frame_data: Dict[str, Any],
+    rois: List[ROI],
+    frame_number: int,
+    total_frames: int,
+) -> np.ndarray:
+    """
+    Draw the live-preview overlay (ROIs, mask, keypoints, centroid, labels) in place.
+
+    Args:
+        frame: Frame to draw on (BGR); pass a copy to keep the original intact
+        frame_data: Result dictionary returned by process_frame
+        rois: List of ROI objects
+        frame_number: Frame index shown in the overlay
+        total_frames: Total number of frames in the video
+
+    Returns:
+        The same frame, for convenience
+    """
+    # Draw ROIs with active ROI highlighting
+    active_roi_index = frame_data.get("roi_index")
+    draw_rois(frame, rois, color=(0, 255, 0), thickness=2, active_roi_index=active_roi_index)
+
+    # Draw centroid if detected
+    if frame_data["centroid_x"] is not None and frame_data["centroid_y"] is not None:
+        cx = int(frame_data["centroid_x"])
+        cy = int(frame_data["centroid_y"])
+
+        # Draw segmentation mask if available
+        if "mask" in frame_data and frame_data["mask"]:
+            mask_points = np.array(frame_data["mask"], dtype=np.int32)
+            # Draw filled polygon with transparency
+            overlay = frame.copy()
+            cv2.fillPoly(overlay, [mask_points], (0, 255, 255))  # Cyan color
+            cv2.addWeighted(overlay, 0.3, frame, 0.7, 0, frame)
+            # Draw contour
+            cv2.polylines(frame, [mask_points], True, (0, 255, 255), 2)
+
+        # Draw pose keypoints if available
+        if "keypoints" in frame_data and frame_data["keypoints"]:
+            for i, kpt in enumerate(frame_data["keypoints"]):
+                kx, ky = int(kpt["x"]), int(kpt["y"])
+                conf = kpt["conf"]
+
+                # Color based on confidence (green = high, yellow = medium, red = low)
+                if conf > 0.7:
+                    color = (0, 255, 0)  # Green
+                elif conf > 0.5:
+                    color = (0, 255, 255)  # Yellow
+                else:
+                    color = (0, 165, 255)  # Orange
+
+                # Draw keypoint
+                cv2.circle(frame, (kx, ky), 5, color, -1)
+                cv2.circle(frame, (kx, ky), 7, (255, 255, 255), 1)
+
+                # Draw keypoint index
+                cv2.putText(frame, str(i), (kx + 10, ky),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+
+        # Draw centroid as circle (red with white border)
+        cv2.circle(frame, (cx, cy), 10, (0, 0, 255), -1)
+        cv2.circle(frame, (cx, cy), 15, (255, 255, 255), 2)
+
+        # Draw detection method text
+        method_text = f"Method: {frame_data['detection_method']}"
+        cv2.putText(frame, method_text, (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+        # Draw ROI info if animal is in a ROI
+        if frame_data.get("roi"):
+            roi_text = f"In {frame_data['roi'].upper()}"
+            cv2.putText(frame, roi_text, (10, 90),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+
+    # Draw frame number
+    cv2.putText(frame, f"Frame: {frame_number}/{total_frames}", (10, 60),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+    return frame
 
-    return background
+
+def calculate_background(video_path: str, sample_frames: int = 100) -> Optional[np.ndarray]:
+    """
+    Calculate median background frame from video using frames from the middle section.
+    Reads the section in one sequential pass (see app.processing.background); use
+    `cached_background` there to reuse the result across runs.
+
+    Args:
+        video_path: Path to video file
+        sample_frames: Number of frames to sample (default: 100)
+
+    Returns:
+        Grayscale background frame (uint8) or None if failed
+    """
+    return estimate_background(video_path, sample_frames)
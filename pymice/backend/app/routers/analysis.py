@@ -1,6 +1,6 @@
 """Analysis API endpoints"""
 
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File
 from fastapi.responses import StreamingResponse, FileResponse
 import numpy as np
 import matplotlib
@@ -18,11 +18,21 @@ import os
 import base64
 from pathlib import Path
 from datetime import datetime
+from typing import Literal, Optional
 from PIL import Image
 
+from app.processing.column_store import is_column_store
+from app.processing.columnar import columnar_to_document, load_columnar
+from app.services.dataset_cache import (
+    dataset_cache,
+    dataset_from_document,
+    dataset_from_file,
+    dataset_from_frames,
+)
 from app.models.schemas import (
     ApiResponse,
     HeatmapRequest,
+    HeatmapSettings,
     TrackingData,
     OpenFieldAnalysisRequest,
     VideoExportRequest
@@ -32,6 +42,54 @@ router = APIRouter()
 TEMP_DIR = Path("temp/analysis")
 TEMP_DIR.mkdir(parents=True, exist_ok=True)
 
+# /movement takes no settings; these are the HeatmapSettings defaults it reads
+MOVEMENT_SETTINGS = HeatmapSettings(resolution=50, colormap="hot", transparency=0.6)
+
+
+def resolve_results_path(file_path: str) -> Path:
+    """Path of a results file on the server (absolute, or relative to the working directory)."""
+    path = Path(file_path)
+    if not path.exists():
+        # Try relative to current directory
+        path = Path(os.getcwd()) / file_path
+
+    if not path.exists():
+        raise HTTPException(status_code=404, detail=f"File not found: {file_path}")
+
+    # Verify it's a JSON file, columnar results or a column store directory
+    if is_column_store(str(path)):
+        return path
+    if path.suffix.lower() not in ('.json', '.npz'):
+        raise HTTPException(status_code=400, detail="Only JSON, .npz and column store results are supported")
+    return path
+
+
+def get_dataset(tracking_data: Optional[TrackingData] = None, dataset_id: Optional[str] = None):
+    """Centroid arrays of a registered dataset, or of tracking_data posted with the request."""
+    if dataset_id:
+        dataset = dataset_cache.get(dataset_id)
+        if dataset is None:
+            load = dataset_cache.load_status(dataset_id)
+            if load is not None and load.status == "loading":
+                raise HTTPException(status_code=409, detail=f"Dataset is still loading ({load.info()['percentage']}%)")
+            if load is not None and load.status == "error":
+                raise HTTPException(status_code=400, detail=f"Dataset failed to load: {load.error}")
+            raise HTTPException(status_code=404, detail=f"Dataset not found (expired?): {dataset_id}")
+        return dataset
+    if tracking_data is None:
+        raise HTTPException(status_code=400, detail="tracking_data or dataset_id is required")
+    return dataset_from_frames(tracking_data.tracking_data, tracking_data.video_name)
+
+
+def start_streaming_load(path: Path, file_size: int, delete_after: bool = False) -> ApiResponse:
+    """Header now, frame columns on a worker thread (see DatasetCache.start_load)."""
+    header, load = dataset_cache.start_load(str(path), delete_after=delete_after)
+    return ApiResponse(
+        success=True,
+        data={"header": header, "dataset": load.info()},
+        message=f"Loading {file_size / 1024 / 1024:.2f} MB in the background",
+    )
+
 
 def filter_velocity_outliers(velocities, time_points, k=3.0, enabled=True):
     """Remove upper-tail velocity spikes from a per-frame velocity series.
@@ -90,28 +148,33 @@ def filter_velocity_outliers(velocities, time_points, k=3.0, enabled=True):
 
 
 @router.get("/load-large-json")
-async def load_large_json(file_path: str):
+async def load_large_json(file_path: str, mode: Literal["stream", "full"] = "stream"):
     """
     Load a large JSON file directly from the server's disk.
     This bypasses browser memory limits for very large tracking files.
+
+    mode=stream (default): returns the header (video_info, statistics, rois, ...)
+    and a dataset handle at once; the frames are parsed into analysis columns in
+    the background (poll GET /datasets/{load_id}). Results with a column store
+    (or the store directory itself) are memory-mapped and ready at once.
+    mode=full: returns the whole document, tracking_data included.
     """
     try:
-        # Check if path is absolute or relative to project root
-        path = Path(file_path)
-        if not path.exists():
-            # Try relative to current directory
-            path = Path(os.getcwd()) / file_path
-
-        if not path.exists():
-            raise HTTPException(status_code=404, detail=f"File not found: {file_path}")
-
-        # Verify it's a JSON file
-        if not path.suffix.lower() == '.json':
-            raise HTTPException(status_code=400, detail="Only JSON files are supported")
+        path = resolve_results_path(file_path)
 
         # Check file size
         file_size = path.stat().st_size
-        print(f"Loading large JSON: {path} ({file_size / 1024 / 1024:.2f} MB)")
+        print(f"Loading large JSON: {path} ({file_size / 1024 / 1024:.2f} MB, mode={mode})")
+
+        if mode == "stream":
+            return start_streaming_load(path, file_size)
+
+        if path.is_dir():
+            raise HTTPException(status_code=400, detail="A column store has no full document; use mode=stream")
+
+        if path.suffix.lower() == '.npz':
+            header, columns = load_columnar(str(path))
+            return ApiResponse(success=True, data=columnar_to_document(header, columns))
 
         # We use a stream or just read and return.
         # For FastAPI, returning a large dict is fine as it's handled server-side.
@@ -122,16 +185,22 @@ async def load_large_json(file_path: str):
 
     except json.JSONDecodeError as e:
         raise HTTPException(status_code=400, detail=f"Invalid JSON format: {str(e)}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid results file: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error loading large JSON: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/upload-large-json")
-async def upload_large_json(file: UploadFile = File(...)):
+async def upload_large_json(file: UploadFile = File(...), mode: Literal["stream", "full"] = "stream"):
     """
     Upload a large JSON file via multipart form and process it server-side.
     This handles large files that would crash the browser's JSON.parse.
+
+    mode: as for /load-large-json (stream: header + dataset handle; full: whole document).
     """
     try:
         file_size = 0
@@ -144,11 +213,19 @@ async def upload_large_json(file: UploadFile = File(...)):
                 file_size += len(content)
                 out_file.write(content)
 
-        print(f"Uploaded large JSON: {temp_path} ({file_size / 1024 / 1024:.2f} MB)")
+        print(f"Uploaded large JSON: {temp_path} ({file_size / 1024 / 1024:.2f} MB, mode={mode})")
 
-        # Now parse the JSON from the temp file
-        with open(temp_path, 'r') as f:
-            data = json.load(f)
+        if mode == "stream":
+            # The loader deletes the temp file once it has read it
+            return start_streaming_load(temp_path, file_size, delete_after=True)
+
+        # Now parse the JSON (or columnar .npz) from the temp file
+        if temp_path.suffix.lower() == '.npz':
+            header, columns = load_columnar(str(temp_path))
+            data = columnar_to_document(header, columns)
+        else:
+            with open(temp_path, 'r') as f:
+                data = json.load(f)
 
         # Clean up temp file
         temp_path.unlink()
@@ -159,6 +236,10 @@ async def upload_large_json(file: UploadFile = File(...)):
         if temp_path.exists():
             temp_path.unlink()
         raise HTTPException(status_code=400, detail=f"Invalid JSON format: {str(e)}")
+    except ValueError as e:
+        if temp_path.exists():
+            temp_path.unlink()
+        raise HTTPException(status_code=400, detail=f"Invalid results file: {str(e)}")
     except Exception as e:
         print(f"Error uploading large JSON: {e}")
         if temp_path.exists():
@@ -166,27 +247,91 @@ async def upload_large_json(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/datasets")
+async def register_dataset(request: Request, trace_memory: bool = False):
+    """
+    Parse tracking data once and keep its columns server-side.
+    /heatmap, /movement, /complete, /download and /open-field then take the
+    returned dataset_id instead of the full tracking data.
+
+    Body: {"tracking_data": <results document>} or {"file_path": <.json/.npz on the server>}.
+    The document goes straight into NumPy columns (app.processing.ingest) and is
+    validated column by column, not as one TrackingFrame per frame. The response
+    reports the ingest time; trace_memory=true adds the tracemalloc peak (the
+    tracing makes the JSON parse several times slower).
+    """
+    try:
+        start = datetime.now()
+        payload = json.loads(await request.body())
+        if not isinstance(payload, dict):
+            raise ValueError("Expected a JSON object")
+        if payload.get("file_path"):
+            dataset = dataset_from_file(str(resolve_results_path(payload["file_path"])), trace_memory)
+        elif "tracking_data" in payload:
+            dataset = dataset_from_document(payload["tracking_data"], trace_memory)
+        else:
+            raise ValueError("tracking_data or file_path is required")
+        del payload
+
+        dataset_cache.put(dataset)
+        elapsed_ms = (datetime.now() - start).total_seconds() * 1000
+        peak = dataset.ingest["peak_bytes"]
+        print(f"Registered analysis dataset {dataset.dataset_id}: {len(dataset.x)} frames in {elapsed_ms:.0f} ms "
+              f"(ingest {dataset.ingest['ingest_ms']} ms"
+              + (f", peak {peak / 1024 / 1024:.1f} MB)" if peak is not None else ")"))
+        return ApiResponse(success=True, data={**dataset.info(), "register_ms": round(elapsed_ms, 1)})
+
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON format: {str(e)}")
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid results file: {str(e)}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error registering dataset: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/datasets")
+async def list_datasets():
+    """Registered datasets, background loads, cache usage and hit/miss counts"""
+    return ApiResponse(success=True, data=dataset_cache.stats())
+
+
+@router.get("/datasets/{dataset_id}")
+async def get_dataset_status(dataset_id: str):
+    """Progress of a background load, or the info of a cached dataset"""
+    load = dataset_cache.load_status(dataset_id)
+    dataset = dataset_cache.get(dataset_id)
+    if dataset is not None:
+        return ApiResponse(success=True, data={**(load.info() if load else {}), **dataset.info(), "status": "ready"})
+    if load is not None:
+        return ApiResponse(success=True, data=load.info())
+    raise HTTPException(status_code=404, detail=f"Dataset not found: {dataset_id}")
+
+
+@router.delete("/datasets/{dataset_id}")
+async def delete_dataset(dataset_id: str):
+    """Drop a registered dataset (or cancel its background load)"""
+    if not dataset_cache.drop(dataset_id):
+        raise HTTPException(status_code=404, detail=f"Dataset not found: {dataset_id}")
+    return ApiResponse(success=True, message="Dataset removed")
+
+
 @router.post("/heatmap")
 async def generate_heatmap(request: HeatmapRequest):
     """Generate movement heatmap from tracking data"""
     try:
-        tracking_data = request.tracking_data
+        dataset = get_dataset(request.tracking_data, request.dataset_id)
         settings = request.settings
 
-        # Extract centroids (skip None values)
-        x_coords = []
-        y_coords = []
-        for frame in tracking_data.tracking_data:
-            if frame.centroid_x is not None and frame.centroid_y is not None:
-                x_coords.append(frame.centroid_x)
-                y_coords.append(frame.centroid_y)
+        # Centroids (frames without one are not in the dataset)
+        x_coords = dataset.x
+        y_coords = dataset.y
 
-        if not x_coords:
+        if len(x_coords) == 0:
             raise HTTPException(status_code=400, detail="No tracking data available")
 
-        x_coords = np.array(x_coords)
-        y_coords = np.array(y_coords)
-
         # Calculate center of mass
         center_x = np.mean(x_coords)
         center_y = np.mean(y_coords)
@@ -264,51 +409,33 @@ async def generate_heatmap(request: HeatmapRequest):
 
         return StreamingResponse(buf, media_type="image/png")
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/movement")
-async def analyze_movement(tracking_data: TrackingData):
-    """Analyze movement patterns and generate velocity plots"""
+async def analyze_movement(tracking_data: Optional[TrackingData] = None, dataset_id: Optional[str] = None):
+    """Analyze movement patterns and generate velocity plots (body: TrackingData, or ?dataset_id=)"""
     try:
-        # Extract data (skip None values)
-        frames = []
-        x_coords = []
-        y_coords = []
-        timestamps = []
-
-        for frame in tracking_data.tracking_data:
-            if frame.centroid_x is not None and frame.centroid_y is not None:
-                frames.append(frame.frame_number)
-                x_coords.append(frame.centroid_x)
-                y_coords.append(frame.centroid_y)
-                timestamps.append(frame.timestamp_sec)
-
-        if len(frames) < 2:
+        dataset = get_dataset(tracking_data, dataset_id)
+        settings = MOVEMENT_SETTINGS
+
+        if len(dataset.x) < 2:
             raise HTTPException(status_code=400, detail="Not enough tracking data")
 
-        x_coords = np.array(x_coords)
-        y_coords = np.array(y_coords)
-        timestamps = np.array(timestamps)
+        x_coords = dataset.x
+        y_coords = dataset.y
+        timestamps = dataset.timestamp
 
         # Calculate velocities using timestamps (pixels/second)
-        velocities = []
-        for i in range(1, len(x_coords)):
-            dx = x_coords[i] - x_coords[i-1]
-            dy = y_coords[i] - y_coords[i-1]
-            dt = timestamps[i] - timestamps[i-1]
-
-            if dt > 0:
-                distance = np.sqrt(dx**2 + dy**2)
-                velocity = distance / dt  # pixels/second
-                velocities.append(velocity)
-            else:
-                velocities.append(0)
-
-        velocities = np.array(velocities)
-        time_points = timestamps[1:]
+        dx = np.diff(x_coords)
+        dy = np.diff(y_coords)
         dt_arr = np.diff(timestamps)
+        safe_dt = np.where(dt_arr > 0, dt_arr, 1.0)
+        velocities = np.where(dt_arr > 0, np.sqrt(dx**2 + dy**2) / safe_dt, 0.0)
+        time_points = timestamps[1:]
 
         velocities, _ = filter_velocity_outliers(
             velocities, time_points,
@@ -382,6 +509,8 @@ async def analyze_movement(tracking_data: TrackingData):
 
         return StreamingResponse(buf, media_type="image/png")
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -453,7 +582,7 @@ def create_heatmap_figure(x_coords, y_coords, settings, title, background_img=No
 async def generate_complete_analysis(request: HeatmapRequest):
     """Generate analysis panel with only selected analyses"""
     try:
-        tracking_data = request.tracking_data
+        dataset = get_dataset(request.tracking_data, request.dataset_id)
         settings = request.settings
         options = request.options
 
@@ -514,20 +643,13 @@ async def generate_complete_analysis(request: HeatmapRequest):
             gs = fig.add_gridspec(rows, cols, hspace=0.3, wspace=0.25)
             axes = [fig.add_subplot(gs[i // cols, i % cols]) for i in range(selected_count)]
 
-        # Extract data into NumPy arrays for high-performance vectorization
-        # Use a more direct way to extract coordinates to save memory
-        coords_list = [[f.centroid_x, f.centroid_y, f.timestamp_sec] 
-                      for f in tracking_data.tracking_data 
-                      if f.centroid_x is not None and f.centroid_y is not None]
-        
-        if len(coords_list) < 2:
+        if len(dataset.x) < 2:
             raise HTTPException(status_code=400, detail="Not enough tracking data")
-            
-        data_arr = np.array(coords_list, dtype=np.float32)
-        x_coords = data_arr[:, 0]
-        y_coords = data_arr[:, 1]
-        timestamps = data_arr[:, 2]
-        del coords_list # Free memory
+
+        # float32 keeps the per-frame arrays of long recordings small
+        x_coords = dataset.x.astype(np.float32)
+        y_coords = dataset.y.astype(np.float32)
+        timestamps = dataset.timestamp.astype(np.float32)
 
         # Vectorized metrics calculation
         dx = np.diff(x_coords)
@@ -677,6 +799,8 @@ async def generate_complete_analysis(request: HeatmapRequest):
 
         return StreamingResponse(buf, media_type="image/png")
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -685,21 +809,15 @@ async def generate_complete_analysis(request: HeatmapRequest):
 async def download_complete_analysis(request: HeatmapRequest):
     """Generate and download complete analysis as ZIP with separate images and enhanced JSON"""
     try:
-        tracking_data = request.tracking_data
+        dataset = get_dataset(request.tracking_data, request.dataset_id)
         settings = request.settings
 
-        # Extract data into NumPy arrays for high-performance vectorization
-        valid_data = [(f.centroid_x, f.centroid_y, f.timestamp_sec) 
-                     for f in tracking_data.tracking_data 
-                     if f.centroid_x is not None and f.centroid_y is not None]
-        
-        if len(valid_data) < 2:
+        if len(dataset.x) < 2:
             raise HTTPException(status_code=400, detail="Not enough tracking data")
-            
-        data_arr = np.array(valid_data)
-        x_coords = data_arr[:, 0]
-        y_coords = data_arr[:, 1]
-        timestamps = data_arr[:, 2]
+
+        x_coords = dataset.x
+        y_coords = dataset.y
+        timestamps = dataset.timestamp
 
         # Vectorized metrics calculation
         dx = np.diff(x_coords)
@@ -894,6 +1012,8 @@ async def download_complete_analysis(request: HeatmapRequest):
             filename=f"complete_analysis_{timestamp}.zip"
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -902,22 +1022,14 @@ async def download_complete_analysis(request: HeatmapRequest):
 async def analyze_open_field(request: OpenFieldAnalysisRequest):
     """Analyze open field test data"""
     try:
-        tracking_data = request.tracking_data
-
-        # Calculate distance from center
-        center_time = 0
-        periphery_time = 0
+        dataset = get_dataset(request.tracking_data, request.dataset_id)
 
-        for frame in tracking_data.tracking_data:
-            dx = frame.centroid_x - request.arena_center_x
-            dy = frame.centroid_y - request.arena_center_y
-            distance = np.sqrt(dx**2 + dy**2)
+        # Calculate distance from center (frames without a centroid are not counted)
+        distance = np.hypot(dataset.x - request.arena_center_x, dataset.y - request.arena_center_y)
 
-            # Consider center as inner 50% of radius
-            if distance < request.arena_radius * 0.5:
-                center_time += 1
-            else:
-                periphery_time += 1
+        # Consider center as inner 50% of radius
+        center_time = int(np.count_nonzero(distance < request.arena_radius * 0.5))
+        periphery_time = len(distance) - center_time
 
         total_time = center_time + periphery_time
 
@@ -931,6 +1043,8 @@ async def analyze_open_field(request: OpenFieldAnalysisRequest):
 
         return ApiResponse(success=True, data=results)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
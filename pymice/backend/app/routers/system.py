@@ -1,10 +1,16 @@
 """System diagnostics API endpoints"""
 
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+import cv2
 import os
 import time
 
-from app.models.schemas import ApiResponse, GPUStatus, YOLOTestResult
+from app.models.schemas import ApiResponse, GPUStatus, InferenceBenchmarkRequest, QuantizeRequest, YOLOTestResult
+from app.services.cpu_governor import cpu_governor
+from app.services.inference_backends import backend_available, benchmark_backends
+from app.services.model_registry import model_registry
+from app.services.quantization import load_report, quantize_model
 
 router = APIRouter()
 
@@ -140,3 +146,87 @@ async def test_yolo_performance(request: dict):
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/models/registry")
+async def get_model_registry():
+    """Loaded models, memory use and hit/miss/eviction counters of the shared model registry"""
+    return ApiResponse(success=True, data=model_registry.stats())
+
+
+@router.get("/cpu")
+async def get_cpu_budgets():
+    """Thread budget of every running tracking task and live experiment"""
+    return ApiResponse(success=True, data=cpu_governor.stats())
+
+
+@router.post("/models/registry/clear")
+async def clear_model_registry():
+    """Unload every idle model (models in use by a running task are kept)"""
+    dropped = model_registry.clear()
+    return ApiResponse(success=True, data={"unloaded": dropped, **model_registry.stats()})
+
+
+@router.post("/inference-benchmark")
+async def inference_benchmark(request: InferenceBenchmarkRequest):
+    """CPU throughput of a model on each inference backend (exports missing artifacts first)"""
+    model_path = os.path.join("temp/models", request.model_name)
+    if not os.path.exists(model_path):
+        raise HTTPException(status_code=404, detail=f"Model not found: {request.model_name}")
+
+    frame = None
+    if request.video_filename:
+        cap = cv2.VideoCapture(os.path.join("temp/videos", request.video_filename))
+        ret, frame = cap.read()
+        cap.release()
+        if not ret:
+            raise HTTPException(status_code=404, detail=f"Could not read video: {request.video_filename}")
+
+    try:
+        results = await run_in_threadpool(
+            benchmark_backends, model_path, request.backends, request.inference_size, request.runs, frame
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return ApiResponse(
+        success=True,
+        data={"model": request.model_name, "inference_size": request.inference_size, "results": results},
+    )
+
+
+@router.post("/models/quantize")
+async def quantize(request: QuantizeRequest):
+    """Build the INT8 variant of a model (inference_backend="onnx_int8") and its accuracy report"""
+    model_path = os.path.join("temp/models", request.model_name)
+    if not os.path.exists(model_path):
+        raise HTTPException(status_code=404, detail=f"Model not found: {request.model_name}")
+    videos = [request.calibration_video] + ([request.evaluation_video] if request.evaluation_video else [])
+    for video in videos:
+        if not os.path.exists(os.path.join("temp/videos", video)):
+            raise HTTPException(status_code=404, detail=f"Video not found: {video}")
+    if not backend_available("onnx_int8"):
+        raise HTTPException(status_code=400, detail="INT8 quantization needs onnx and onnxruntime installed")
+
+    try:
+        report = await run_in_threadpool(
+            quantize_model,
+            model_path,
+            os.path.join("temp/videos", request.calibration_video),
+            inference_size=request.inference_size,
+            calibration_frames=request.calibration_frames,
+            evaluation_video=os.path.join("temp/videos", request.evaluation_video) if request.evaluation_video else None,
+            evaluation_frames=request.evaluation_frames,
+            confidence_threshold=request.confidence_threshold,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return ApiResponse(success=True, data=report)
+
+
+@router.get("/models/{model_name}/int8-report")
+async def get_int8_report(model_name: str):
+    """Accuracy/speed report of the INT8 variant of a model"""
+    report = load_report(os.path.join("temp/models", model_name))
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"No INT8 model for {model_name}")
+    return ApiResponse(success=True, data=report)
@@ -1,9 +1,10 @@
 """Tracking API endpoints"""
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Query
 from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Literal, Optional
 import os
 import shutil
 import uuid
@@ -18,7 +19,6 @@ import subprocess
 import sys
 from datetime import datetime
 from PIL import Image
-from ultralytics import YOLO
 
 MODEL_DIR = "temp/models"
 TRACKING_DIR = "temp/tracking"
@@ -36,24 +36,65 @@ except ImportError as e:
     print(f"Warning: sam3 implementation not found in temp/models: {e}")
     SAM3_AVAILABLE = False
 
-from app.utils.device import cuda_is_usable
+from app.utils.device import cuda_is_usable, select_device
 
 from app.models.schemas import (
     ApiResponse,
     TrackingRequest,
+    BatchTrackingRequest,
     ProcessingProgress,
     UploadResponse,
-    ROIPreset
+    ROIPreset,
+    TrackingFrame,
 )
 from app.processing.tracking import (
-    process_frame,
+    process_frames_batch,
+    draw_tracking_overlay,
     create_roi_mask,
-    calculate_background,
+    roi_crop_box,
+    crop_inference_size,
+    SearchWindow,
     draw_rois,
     get_roi_containing_point,
     get_gpu_memory_info,
     cleanup_gpu_memory,
 )
+from app.processing.background import cached_background
+from app.processing.pipeline import TrackingPipeline
+from app.processing.sampling import FrameSampler
+from app.processing.motion_gate import MotionGate
+from app.processing.detection import TemplateMatcher
+from app.processing.preview import LazyPreview
+from app.processing.results_writer import (
+    StreamingResultsWriter,
+    column_store_path_for,
+    columnar_path_for,
+    frame_index_path_for,
+)
+from app.processing.frame_index import DEFAULT_PAGE_FRAMES, MAX_PAGE_FRAMES, load_frame_index, read_frames
+from app.processing.checkpoint import (
+    CheckpointPolicy,
+    TrackingCheckpoint,
+    background_path_for,
+    checkpoint_path_for,
+    list_checkpoints,
+    load_background,
+    load_checkpoint,
+    remove_checkpoint,
+    save_background,
+    save_checkpoint,
+    tracking_config_hash,
+)
+from app.processing.sharding import (
+    ShardConfig,
+    merge_shard_results,
+    plan_shards,
+    run_sharded_tracking,
+)
+from app.services.job_scheduler import JobScheduler
+from app.services.cpu_governor import cpu_governor, open_capture
+from app.services.inference_backends import resolve_inference_model
+from app.services.model_registry import model_registry
 
 # GPU memory threshold (percentage) - will cleanup if above this
 GPU_MEMORY_THRESHOLD = 80.0
@@ -61,19 +102,34 @@ GPU_MEMORY_THRESHOLD = 80.0
 # Minimum free GPU memory in GB before forcing cleanup
 MIN_FREE_GPU_MEMORY_GB = 1.0
 
+# Decoded frames buffered between pipeline stages (bounds memory held ahead of inference)
+PIPELINE_QUEUE_SIZE = 32
+
+# Tracking jobs allowed to run at once per device; further /start requests wait in a queue
+MAX_CONCURRENT_TRACKING_JOBS = {"cuda": 1, "mps": 1, "cpu": 2}
+
 router = APIRouter()
 
 # Store tracking tasks
 tracking_tasks = {}
 
-# Store current tracking frames for live preview
+# Store current tracking frames for live preview: JPEG bytes, or a LazyPreview
+# that renders the latest frame when /frame/{task_id} is polled
 tracking_frames = {}
 
+# Multi-video batches from /start-batch: batch_id -> {"task_ids", "videos", "settings", "created_at"}
+tracking_batches: Dict[str, Dict[str, Any]] = {}
+
 # Pending batch-download requests (prepare → stream). Entries are one-shot; TTL-purged on prepare.
 batch_download_requests: Dict[str, Dict[str, Any]] = {}
 BATCH_DOWNLOAD_TTL_SEC = 3600
 
 
+def _load_sam3(model_path: str, device: str):
+    """Model-registry loader for SAM3 video predictors"""
+    return build_sam3_video_model(checkpoint_path=model_path, device=device, load_from_HF=False)
+
+
 class BatchDownloadPrepareRequest(BaseModel):
     task_ids: List[str]
     batch_info: Dict[str, Any] = {}
@@ -372,6 +428,14 @@ def run_tracking_task(task_id: str, request: TrackingRequest):
     """Background task to run YOLO tracking"""
     model = None  # Track model for cleanup
     cap = None    # Track video capture for cleanup
+    thread_lease = None  # Share of the CPU threads, see app.services.cpu_governor
+    results_writer = None
+    save_progress = None  # Writes a checkpoint once frame processing has started
+
+    if tracking_tasks.get(task_id, {}).get("stopped"):
+        # Stopped between leaving the queue and starting
+        return
+    resume = tracking_tasks.get(task_id, {}).get("resume", False)
 
     try:
         # Detect GPU availability
@@ -388,13 +452,24 @@ def run_tracking_task(task_id: str, request: TrackingRequest):
 
         print(f"Using device: {device}")
 
-        tracking_tasks[task_id] = {
+        # Thread budget shared with the other running tasks (live experiments first)
+        thread_lease = cpu_governor.lease(task_id, "offline")
+        thread_budget = thread_lease.apply()
+
+        if tracking_tasks[task_id].get("stopped"):
+            # Stopped while the device and thread budget were being set up; finally releases the lease
+            tracking_tasks[task_id]["finished_at"] = time.time()
+            return
+
+        # Update, not replace: the entry made by /start keeps flags set since (e.g. "stopped")
+        tracking_tasks[task_id].update({
             "status": "processing",
             "current_frame": 0,
             "total_frames": 0,
             "percentage": 0,
             "device": device,
-        }
+            "started_at": time.time(),
+        })
 
         # Open video first because SAM3 needs the video_path
         video_path = os.path.join("temp/videos", request.video_filename)
@@ -420,12 +495,8 @@ def run_tracking_task(task_id: str, request: TrackingRequest):
                 except Exception as e:
                     print(f"Warning: Could not limit GPU memory: {e}")
 
-            predictor = build_sam3_video_model(
-                checkpoint_path=model_path,
-                device=device,
-                load_from_HF=False
-            )
-            print("SAM3 video model loaded")
+            predictor = model_registry.acquire(model_path, device, kind="sam3", loader=_load_sam3)
+            print("SAM3 video model ready")
 
             # SAM3 chunk processing will be handled in the main loop
             # We don't initialize inference_state here to avoid loading entire video
@@ -441,27 +512,37 @@ def run_tracking_task(task_id: str, request: TrackingRequest):
                 if not os.path.exists(model_path):
                     raise FileNotFoundError(f"Model not found: {request.model_name}")
 
-            model = YOLO(model_path)
-            if device == "cuda":
-                # Set CUDA memory allocation settings for better memory management
-                # This helps prevent memory fragmentation
-                if hasattr(torch.cuda, 'set_per_process_memory_fraction'):
-                    try:
-                        # Limit to 90% of GPU memory to leave headroom
-                        torch.cuda.set_per_process_memory_fraction(0.9)
-                    except Exception as e:
-                        print(f"Could not set memory fraction: {e}")
-
-                model.to("cuda")
+            # ONNX Runtime / OpenVINO on CPU: exported once, cached next to the .pt
+            inference_model_path, inference_backend = resolve_inference_model(
+                model_path, request.inference_backend, device
+            )
+            tracking_tasks[task_id]["inference_backend"] = inference_backend
+            if inference_backend != "pytorch":
+                print(f"Inference backend: {inference_backend} ({os.path.basename(inference_model_path)})")
 
-                # Log memory after model load
-                mem_info = get_gpu_memory_info()
-                print(f"GPU Memory after model load: {mem_info['used']:.2f}GB used ({mem_info['utilization']:.1f}%)")
+            if request.num_shards > 1:
+                # Sharded mode: every worker process loads its own model instance
+                print(f"Sharded tracking requested: {request.num_shards} worker processes")
+            else:
+                if device == "cuda":
+                    # Set CUDA memory allocation settings for better memory management
+                    # This helps prevent memory fragmentation
+                    if hasattr(torch.cuda, 'set_per_process_memory_fraction'):
+                        try:
+                            # Limit to 90% of GPU memory to leave headroom
+                            torch.cuda.set_per_process_memory_fraction(0.9)
+                        except Exception as e:
+                            print(f"Could not set memory fraction: {e}")
+
+                # Loaded, moved to the device and warmed up once; later tasks reuse it
+                model = model_registry.acquire(inference_model_path, device)
 
-            elif device == "mps":
-                model.to("mps")
+                if device == "cuda":
+                    # Log memory after model load
+                    mem_info = get_gpu_memory_info()
+                    print(f"GPU Memory after model load: {mem_info['used']:.2f}GB used ({mem_info['utilization']:.1f}%)")
 
-        cap = cv2.VideoCapture(video_path)
+        cap = open_capture(video_path, thread_budget.decoder_threads)
         if not cap.isOpened():
             raise RuntimeError("Failed to open video file")
 
@@ -489,7 +570,7 @@ def run_tracking_task(task_id: str, request: TrackingRequest):
         tracking_tasks[task_id]["total_frames"] = total_frames
 
         # Preview optimization: only encode every Nth frame
-        preview_skip_frames = 5  # Only update preview every 5 frames
+        preview_skip_frames = 5  # SAM3 path: only update preview every 5 frames (YOLO renders on demand)
         jpeg_quality = 70  # Lower quality for faster encoding
 
         # Initialize a placeholder frame for immediate preview BEFORE any heavy processing
@@ -503,24 +584,60 @@ def run_tracking_task(task_id: str, request: TrackingRequest):
         _, buffer = cv2.imencode('.jpg', placeholder_frame, encode_params)
         tracking_frames[task_id] = buffer.tobytes()
 
+        # Checkpoints cover the single-process YOLO pipeline (SAM3 and sharded runs start over)
+        checkpointing = not is_sam3 and request.num_shards == 1
+        checkpoint = None
+        if checkpointing:
+            config_hash = tracking_config_hash(request.model_dump(), video_path, model_path)
+        if resume:
+            checkpoint = load_checkpoint(checkpoint_path_for(TRACKING_DIR, task_id))
+            if checkpoint is None or not checkpointing:
+                raise RuntimeError("No checkpoint to resume from")
+            if checkpoint.config_hash != config_hash:
+                raise RuntimeError("Video, model or settings changed since the checkpoint; cannot resume")
+            print(f"Resuming from checkpoint at frame {checkpoint.next_frame}")
+
         # Calculate background (only for YOLO, not needed for SAM3)
         background_frame = None
-        if not is_sam3:
+        if checkpoint is not None:
+            background_frame = load_background(checkpoint.background_path)
+        if not is_sam3 and background_frame is None:
             print("Calculating background...")
-            background_frame = calculate_background(video_path)
+            background_frame = cached_background(video_path)
 
         # Create ROI mask
         roi_mask = None
         if request.rois.rois:
             roi_mask = create_roi_mask(request.rois.rois, (frame_height, frame_width))
+        crop_box = roi_crop_box(roi_mask, request.roi_crop_padding) if request.roi_crop else None
+        if crop_box is not None:
+            print(f"ROI crop: {crop_box} at imgsz {crop_inference_size(crop_box, (frame_height, frame_width), request.inference_size)}")
 
-        # Process frames
-        tracking_data = []
+        # Process frames; per-frame results are streamed to disk as they arrive
+        results_path = os.path.join(TRACKING_DIR, f"{task_id}_results.json")
+        if checkpoint is not None:
+            # Continue the JSONL of the interrupted run; frames after the checkpoint are dropped
+            results_writer = StreamingResultsWriter(
+                results_path, resume_offset=checkpoint.frames_offset, resume_count=checkpoint.frames_written
+            )
+        else:
+            results_writer = StreamingResultsWriter(results_path)
         yolo_detections = 0
         template_detections = 0
         no_detection_count = 0
+        interpolated_frames = 0
+        gated_frames = 0
+        search_window_stats = None
+        processed_ranges = None  # stopped sharded run: [start, end) actually tracked per shard
 
         frame_number = 0
+        if checkpoint is not None:
+            frame_number = checkpoint.next_frame
+            yolo_detections = checkpoint.counters.get("yolo_detections", 0)
+            template_detections = checkpoint.counters.get("template_detections", 0)
+            no_detection_count = checkpoint.counters.get("no_detection_count", 0)
+            interpolated_frames = checkpoint.counters.get("interpolated_frames", 0)
+            gated_frames = checkpoint.counters.get("gated_frames", 0)
 
         # SAM3 chunk processing parameters - OPTIMIZED for speed
         SAM3_CHUNK_SIZE = 100  # Larger chunks = faster (was 30)
@@ -579,7 +696,7 @@ def run_tracking_task(task_id: str, request: TrackingRequest):
                     task_id, chunk_idx, num_chunks,
                     start_frame, total_frames,
                     request.rois.rois, roi_mask,
-                    tracking_data, yolo_detections_ref, [0], no_detection_ref,
+                    results_writer, yolo_detections_ref, [0], no_detection_ref,
                     preview_skip_frames, jpeg_quality
                 )
 
@@ -610,37 +727,170 @@ def run_tracking_task(task_id: str, request: TrackingRequest):
             # Update final counters
             yolo_detections = yolo_detections_ref[0]
             no_detection_count = no_detection_ref[0]
-            frame_number = len(tracking_data)
+            frame_number = len(results_writer)
+
+        elif request.num_shards > 1:
+            # YOLO, sharded: contiguous frame ranges tracked in parallel worker
+            # processes, then merged back by frame_number
+            shards = plan_shards(total_frames, request.num_shards)
+            print(f"Tracking {total_frames} frames in {len(shards)} shards: {shards}")
+            tracking_tasks[task_id]["shards"] = [
+                {"index": i, "start_frame": start, "end_frame": end, "processed": 0}
+                for i, (start, end) in enumerate(shards)
+            ]
+
+            placeholder_frame = np.zeros((frame_height, frame_width, 3), dtype=np.uint8)
+            cv2.putText(placeholder_frame, f"Tracking in {len(shards)} parallel shards...",
+                       (frame_width // 2 - 250, frame_height // 2),
+                       cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+            _, buffer = cv2.imencode('.jpg', placeholder_frame, encode_params)
+            tracking_frames[task_id] = buffer.tobytes()
+
+            def on_shard_progress(counts):
+                done = sum(counts)
+                for entry, count in zip(tracking_tasks[task_id]["shards"], counts):
+                    entry["processed"] = count
+                tracking_tasks[task_id].update({
+                    "current_frame": done,
+                    "percentage": (done / total_frames) * 100,
+                })
+
+            shard_config = ShardConfig(
+                video_path=video_path,
+                model_path=inference_model_path,
+                rois=request.rois.rois,
+                confidence_threshold=request.confidence_threshold,
+                iou_threshold=request.iou_threshold,
+                device=device,
+                inference_size=request.inference_size,
+                batch_size=request.batch_size,
+                model_name=request.model_name,
+                background_frame=background_frame,
+                torch_threads=max(1, thread_lease.budget().torch_threads // len(shards)),
+                roi_crop_padding=request.roi_crop_padding if request.roi_crop else None,
+                motion_gate_threshold=request.motion_gate_threshold if request.motion_gate else None,
+                search_window_size=request.search_window_size if request.tracking_mode == "search_window" else None,
+                search_window_min_confidence=request.search_window_min_confidence,
+            )
+            shard_paths = run_sharded_tracking(
+                shard_config, shards, TRACKING_DIR, task_id,
+                on_progress=on_shard_progress,
+                stop_requested=lambda: tracking_tasks[task_id].get("stopped", False),
+            )
+            # A stop leaves a gap at the end of every unfinished shard, not one contiguous prefix
+            ranges = [[entry["start_frame"], entry["start_frame"] + entry["processed"]]
+                      for entry in tracking_tasks[task_id]["shards"]]
+            if any(end < entry["end_frame"] for (_, end), entry in zip(ranges, tracking_tasks[task_id]["shards"])):
+                processed_ranges = ranges
+                print(f"Sharded run stopped early; tracked frame ranges: {processed_ranges}")
+
+            try:
+                for frame_data in merge_shard_results(shard_paths):
+                    results_writer.append(frame_data)
+
+                    # Update counters
+                    if frame_data["detection_method"] in ["yolo", "sam3"]:
+                        yolo_detections += 1
+                    elif frame_data["detection_method"] == "template":
+                        template_detections += 1
+                    else:
+                        no_detection_count += 1
+                    if frame_data.get("gated"):
+                        gated_frames += 1
+            finally:
+                for path in shard_paths:
+                    if os.path.exists(path):
+                        os.remove(path)
+
+            frame_number = len(results_writer)
 
         else:
-            # YOLO: Original frame-by-frame processing
+            # YOLO: decode, inference and postprocessing run as overlapping
+            # pipeline stages; frames are sent through the model in batches of
+            # request.batch_size (1 = frame-by-frame)
             # Memory monitoring interval (check every N frames)
             memory_check_interval = 100
+            last_memory_check = -memory_check_interval
 
-            while True:
-                if tracking_tasks[task_id].get("stopped"):
-                    break
+            start_frame = frame_number
+            if start_frame > 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+            checkpoint_path = checkpoint_path_for(TRACKING_DIR, task_id)
+            task_checkpoint = TrackingCheckpoint(
+                task_id=task_id,
+                config_hash=config_hash,
+                request=request.model_dump(),
+                total_frames=total_frames,
+                background_path=save_background(background_path_for(TRACKING_DIR, task_id), background_frame),
+            )
+            checkpoint_policy = CheckpointPolicy()
+
+            # Only keyframes go through the model; the frames in between are interpolated
+            sampler = FrameSampler(
+                mode=request.sampling_mode,
+                stride=request.sampling_stride,
+                max_stride=request.sampling_max_stride,
+                rois=request.rois.rois,
+                start_frame=start_frame,
+                last_frame=total_frames - 1,
+                state=checkpoint.sampling if checkpoint is not None else None,
+            )
+
+            def write_checkpoint():
+                # Offset first: the checkpoint must never point past flushed frames
+                task_checkpoint.frames_offset = results_writer.offset()
+                task_checkpoint.frames_written = len(results_writer)
+                task_checkpoint.next_frame = frame_number
+                task_checkpoint.counters = {
+                    "yolo_detections": yolo_detections,
+                    "template_detections": template_detections,
+                    "no_detection_count": no_detection_count,
+                    "interpolated_frames": interpolated_frames,
+                    "gated_frames": gated_frames,
+                }
+                task_checkpoint.sampling = sampler.state()
+                save_checkpoint(checkpoint_path, task_checkpoint)
 
+            def read_frame():
                 ret, frame = cap.read()
                 if not ret:
-                    break
+                    return None
+                # Get frame timestamp in seconds from video capture
+                return frame, cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+
+            def grab_frame():
+                # Skipped by the sampler: advance without decoding the image
+                if not cap.grab():
+                    return None
+                return cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+
+            # Static frames (nothing moved inside the ROIs) reuse the last result
+            motion_gate = MotionGate(roi_mask, request.motion_gate_threshold) if request.motion_gate else None
+
+            # Background and ROI mask are fixed for the task: prepare the fallback once
+            template_matcher = TemplateMatcher(background_frame, roi_mask=roi_mask) if background_frame is not None else None
 
+            search_window = None
+            if request.tracking_mode == "search_window":
+                search_window = SearchWindow(request.search_window_size, request.search_window_min_confidence)
+
+            def infer_batch(frame_numbers, frames):
+                nonlocal last_memory_check
                 # Check GPU memory periodically and cleanup if needed
-                if device == "cuda" and frame_number % memory_check_interval == 0:
+                if device == "cuda" and frame_numbers[0] - last_memory_check >= memory_check_interval:
+                    last_memory_check = frame_numbers[0]
                     mem_info = get_gpu_memory_info()
                     if mem_info['utilization'] > GPU_MEMORY_THRESHOLD or mem_info['free'] < MIN_FREE_GPU_MEMORY_GB:
-                        print(f"Frame {frame_number}: High GPU memory usage ({mem_info['utilization']:.1f}%), cleaning up...")
+                        print(f"Frame {frame_numbers[0]}: High GPU memory usage ({mem_info['utilization']:.1f}%), cleaning up...")
                         cleanup_gpu_memory(force=True)
                         mem_after = get_gpu_memory_info()
                         print(f"After cleanup: {mem_after['utilization']:.1f}% used")
 
-                # Get frame timestamp in seconds from video capture
-                timestamp_sec = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
-
-                # Process frame with YOLO and template matching
-                frame_data = process_frame(
-                    frame=frame,
-                    frame_number=frame_number,
+                # Process the batch with YOLO and template matching
+                return process_frames_batch(
+                    frames=frames,
+                    frame_numbers=frame_numbers,
                     model=model,
                     background_frame=background_frame,
                     rois=request.rois.rois,
@@ -650,113 +900,99 @@ def run_tracking_task(task_id: str, request: TrackingRequest):
                     device=device,
                     inference_size=request.inference_size,
                     model_name=request.model_name,
+                    crop_box=crop_box,
+                    search_window=search_window,
+                    template_matcher=template_matcher,
                 )
 
+            def infer(frame_numbers, frames):
+                thread_lease.apply()  # runs in the pipeline's inference thread
+                if motion_gate is not None:
+                    return motion_gate.infer(frame_numbers, frames, infer_batch)
+                return infer_batch(frame_numbers, frames)
+
+            # Preview is rendered on demand by /frame/{task_id}; the loop only hands over references
+            preview = LazyPreview(
+                render=lambda vis, data, idx: draw_tracking_overlay(vis, data, request.rois.rois, idx, total_frames),
+                max_fps=request.preview_max_fps,
+                jpeg_quality=jpeg_quality,
+                placeholder=tracking_frames.get(task_id),
+            )
+            tracking_frames[task_id] = preview
+
+            def postprocess(frame_idx, frame, timestamp_sec, frame_data):
+                nonlocal yolo_detections, template_detections, no_detection_count, interpolated_frames, gated_frames, frame_number
+
                 # Add timestamp information to frame data
                 frame_data["timestamp_sec"] = timestamp_sec
 
-                tracking_data.append(frame_data)
+                results_writer.append(frame_data)
 
                 # Update counters
                 if frame_data["detection_method"] in ["yolo", "sam3"]:
                     yolo_detections += 1
                 elif frame_data["detection_method"] == "template":
                     template_detections += 1
+                elif frame_data["detection_method"] == "interpolated":
+                    interpolated_frames += 1
                 else:
                     no_detection_count += 1
+                if frame_data.get("gated"):
+                    gated_frames += 1
 
-                # Create visualization frame
-                vis_frame = frame.copy()
-
-                # Draw ROIs with active ROI highlighting
-                active_roi_index = frame_data.get("roi_index")
-                draw_rois(vis_frame, request.rois.rois, color=(0, 255, 0), thickness=2,
-                         active_roi_index=active_roi_index)
-
-                # Draw centroid if detected
-                if frame_data["centroid_x"] is not None and frame_data["centroid_y"] is not None:
-                    cx = int(frame_data["centroid_x"])
-                    cy = int(frame_data["centroid_y"])
-
-                    # Draw segmentation mask if available
-                    if "mask" in frame_data and frame_data["mask"]:
-                        mask_points = np.array(frame_data["mask"], dtype=np.int32)
-                        # Draw filled polygon with transparency
-                        overlay = vis_frame.copy()
-                        cv2.fillPoly(overlay, [mask_points], (0, 255, 255))  # Cyan color
-                        cv2.addWeighted(overlay, 0.3, vis_frame, 0.7, 0, vis_frame)
-                        # Draw contour
-                        cv2.polylines(vis_frame, [mask_points], True, (0, 255, 255), 2)
-
-                    # Draw pose keypoints if available
-                    if "keypoints" in frame_data and frame_data["keypoints"]:
-                        for i, kpt in enumerate(frame_data["keypoints"]):
-                            kx, ky = int(kpt["x"]), int(kpt["y"])
-                            conf = kpt["conf"]
-
-                            # Color based on confidence (green = high, yellow = medium, red = low)
-                            if conf > 0.7:
-                                color = (0, 255, 0)  # Green
-                            elif conf > 0.5:
-                                color = (0, 255, 255)  # Yellow
-                            else:
-                                color = (0, 165, 255)  # Orange
-
-                            # Draw keypoint
-                            cv2.circle(vis_frame, (kx, ky), 5, color, -1)
-                            cv2.circle(vis_frame, (kx, ky), 7, (255, 255, 255), 1)
-
-                            # Draw keypoint index
-                            cv2.putText(vis_frame, str(i), (kx + 10, ky),
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
-
-                    # Draw centroid as circle (red with white border)
-                    cv2.circle(vis_frame, (cx, cy), 10, (0, 0, 255), -1)
-                    cv2.circle(vis_frame, (cx, cy), 15, (255, 255, 255), 2)
-
-                    # Draw detection method text
-                    method_text = f"Method: {frame_data['detection_method']}"
-                    cv2.putText(vis_frame, method_text, (10, 30),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-
-                    # Draw ROI info if animal is in a ROI
-                    if frame_data.get("roi"):
-                        roi_text = f"In {frame_data['roi'].upper()}"
-                        cv2.putText(vis_frame, roi_text, (10, 90),
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-
-                # Draw frame number
-                cv2.putText(vis_frame, f"Frame: {frame_number}/{total_frames}", (10, 60),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-
-                # Encode frame as JPEG and store (only every Nth frame for preview optimization)
-                # Always encode frame 0 to have immediate preview, then every Nth frame
-                if frame_number == 0 or frame_number % preview_skip_frames == 0:
-                    # Use lower quality JPEG for faster encoding
-                    encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
-                    _, buffer = cv2.imencode('.jpg', vis_frame, encode_params)
-                    tracking_frames[task_id] = buffer.tobytes()
+                # Interpolated frames come without an image (frame is None)
+                if frame is not None:
+                    preview.update(frame, frame_data, frame_idx)
 
                 # Update progress
-                frame_number += 1
+                frame_number = frame_idx + 1
                 tracking_tasks[task_id].update({
                     "current_frame": frame_number,
                     "percentage": (frame_number / total_frames) * 100,
+                    "pipeline": pipeline.stats(),
                 })
 
+                # Checkpoint on keyframes only: the frames before it are all written
+                if frame is not None and checkpoint_policy.due(frame_number):
+                    write_checkpoint()
+
+            pipeline = TrackingPipeline(
+                read_frame=read_frame,
+                infer=infer,
+                postprocess=postprocess,
+                batch_size=request.batch_size,
+                queue_size=PIPELINE_QUEUE_SIZE,
+                start_frame=start_frame,
+                stop_requested=lambda: tracking_tasks[task_id].get("stopped", False),
+                sampler=sampler,
+                grab_frame=grab_frame,
+            )
+            save_progress = write_checkpoint
+            pipeline.run()
+            tracking_tasks[task_id]["pipeline"] = pipeline.stats()
+            if search_window is not None:
+                search_window_stats = search_window.stats()
+
+            # Keep only the encoded last frame once the task is over
+            final_preview = preview.finalize()
+            if final_preview is not None:
+                tracking_frames[task_id] = final_preview
+
         cap.release()
         cap = None
 
+        # Hand the model back to the registry; it stays loaded for the next task
+        # unless the registry's memory budget evicts it
+        if is_sam3:
+            model_registry.release(predictor)
+            predictor = None
+            sam3_generator = None
+        else:
+            model_registry.release(model)
+            model = None
+
         # Thorough GPU memory cleanup
         if device == "cuda":
-            # Delete model to free GPU memory
-            if is_sam3:
-                del predictor
-                predictor = None
-                sam3_generator = None
-            else:
-                del model
-                model = None
             cleanup_gpu_memory(force=True)
             gc.collect()
 
@@ -779,27 +1015,56 @@ def run_tracking_task(task_id: str, request: TrackingRequest):
                 "frames_without_detection": no_detection_count,
                 "yolo_detections": yolo_detections,
                 "template_detections": template_detections,
+                "interpolated_frames": interpolated_frames,
+                "gated_frames": gated_frames,
+                # Share of the frames that reached the model (not interpolated) answered by the motion gate
+                "gate_hit_rate": gated_frames / max(1, len(results_writer) - interpolated_frames) if gated_frames else 0.0,
                 "detection_rate": ((yolo_detections + template_detections) / total_frames * 100) if total_frames > 0 else 0,
             },
             "rois": [roi.model_dump() for roi in request.rois.rois],
-            "tracking_data": tracking_data,
         }
+        if search_window_stats is not None:
+            results["statistics"]["search_window"] = search_window_stats
+        if not is_sam3:
+            results["statistics"]["inference_backend"] = inference_backend
+        if processed_ranges is not None:
+            # tracking_data only covers these [start, end) frame ranges
+            results["partial"] = True
+            results["processed_ranges"] = processed_ranges
 
         # Add ffprobe info if available
         if video_info:
             results["video_info"]["codec"] = video_info.get("codec", "unknown")
             results["video_info"]["ffprobe_duration"] = video_info.get("duration", 0)
 
-        results_path = os.path.join(TRACKING_DIR, f"{task_id}_results.json")
-        with open(results_path, "w") as f:
-            json.dump(results, f, indent=2)
+        # A stopped run keeps its checkpoint and JSONL so /resume can finish it later
+        interrupted = save_progress is not None and bool(tracking_tasks[task_id].get("stopped"))
+        if interrupted:
+            save_progress()
+        save_progress = None
+
+        # Stream the frames back from disk into the results document ("tracking_data" last),
+        # writing the compact columnar copy, the frame offset index and the
+        # memory-mapped column store for analysis in the same pass
+        columnar_path = columnar_path_for(results_path)
+        column_store_path = column_store_path_for(results_path)
+        results_writer.finalize(results, columnar_path=columnar_path, keep_frames=interrupted,
+                                index_path=frame_index_path_for(results_path), store_path=column_store_path)
+        if checkpointing and not interrupted:
+            remove_checkpoint(TRACKING_DIR, task_id)
 
         tracking_tasks[task_id].update({
             "status": "completed",
             "results_path": results_path,
+            "columnar_path": columnar_path,
+            "column_store_path": column_store_path,
+            "resumable": interrupted,
+            "partial": processed_ranges is not None,
+            "processed_ranges": processed_ranges,
+            "finished_at": time.time(),
         })
 
-        print(f"Tracking completed: {yolo_detections} YOLO, {template_detections} template, {no_detection_count} no detection")
+        print(f"Tracking completed: {yolo_detections} YOLO, {template_detections} template, {interpolated_frames} interpolated, {no_detection_count} no detection")
 
     except Exception as e:
         import traceback
@@ -809,7 +1074,14 @@ def run_tracking_task(task_id: str, request: TrackingRequest):
         tracking_tasks[task_id].update({
             "status": "error",
             "error": str(e),
+            "finished_at": time.time(),
         })
+        if save_progress is not None:
+            try:
+                save_progress()
+                tracking_tasks[task_id]["resumable"] = True
+            except Exception as checkpoint_error:
+                print(f"Could not write checkpoint: {checkpoint_error}")
     finally:
         # Always cleanup resources to prevent memory leaks
         try:
@@ -818,15 +1090,25 @@ def run_tracking_task(task_id: str, request: TrackingRequest):
         except Exception:
             pass
 
+        try:
+            if results_writer is not None:
+                # Frames processed so far stay on disk as <task_id>_frames.jsonl
+                results_writer.close()
+        except Exception:
+            pass
+
+        if thread_lease is not None:
+            thread_lease.release()
+
         try:
             if model is not None:
-                del model
+                model_registry.release(model)
         except Exception:
             pass
 
         try:
             if 'predictor' in locals() and predictor is not None:
-                del predictor
+                model_registry.release(predictor)
         except Exception:
             pass
 
@@ -840,24 +1122,189 @@ def run_tracking_task(task_id: str, request: TrackingRequest):
                 print(f"Error during final cleanup: {cleanup_error}")
 
 
+tracking_scheduler = JobScheduler(run_tracking_task, limits=MAX_CONCURRENT_TRACKING_JOBS)
+
+
 @router.post("/start")
-async def start_tracking(request: TrackingRequest, background_tasks: BackgroundTasks):
-    """Start tracking process"""
+async def start_tracking(request: TrackingRequest):
+    """Queue a tracking job; it starts when its device has a free slot"""
     try:
         os.makedirs(TRACKING_DIR, exist_ok=True)
 
         # Generate task ID
         task_id = str(uuid.uuid4())
+        device = select_device()
 
-        # Start background task
-        background_tasks.add_task(run_tracking_task, task_id, request)
+        tracking_tasks[task_id] = {
+            "status": "queued",
+            "current_frame": 0,
+            "total_frames": 0,
+            "percentage": 0,
+            "device": device,
+        }
+        tracking_scheduler.submit(task_id, request, device=device, priority=request.priority)
 
-        return ApiResponse(success=True, data={"task_id": task_id})
+        return ApiResponse(success=True, data={
+            "task_id": task_id,
+            "queue_position": tracking_scheduler.queue_position(task_id),
+        })
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/start-batch")
+async def start_batch_tracking(request: BatchTrackingRequest):
+    """Queue one tracking job per video with shared settings.
+
+    Jobs go through the same per-device worker pool as /start; workers reuse the
+    model loaded by the model registry, and each video's background comes from
+    the background cache. Follow the batch with /batch/{batch_id}.
+    """
+    missing = [v for v in request.video_filenames if not os.path.exists(os.path.join("temp/videos", v))]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Videos not found: {', '.join(missing)}")
+    if not os.path.exists(os.path.join(MODEL_DIR, request.model_name)):
+        raise HTTPException(status_code=404, detail=f"Model not found: {request.model_name}")
+
+    try:
+        os.makedirs(TRACKING_DIR, exist_ok=True)
+        batch_id = str(uuid.uuid4())
+        device = select_device()
+        settings = request.model_dump(exclude={"video_filename", "video_filenames"})
+
+        task_ids = []
+        for video in request.video_filenames:
+            task_id = str(uuid.uuid4())
+            tracking_tasks[task_id] = {
+                "status": "queued",
+                "current_frame": 0,
+                "total_frames": 0,
+                "percentage": 0,
+                "device": device,
+            }
+            tracking_scheduler.submit(
+                task_id, TrackingRequest(**settings, video_filename=video), device=device, priority=request.priority
+            )
+            task_ids.append(task_id)
+
+        tracking_batches[batch_id] = {
+            "task_ids": task_ids,
+            "videos": list(request.video_filenames),
+            "settings": settings,
+            "created_at": time.time(),
+        }
+        print(f"Batch {batch_id}: queued {len(task_ids)} videos on {device}")
+        return ApiResponse(success=True, data={"batch_id": batch_id, "task_ids": task_ids})
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _batch_progress(batch_id: str, batch: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-video and aggregate progress/throughput of a batch"""
+    now = time.time()
+    videos = []
+    counts: Dict[str, int] = {}
+    frames_done = frames_total = 0
+    started = [tracking_tasks.get(t, {}).get("started_at") for t in batch["task_ids"]]
+    for task_id, video in zip(batch["task_ids"], batch["videos"]):
+        task = tracking_tasks.get(task_id, {})
+        status = task.get("status", "queued")
+        counts[status] = counts.get(status, 0) + 1
+        current, total = task.get("current_frame", 0), task.get("total_frames", 0)
+        frames_done += current
+        frames_total += total
+        elapsed = (task.get("finished_at") or now) - task["started_at"] if task.get("started_at") else 0.0
+        videos.append({
+            "task_id": task_id,
+            "video_filename": video,
+            "status": status,
+            "current_frame": current,
+            "total_frames": total,
+            "percentage": task.get("percentage", 0),
+            "fps": round(current / elapsed, 2) if elapsed > 0 else 0.0,
+            "error": task.get("error"),
+            "queue_position": tracking_scheduler.queue_position(task_id),
+        })
+
+    finished = sum(counts.get(s, 0) for s in ("completed", "error", "stopped", "cancelled"))
+    first_start = min((s for s in started if s), default=None)
+    elapsed = now - first_start if first_start else 0.0
+    fps = frames_done / elapsed if elapsed > 0 else 0.0
+    # Videos not opened yet have no frame count: estimate them from the average known one
+    known = [v["total_frames"] for v in videos if v["total_frames"]]
+    estimated_total = frames_total + (sum(known) / len(known)) * (len(videos) - len(known)) if known else 0
+    return {
+        "batch_id": batch_id,
+        "status": "completed" if finished == len(videos) else "processing" if first_start else "queued",
+        "videos_total": len(videos),
+        "videos_finished": finished,
+        "status_counts": counts,
+        "frames_done": frames_done,
+        "frames_total": frames_total,
+        "percentage": (frames_done / estimated_total) * 100 if estimated_total else 0,
+        "fps": round(fps, 2),
+        "elapsed_sec": round(elapsed, 1),
+        "eta_sec": round((estimated_total - frames_done) / fps, 1) if fps > 0 and finished < len(videos) else None,
+        "completed_task_ids": [v["task_id"] for v in videos if v["status"] == "completed"],
+        "videos": videos,
+    }
+
+
+@router.get("/batch/{batch_id}")
+async def get_batch_progress(batch_id: str):
+    """Per-video and aggregate progress of a /start-batch batch"""
+    batch = tracking_batches.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return ApiResponse(success=True, data=_batch_progress(batch_id, batch))
+
+
+@router.post("/batch/{batch_id}/stop")
+async def stop_batch_tracking(batch_id: str):
+    """Cancel the queued videos of a batch and stop the running ones"""
+    batch = tracking_batches.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    cancelled = stopped = 0
+    for task_id in batch["task_ids"]:
+        task = tracking_tasks.get(task_id)
+        if task is None or task.get("status") not in ("queued", "processing"):
+            continue
+        if tracking_scheduler.cancel(task_id):
+            task["status"] = "cancelled"
+            cancelled += 1
+        else:
+            task["stopped"] = True
+            task["status"] = "stopped"
+            stopped += 1
+    return ApiResponse(success=True, data={"cancelled": cancelled, "stopped": stopped})
+
+
+@router.post("/batch/{batch_id}/download/prepare")
+async def prepare_batch_tracking_download(batch_id: str):
+    """Register a batch download (see /results/batch/prepare) of every completed video of the batch"""
+    batch = tracking_batches.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    task_ids = [t for t in batch["task_ids"] if tracking_tasks.get(t, {}).get("status") == "completed"]
+    if not task_ids:
+        raise HTTPException(status_code=400, detail="No completed videos in this batch yet")
+    videos = dict(zip(batch["task_ids"], batch["videos"]))
+    return await prepare_batch_download(BatchDownloadPrepareRequest(
+        task_ids=task_ids,
+        batch_info={
+            "batch_id": batch_id,
+            "videos": [videos[t] for t in task_ids],
+            "model_name": batch["settings"]["model_name"],
+            "experiment_type": batch["settings"]["rois"]["preset_name"],
+            "created_at": datetime.fromtimestamp(batch["created_at"]).isoformat(),
+        },
+    ))
+
+
 @router.get("/progress/{task_id}")
 async def get_progress(task_id: str):
     """Get tracking progress"""
@@ -874,26 +1321,93 @@ async def get_progress(task_id: str):
             percentage=task.get("percentage", 0),
             status=task.get("status", "processing"),
             device=task.get("device"),
-            error=task.get("error")
+            error=task.get("error"),
+            pipeline=task.get("pipeline"),
+            shards=task.get("shards"),
+            queue_position=tracking_scheduler.queue_position(task_id),
+            resumable=task.get("resumable"),
         ).model_dump()
     )
 
 
+@router.get("/queue")
+async def get_queue():
+    """Running and queued tracking jobs per device"""
+    return ApiResponse(success=True, data=tracking_scheduler.snapshot())
+
+
 @router.post("/stop/{task_id}")
 async def stop_tracking(task_id: str):
-    """Stop tracking process"""
+    """Stop tracking process, or cancel it if it is still queued"""
     if task_id not in tracking_tasks:
         raise HTTPException(status_code=404, detail="Task not found")
 
+    if tracking_scheduler.cancel(task_id):
+        tracking_tasks[task_id]["status"] = "cancelled"
+        return ApiResponse(success=True, data={"message": "Queued tracking cancelled"})
+
     tracking_tasks[task_id]["stopped"] = True
     tracking_tasks[task_id]["status"] = "stopped"
 
     return ApiResponse(success=True, data={"message": "Tracking stopped"})
 
 
+@router.get("/checkpoints")
+async def list_tracking_checkpoints():
+    """Interrupted tracking tasks that can be continued with /resume/{task_id}"""
+    checkpoints = [
+        {
+            "task_id": c.task_id,
+            "video_filename": c.request.get("video_filename"),
+            "model_name": c.request.get("model_name"),
+            "next_frame": c.next_frame,
+            "total_frames": c.total_frames,
+            "updated_at": datetime.fromtimestamp(c.updated_at).isoformat(),
+            "status": tracking_tasks.get(c.task_id, {}).get("status"),
+        }
+        for c in list_checkpoints(TRACKING_DIR)
+    ]
+    return ApiResponse(success=True, data={"checkpoints": checkpoints})
+
+
+@router.post("/resume/{task_id}")
+async def resume_tracking(task_id: str):
+    """Continue an interrupted tracking task from its last checkpoint (also after a restart)"""
+    checkpoint = load_checkpoint(checkpoint_path_for(TRACKING_DIR, task_id))
+    if checkpoint is None:
+        raise HTTPException(status_code=404, detail="No checkpoint for this task")
+
+    status = tracking_tasks.get(task_id, {}).get("status")
+    if status in ("queued", "processing"):
+        raise HTTPException(status_code=409, detail=f"Task is already {status}")
+
+    try:
+        request = TrackingRequest(**checkpoint.request)
+        device = select_device()
+        tracking_tasks[task_id] = {
+            "status": "queued",
+            "current_frame": checkpoint.next_frame,
+            "total_frames": checkpoint.total_frames,
+            "percentage": (checkpoint.next_frame / checkpoint.total_frames) * 100 if checkpoint.total_frames else 0,
+            "device": device,
+            "resume": True,
+        }
+        tracking_scheduler.submit(task_id, request, device=device, priority=request.priority)
+
+        return ApiResponse(success=True, data={
+            "task_id": task_id,
+            "resume_from_frame": checkpoint.next_frame,
+            "queue_position": tracking_scheduler.queue_position(task_id),
+        })
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 def run_test_detection_task(task_id: str, request: TrackingRequest):
     """Background task to run single frame detection test"""
     predictor = None
+    model = None
     cap = None
     inference_state = None
 
@@ -927,12 +1441,8 @@ def run_test_detection_task(task_id: str, request: TrackingRequest):
 
             tracking_tasks[task_id]["percentage"] = 30
 
-            # Build model
-            predictor = build_sam3_video_model(
-                checkpoint_path=model_path,
-                device=device,
-                load_from_HF=False
-            )
+            # Build model (or reuse an idle one)
+            predictor = model_registry.acquire(model_path, device, kind="sam3", loader=_load_sam3)
 
             tracking_tasks[task_id]["percentage"] = 40
 
@@ -1067,7 +1577,7 @@ def run_test_detection_task(task_id: str, request: TrackingRequest):
                 del inference_state
                 inference_state = None
 
-            del predictor
+            model_registry.release(predictor)
             predictor = None
             if device == "cuda":
                 torch.cuda.synchronize()
@@ -1101,8 +1611,8 @@ def run_test_detection_task(task_id: str, request: TrackingRequest):
             cap = None
 
             vis_frame = frame.copy()
-            model = YOLO(model_path)
-            model.to(device)
+            inference_model_path, _ = resolve_inference_model(model_path, request.inference_backend, device)
+            model = model_registry.acquire(inference_model_path, device)
 
             tracking_tasks[task_id]["percentage"] = 70
 
@@ -1160,7 +1670,9 @@ def run_test_detection_task(task_id: str, request: TrackingRequest):
 
         try:
             if predictor is not None:
-                del predictor
+                model_registry.release(predictor)
+            if model is not None:
+                model_registry.release(model)
         except Exception:
             pass
 
@@ -1263,8 +1775,8 @@ async def download_batch(download_id: str):
 
 
 @router.get("/results/{task_id}")
-async def download_results(task_id: str):
-    """Download tracking results"""
+async def download_results(task_id: str, format: Literal["json", "npz"] = "json"):
+    """Download tracking results as the JSON document or the columnar .npz"""
     if task_id not in tracking_tasks:
         raise HTTPException(status_code=404, detail="Task not found")
 
@@ -1273,6 +1785,16 @@ async def download_results(task_id: str):
     if task["status"] != "completed":
         raise HTTPException(status_code=400, detail="Tracking not completed")
 
+    if format == "npz":
+        columnar_path = task.get("columnar_path")
+        if not columnar_path or not os.path.exists(columnar_path):
+            raise HTTPException(status_code=404, detail="Columnar results not found")
+        return FileResponse(
+            columnar_path,
+            media_type="application/octet-stream",
+            filename=f"tracking_results_{task_id}.npz"
+        )
+
     results_path = task.get("results_path")
     if not results_path or not os.path.exists(results_path):
         raise HTTPException(status_code=404, detail="Results not found")
@@ -1284,6 +1806,55 @@ async def download_results(task_id: str):
     )
 
 
+@router.get("/results/{task_id}/frames")
+async def get_results_frames(
+    task_id: str,
+    start: int = Query(0, ge=0),
+    end: Optional[int] = Query(None, ge=0),
+    step: int = Query(1, ge=1),
+    limit: int = Query(DEFAULT_PAGE_FRAMES, ge=1, le=MAX_PAGE_FRAMES),
+    fields: Optional[str] = None,
+):
+    """
+    A page of tracking results: frames with start <= frame_number < end, every
+    step-th one, with only the comma-separated fields (frame_number is always
+    included). Pass next_start as start to get the following page.
+    """
+    if task_id not in tracking_tasks:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    task = tracking_tasks[task_id]
+    if task["status"] != "completed":
+        raise HTTPException(status_code=400, detail="Tracking not completed")
+
+    results_path = task.get("results_path")
+    if not results_path or not os.path.exists(results_path):
+        raise HTTPException(status_code=404, detail="Results not found")
+
+    selected = None
+    if fields:
+        selected = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in selected if name not in TrackingFrame.model_fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    def read_page():
+        index = load_frame_index(results_path, frame_index_path_for(results_path))
+        page = read_frames(results_path, index, start=start, end=end, step=step, limit=limit, fields=selected)
+        page["total_frames"] = len(index)
+        # A stopped sharded run has gaps: only these frame ranges were tracked
+        page["partial"] = bool(task.get("partial"))
+        page["processed_ranges"] = task.get("processed_ranges")
+        return page
+
+    try:
+        page = await run_in_threadpool(read_page)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Cannot index results: {e}")
+
+    return ApiResponse(success=True, data={"task_id": task_id, "start": start, "end": end, "step": step, **page})
+
+
 @router.get("/frame/{task_id}")
 async def get_tracking_frame(task_id: str):
     """Get current tracking frame with visualization"""
@@ -1302,6 +1873,10 @@ async def get_tracking_frame(task_id: str):
         return StreamingResponse(io.BytesIO(buffer.tobytes()), media_type="image/jpeg")
 
     frame_bytes = tracking_frames[task_id]
+    if isinstance(frame_bytes, LazyPreview):
+        frame_bytes = await run_in_threadpool(frame_bytes.jpeg)
+        if frame_bytes is None:
+            raise HTTPException(status_code=404, detail="Preview not available yet")
     return StreamingResponse(io.BytesIO(frame_bytes), media_type="image/jpeg")
 
 
@@ -0,0 +1,175 @@
+"""Process-wide CPU thread budgets for tracking tasks and live experiments.
+
+Left alone, every tracking task and live experiment runs PyTorch with one
+intra-op thread per core, and OpenCV and the FFmpeg decoder start their own
+pools on top; two concurrent tasks then oversubscribe the CPU several times
+over. The governor splits the cores between the running tasks instead:
+
+- Each task holds a `ThreadLease`. Live experiments weigh ``LIVE_WEIGHT``
+  times more than offline jobs and get their share rounded up, so starting a
+  batch analysis barely touches a running experiment's fps. Every task keeps
+  at least one thread.
+- Budgets are recomputed whenever a lease is taken or released.
+  ``lease.apply()`` (call it before each inference batch, from the thread
+  that runs the model) picks up the new torch thread count; OpenMP keeps
+  that count per calling thread, so concurrent tasks do not overwrite each
+  other's.
+- OpenCV's pool is process-wide: it is set to the smallest budget in use.
+- Decoder threads are an open-time property of a capture (`open_capture`).
+
+Models running in ONNX Runtime / OpenVINO size their own pools when the
+session is created and are not affected by torch's thread count.
+"""
+
+import itertools
+import logging
+import math
+import os
+import threading
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+import cv2
+
+logger = logging.getLogger("pymice.cpu_governor")
+
+LIVE_WEIGHT = 3
+OFFLINE_WEIGHT = 1
+DECODER_THREAD_RATIO = 4  # one decoder thread per this many inference threads
+LEASE_KINDS = ("live", "offline")
+
+
+@dataclass
+class ThreadBudget:
+    torch_threads: int
+    opencv_threads: int
+    decoder_threads: int
+
+
+def split_threads(total: int, kinds: List[str]) -> List[int]:
+    """Threads per lease (same order as kinds): live first, rounded up, at least one each."""
+    live = sum(kind == "live" for kind in kinds)
+    offline = len(kinds) - live
+    total_weight = LIVE_WEIGHT * live + OFFLINE_WEIGHT * offline
+    if not total_weight:
+        return []
+    live_share = math.ceil(total * LIVE_WEIGHT / total_weight)
+    offline_share = (total - live_share * live) // offline if offline else 0
+    return [max(1, min(total, live_share if kind == "live" else offline_share)) for kind in kinds]
+
+
+def open_capture(source, decoder_threads: Optional[int] = None) -> cv2.VideoCapture:
+    """cv2.VideoCapture limited to decoder_threads FFmpeg threads (None: OpenCV's default)."""
+    if decoder_threads and hasattr(cv2, "CAP_PROP_N_THREADS"):
+        cap = cv2.VideoCapture(source, cv2.CAP_ANY, [cv2.CAP_PROP_N_THREADS, int(decoder_threads)])
+        if cap.isOpened():
+            return cap
+        cap.release()
+    return cv2.VideoCapture(source)
+
+
+def _set_torch_threads(threads: int) -> None:
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+        torch.get_num_threads()  # initialises this thread's pool at the new size
+    except ImportError:
+        pass
+
+
+class ThreadLease:
+    """One task's share of the CPU; see CpuGovernor.lease()."""
+
+    def __init__(self, governor: "CpuGovernor", lease_id: int, task_id: str, kind: str):
+        self._governor = governor
+        self._id = lease_id
+        self.task_id = task_id
+        self.kind = kind
+        self._applied = threading.local()
+
+    def budget(self) -> ThreadBudget:
+        return self._governor.budget(self._id)
+
+    def apply(self) -> ThreadBudget:
+        """Use the current torch budget in the calling thread (cheap when unchanged)."""
+        budget = self.budget()
+        if getattr(self._applied, "torch_threads", None) != budget.torch_threads:
+            _set_torch_threads(budget.torch_threads)
+            self._applied.torch_threads = budget.torch_threads
+        return budget
+
+    def release(self) -> None:
+        self._governor.release(self._id)
+
+    def __enter__(self) -> "ThreadLease":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class CpuGovernor:
+    """Splits total_threads between the active leases."""
+
+    def __init__(self, total_threads: Optional[int] = None):
+        self.total_threads = max(1, total_threads or os.cpu_count() or 1)
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._leases: Dict[int, ThreadLease] = {}
+        self._budgets: Dict[int, ThreadBudget] = {}
+        self._opencv_threads: Optional[int] = None
+
+    def lease(self, task_id: str, kind: str = "offline") -> ThreadLease:
+        """Register a running task; release() (or leave the with-block) when it ends."""
+        if kind not in LEASE_KINDS:
+            raise ValueError(f"Unknown lease kind: {kind}")
+        with self._lock:
+            lease = ThreadLease(self, next(self._ids), task_id, kind)
+            self._leases[lease._id] = lease
+            self._rebalance()
+        return lease
+
+    def release(self, lease_id: int) -> None:
+        with self._lock:
+            if self._leases.pop(lease_id, None) is not None:
+                self._rebalance()
+
+    def budget(self, lease_id: int) -> ThreadBudget:
+        with self._lock:
+            budget = self._budgets.get(lease_id)
+        # A released lease keeps running on a single thread
+        return budget or ThreadBudget(torch_threads=1, opencv_threads=1, decoder_threads=1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "total_threads": self.total_threads,
+                "opencv_threads": self._opencv_threads,
+                "leases": [
+                    {"task_id": lease.task_id, "kind": lease.kind, **asdict(self._budgets[lease_id])}
+                    for lease_id, lease in self._leases.items()
+                ],
+            }
+
+    # --- internals (call with the lock held) ---
+
+    def _rebalance(self) -> None:
+        ids = list(self._leases)
+        threads = split_threads(self.total_threads, [self._leases[i].kind for i in ids])
+        opencv_threads = min(threads) if threads else self.total_threads
+        self._budgets = {
+            lease_id: ThreadBudget(
+                torch_threads=n,
+                opencv_threads=opencv_threads,
+                decoder_threads=max(1, n // DECODER_THREAD_RATIO),
+            )
+            for lease_id, n in zip(ids, threads)
+        }
+        if opencv_threads != self._opencv_threads:
+            cv2.setNumThreads(opencv_threads)
+            self._opencv_threads = opencv_threads
+        logger.info("thread budgets: %s", {self._leases[i].task_id: n for i, n in zip(ids, threads)})
+
+
+cpu_governor = CpuGovernor()
@@ -0,0 +1,406 @@
+"""Server-side cache of parsed tracking datasets for the /analysis endpoints.
+
+The analysis panel used to post the whole ``TrackingData`` document with
+every request, so each slider tweak re-uploaded and re-validated hundreds of
+thousands of ``TrackingFrame`` objects before a single plot was drawn. A
+dataset is now registered once (POST /analysis/datasets) and later requests
+pass its ``dataset_id``:
+
+- Only what the plots read is kept: the ingest columns (see
+  app.processing.ingest) of the frames with a centroid.
+- The id is a content hash of those arrays, so registering the same results
+  twice returns the same id and does not store a second copy.
+- Eviction: least-recently-used first, once there are more than
+  ``max_entries`` datasets or their arrays exceed ``memory_budget_mb``. A
+  request for an evicted id gets a 404 and the client registers again.
+- Background loads (`DatasetCache.start_load`): a results file is streamed
+  into columns on a worker thread. The header is returned at once together
+  with a load handle; `load_status` reports progress until the dataset is in
+  the cache. The finished dataset is stored under its content id like any
+  other (so loading the same file twice keeps one copy), and the handle
+  keeps working wherever a dataset id is accepted.
+- Results that have a column store (see app.processing.column_store) are not
+  read at all: the dataset's arrays are read-only memory maps of the store,
+  shared through the OS page cache, and do not count against the budget.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.processing.column_store import STORE_KEY, is_column_store, open_column_store, store_mtime
+from app.processing.columnar import Columns, load_columnar_header
+from app.processing.ingest import (
+    COLUMNS,
+    DEFAULT_CHUNK_FRAMES,
+    columnar_to_columns,
+    columns_id,
+    frames_to_columns,
+    ingest_document,
+    ingest_file,
+    measure_ingest,
+    stream_frames_to_columns,
+)
+from app.processing.json_stream import ResultsStreamReader
+from app.processing.results_writer import column_store_path_for
+
+logger = logging.getLogger("pymice.dataset_cache")
+
+DEFAULT_MAX_ENTRIES = 16
+DEFAULT_MEMORY_BUDGET_MB = 512
+MAX_FINISHED_LOADS = 64  # load records kept after they finish
+
+
+@dataclass
+class AnalysisDataset:
+    dataset_id: str
+    video_name: Optional[str]
+    total_frames: int  # frames in the document, with or without a centroid
+    frame_number: np.ndarray  # int64, frames with a centroid only
+    x: np.ndarray  # float64
+    y: np.ndarray  # float64
+    timestamp: np.ndarray  # float64
+    roi_index: np.ndarray  # int16, -1 = none
+    method: np.ndarray  # int8 code into app.processing.ingest.METHODS
+    registered_at: float
+    ingest: Optional[Dict[str, Any]] = None  # IngestStats of the file it was read from
+    mapped: bool = False  # arrays are read-only memory maps of a column store
+    processed_ranges: Optional[List[List[int]]] = None  # partial results: the [start, end) frames tracked
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in (
+            self.frame_number, self.x, self.y, self.timestamp, self.roi_index, self.method))
+
+    @property
+    def resident_nbytes(self) -> int:
+        """Bytes held in process memory (mapped pages belong to the page cache)."""
+        return 0 if self.mapped else self.nbytes
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "dataset_id": self.dataset_id,
+            "video_name": self.video_name,
+            "total_frames": self.total_frames,
+            "valid_frames": len(self.x),
+            "nbytes": self.nbytes,
+            "mapped": self.mapped,
+            "partial": self.processed_ranges is not None,
+            "processed_ranges": self.processed_ranges,
+            "ingest": self.ingest,
+        }
+
+
+def build_dataset(columns: Columns, video_name: Optional[str] = None,
+                  ingest: Optional[Dict[str, Any]] = None, dataset_id: Optional[str] = None,
+                  processed_ranges: Optional[List[List[int]]] = None) -> AnalysisDataset:
+    """Dataset of the frames whose centroid is set, from validated ingest columns."""
+    valid = ~np.isnan(columns["x"])  # ingest guarantees x and y are NaN together
+    kept = {name: columns[name][valid] for name in COLUMNS}
+    return AnalysisDataset(
+        dataset_id=dataset_id or columns_id(kept),
+        video_name=video_name,
+        total_frames=len(valid),
+        frame_number=kept["frame_number"],
+        x=kept["x"],
+        y=kept["y"],
+        timestamp=kept["t"],
+        roi_index=kept["roi_index"],
+        method=kept["method"],
+        registered_at=time.time(),
+        ingest=ingest,
+        processed_ranges=processed_ranges,
+    )
+
+
+def dataset_from_frames(frames: Iterable[Any], video_name: Optional[str] = None) -> AnalysisDataset:
+    """Dataset from TrackingFrame objects or frame dicts."""
+    return build_dataset(frames_to_columns(frames), video_name)
+
+
+def dataset_from_columns(header: Dict[str, Any], columns: Columns) -> AnalysisDataset:
+    """Dataset from columnar results (see app.processing.columnar)."""
+    return build_dataset(columnar_to_columns(header, columns), header.get("video_name"))
+
+
+def dataset_from_document(document: Dict[str, Any], trace_memory: bool = False) -> AnalysisDataset:
+    """Dataset from a parsed results document, with its ingest stats."""
+    header, columns, stats = measure_ingest(lambda: ingest_document(document), "request", trace_memory)
+    return build_dataset(columns, header.get("video_name"), ingest=stats.to_dict(),
+                         processed_ranges=header.get("processed_ranges"))
+
+
+def dataset_from_store(path: str) -> AnalysisDataset:
+    """Dataset over the memory-mapped columns of a column store (nothing is copied)."""
+    header, columns, stats = measure_ingest(lambda: open_column_store(path), path)
+    meta = header[STORE_KEY]
+    return AnalysisDataset(
+        dataset_id=meta["dataset_id"],
+        video_name=header.get("video_name"),
+        total_frames=meta["total_frames"],
+        frame_number=columns["frame_number"],
+        x=columns["x"],
+        y=columns["y"],
+        timestamp=columns["t"],
+        roi_index=columns["roi_index"],
+        method=columns["method"],
+        registered_at=time.time(),
+        ingest=stats.to_dict(),
+        mapped=True,
+        processed_ranges=header.get("processed_ranges"),
+    )
+
+
+def find_column_store(path: str) -> Optional[str]:
+    """The column store for a results path: the path itself, or an up-to-date sibling store."""
+    if is_column_store(path):
+        return path
+    store = column_store_path_for(path)
+    if is_column_store(store) and store_mtime(store) >= os.path.getmtime(path):
+        return store
+    return None
+
+
+def dataset_from_file(path: str, trace_memory: bool = False) -> AnalysisDataset:
+    """Dataset from a results file (.json, .npz or column store), with its ingest stats."""
+    store = find_column_store(path)
+    if store is not None:
+        return dataset_from_store(store)
+    header, columns, stats = ingest_file(path, trace_memory=trace_memory)
+    return build_dataset(columns, header.get("video_name"), ingest=stats.to_dict(),
+                         processed_ranges=header.get("processed_ranges"))
+
+
+class LoadCancelled(Exception):
+    pass
+
+
+@dataclass
+class DatasetLoad:
+    """Progress of a background load under load_id; dataset_id is set once ready."""
+
+    load_id: str
+    source: str
+    file_size: int
+    dataset_id: Optional[str] = None  # content id of the loaded dataset
+    status: str = "loading"  # loading | ready | error | cancelled
+    frames: int = 0
+    error: Optional[str] = None
+    trailer: Dict[str, Any] = field(default_factory=dict)  # document keys after tracking_data
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    bytes_read: Callable[[], int] = lambda: 0
+    cancelled: threading.Event = field(default_factory=threading.Event)
+
+    def info(self) -> Dict[str, Any]:
+        done = self.file_size if self.status == "ready" else min(self.bytes_read(), self.file_size)
+        return {
+            "load_id": self.load_id,
+            "dataset_id": self.dataset_id,
+            "source": self.source,
+            "status": self.status,
+            "frames": self.frames,
+            "bytes_read": done,
+            "file_size": self.file_size,
+            "percentage": round(done / self.file_size * 100, 1) if self.file_size else 100.0,
+            "elapsed_sec": round((self.finished_at or time.time()) - self.started_at, 2),
+            "error": self.error,
+            "trailer": self.trailer,
+        }
+
+
+class DatasetCache:
+    """LRU of AnalysisDataset by dataset_id, bounded by count and array memory."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB):
+        self.max_entries = max_entries
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._datasets: "OrderedDict[str, AnalysisDataset]" = OrderedDict()
+        self._loads: "OrderedDict[str, DatasetLoad]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, dataset: AnalysisDataset) -> str:
+        """Store dataset (or refresh an identical one). Returns its id."""
+        with self._lock:
+            if dataset.dataset_id in self._datasets:
+                self._datasets.move_to_end(dataset.dataset_id)
+            else:
+                self._datasets[dataset.dataset_id] = dataset
+                self._evict()
+        return dataset.dataset_id
+
+    def get(self, dataset_id: str) -> Optional[AnalysisDataset]:
+        """Dataset by id, or by the handle of the background load that produced it."""
+        with self._lock:
+            dataset_id = self._resolve(dataset_id)
+            dataset = self._datasets.get(dataset_id)
+            if dataset is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._datasets.move_to_end(dataset_id)
+            return dataset
+
+    def drop(self, dataset_id: str) -> bool:
+        """Remove a dataset, or cancel its background load."""
+        with self._lock:
+            load = self._loads.get(dataset_id)
+            if load is not None and load.status == "loading":
+                load.cancelled.set()
+                return True
+            return self._datasets.pop(self._resolve(dataset_id), None) is not None
+
+    def load_status(self, dataset_id: str) -> Optional[DatasetLoad]:
+        with self._lock:
+            return self._loads.get(dataset_id)
+
+    def start_load(self, path: str, delete_after: bool = False,
+                   chunk_frames: int = DEFAULT_CHUNK_FRAMES) -> Tuple[Dict[str, Any], DatasetLoad]:
+        """
+        Read the header of a results file now and its frames on a worker thread.
+
+        Args:
+            path: Results file (.json or columnar .npz); with a column store,
+                the dataset is mapped at once and the load is already "ready"
+            delete_after: Remove the file once it has been read (uploads)
+            chunk_frames: Frame dicts held at once while building the columns
+
+        Returns:
+            (header, load); once load.status is "ready" the dataset is cached
+            under load.dataset_id (an existing identical dataset is reused) and
+            can also be fetched by load.load_id
+        """
+        store = None if delete_after else find_column_store(path)
+        if store is not None:
+            # Mapping a store takes no time: the load is finished before it starts
+            dataset = dataset_from_store(store)
+            header = open_column_store(store)[0]
+            header = {k: v for k, v in header.items() if k != STORE_KEY}
+            dataset_id = self.put(dataset)
+            load = DatasetLoad(load_id=dataset_id, source=os.path.basename(store), file_size=0,
+                               dataset_id=dataset_id, status="ready", frames=dataset.total_frames,
+                               finished_at=time.time())
+            with self._lock:
+                self._loads[load.load_id] = load
+                self._prune_loads()
+            return header, load
+
+        load = DatasetLoad(load_id=uuid.uuid4().hex[:24], source=os.path.basename(path),
+                           file_size=os.path.getsize(path))
+        if path.lower().endswith(".npz"):
+            header = load_columnar_header(path)
+            header = {k: v for k, v in header.items() if k != "columnar"}
+            read = lambda: ingest_file(path)[:2]
+            close = lambda: None
+        else:
+            f = open(path, "rb")
+            try:
+                reader = ResultsStreamReader(f)
+                header = reader.read_header()
+            except Exception:
+                f.close()
+                raise
+            load.bytes_read = lambda: reader.bytes_read
+            read = lambda: self._read_stream(reader, load, header, chunk_frames)
+            close = f.close
+
+        with self._lock:
+            self._loads[load.load_id] = load
+            self._prune_loads()
+        threading.Thread(
+            target=self._run_load, args=(load, header, read, close, path if delete_after else None),
+            daemon=True, name=f"dataset-load-{load.load_id[:8]}",
+        ).start()
+        return header, load
+
+    @staticmethod
+    def _read_stream(reader: ResultsStreamReader, load: DatasetLoad, header: Dict[str, Any],
+                     chunk_frames: int) -> Tuple[Dict[str, Any], Columns]:
+        def on_chunk(frames: int) -> None:
+            load.frames = frames
+            if load.cancelled.is_set():
+                raise LoadCancelled()
+
+        columns = stream_frames_to_columns(reader.iter_frames(), chunk_frames, on_chunk)
+        load.trailer = reader.read_trailer()
+        return {**header, **load.trailer}, columns
+
+    def _run_load(self, load: DatasetLoad, header: Dict[str, Any], read: Callable[[], Tuple[Dict, Columns]],
+                  close: Callable[[], None], delete_path: Optional[str]) -> None:
+        status = "error"
+        try:
+            _, columns, stats = measure_ingest(read, load.source)
+            if load.cancelled.is_set():
+                raise LoadCancelled()
+            dataset = build_dataset(columns, header.get("video_name"), ingest=stats.to_dict(),
+                                    processed_ranges=header.get("processed_ranges"))
+            load.frames = dataset.total_frames
+            # Content id: a dataset already cached from the same results is reused, not duplicated
+            load.dataset_id = self.put(dataset)
+            status = "ready"
+            logger.info("loaded analysis dataset %s (load %s) from %s: %d frames in %.0f ms",
+                        load.dataset_id, load.load_id, load.source, dataset.total_frames, stats.ingest_ms)
+        except LoadCancelled:
+            status = "cancelled"
+        except Exception as e:
+            load.error = str(e)
+            logger.warning("loading %s failed: %s", load.source, e)
+        finally:
+            close()
+            if delete_path is not None:
+                try:
+                    os.remove(delete_path)
+                except OSError:
+                    pass
+            # Set last: a finished load has released its file
+            load.finished_at = time.time()
+            load.status = status
+
+    def __len__(self) -> int:
+        return len(self._datasets)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "datasets": [d.info() for d in self._datasets.values()],
+                "nbytes": sum(d.nbytes for d in self._datasets.values()),
+                "resident_nbytes": sum(d.resident_nbytes for d in self._datasets.values()),
+                "max_entries": self.max_entries,
+                "memory_budget_bytes": self.memory_budget,
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": [load.info() for load in self._loads.values()],
+            }
+
+    # --- internals (call with the lock held) ---
+
+    def _evict(self) -> None:
+        total = sum(d.resident_nbytes for d in self._datasets.values())
+        # The newest dataset always stays, even if it alone exceeds the budget
+        while len(self._datasets) > 1 and (len(self._datasets) > self.max_entries or total > self.memory_budget):
+            dataset_id, dataset = self._datasets.popitem(last=False)
+            total -= dataset.resident_nbytes
+            logger.info("evicted analysis dataset %s (%s, %d frames)",
+                        dataset_id, dataset.video_name, len(dataset.x))
+
+    def _resolve(self, dataset_id: str) -> str:
+        load = self._loads.get(dataset_id)
+        return load.dataset_id if load is not None and load.dataset_id else dataset_id
+
+    def _prune_loads(self) -> None:
+        finished = [i for i, load in self._loads.items() if load.status != "loading"]
+        for dataset_id in finished[:max(0, len(finished) - MAX_FINISHED_LOADS)]:
+            del self._loads[dataset_id]
+
+
+dataset_cache = DatasetCache()
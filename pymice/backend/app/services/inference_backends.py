@@ -0,0 +1,200 @@
+"""CPU inference backends: run YOLO models through ONNX Runtime or OpenVINO.
+
+Plain PyTorch inference of an uploaded ``.pt`` is the slowest way to run a
+YOLO model on a CPU-only box. With ``inference_backend`` set to ``"onnx"`` or
+``"openvino"``, the model is exported once with Ultralytics and the exported
+artifact is loaded instead; Ultralytics' ``YOLO()`` accepts it directly, so
+tracking, test detection and live experiments use it transparently (through
+the model registry, like any other model).
+
+- Artifacts live next to the ``.pt`` under Ultralytics' default names
+  (``<stem>.onnx``, ``<stem>_openvino_model/``). They are exported with
+  dynamic input shapes, so one artifact serves every ``inference_size`` and
+  ROI crop. An artifact older than its ``.pt`` is exported again.
+- ``"onnx_int8"`` loads ``<stem>_int8.onnx``, which is not exported on
+  demand: it is calibrated on video frames by app.services.quantization.
+- The exported runtimes are CPU-only here: on CUDA/MPS, or when the runtime
+  is not installed or the export fails, the ``.pt`` is used ("pytorch").
+- `benchmark_backends` measures per-backend throughput for
+  POST /system/inference-benchmark.
+"""
+
+import importlib.util
+import logging
+import os
+import statistics
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.model_registry import model_registry
+
+logger = logging.getLogger("pymice.inference_backends")
+
+INFERENCE_BACKENDS = ("pytorch", "onnx", "openvino", "onnx_int8")
+
+# Python modules each backend needs (export + inference)
+_REQUIREMENTS = {
+    "pytorch": (),
+    "onnx": ("onnx", "onnxruntime"),
+    "openvino": ("openvino",),
+    "onnx_int8": ("onnx", "onnxruntime"),
+}
+
+_export_locks: Dict[str, threading.Lock] = {}
+_export_locks_guard = threading.Lock()
+
+
+def backend_available(backend: str) -> bool:
+    """Whether the runtime for backend is installed."""
+    if backend not in _REQUIREMENTS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+    return all(importlib.util.find_spec(module) is not None for module in _REQUIREMENTS[backend])
+
+
+def exported_model_path(model_path: str, backend: str) -> str:
+    """Where the exported artifact of model_path for backend lives (the .pt itself for pytorch)."""
+    if backend == "pytorch":
+        return model_path
+    stem, _ = os.path.splitext(model_path)
+    if backend == "onnx":
+        return stem + ".onnx"
+    if backend == "openvino":
+        return stem + "_openvino_model"
+    if backend == "onnx_int8":
+        return stem + "_int8.onnx"
+    raise ValueError(f"Unknown inference backend: {backend}")
+
+
+def _is_fresh(artifact: str, model_path: str) -> bool:
+    if not os.path.exists(artifact):
+        return False
+    if os.path.isdir(artifact):
+        # OpenVINO: the directory is only complete once the .xml is written
+        stem = os.path.splitext(os.path.basename(model_path))[0]
+        if not os.path.exists(os.path.join(artifact, stem + ".xml")):
+            return False
+    return os.path.getmtime(artifact) >= os.path.getmtime(model_path)
+
+
+def _export_lock(artifact: str) -> threading.Lock:
+    with _export_locks_guard:
+        return _export_locks.setdefault(os.path.abspath(artifact), threading.Lock())
+
+
+def _export(model_path: str, backend: str) -> str:
+    from ultralytics import YOLO
+
+    return YOLO(model_path).export(format=backend, dynamic=True, device="cpu", verbose=False)
+
+
+def ensure_exported(model_path: str, backend: str) -> str:
+    """Path of an up-to-date artifact of model_path for backend, exporting it if needed."""
+    artifact = exported_model_path(model_path, backend)
+    if backend == "pytorch":
+        return artifact
+    if backend == "onnx_int8":
+        # Needs calibration frames from a video, so it is built explicitly
+        if not _is_fresh(artifact, model_path):
+            raise RuntimeError("no up-to-date INT8 model; create it with POST /system/models/quantize")
+        return artifact
+    with _export_lock(artifact):
+        if not _is_fresh(artifact, model_path):
+            t0 = time.perf_counter()
+            exported = _export(model_path, backend)
+            if os.path.abspath(str(exported)) != os.path.abspath(artifact):
+                raise RuntimeError(f"Export wrote {exported}, expected {artifact}")
+            logger.info("exported %s to %s in %.1fs", os.path.basename(model_path), backend,
+                        time.perf_counter() - t0)
+    return artifact
+
+
+def resolve_inference_model(model_path: str, backend: str, device: str) -> Tuple[str, str]:
+    """
+    Model file to load for the requested backend on device.
+
+    Args:
+        model_path: Path of the uploaded .pt model
+        backend: Requested backend (one of INFERENCE_BACKENDS)
+        device: Device the task runs on
+
+    Returns:
+        (path to load with YOLO(), backend actually used); falls back to the .pt
+        and "pytorch" when the backend cannot be used
+    """
+    if backend == "pytorch":
+        return model_path, "pytorch"
+    if device != "cpu":
+        logger.info("inference backend %s is CPU-only; using pytorch on %s", backend, device)
+        return model_path, "pytorch"
+    if not backend_available(backend):
+        logger.warning("inference backend %s is not installed; using pytorch", backend)
+        return model_path, "pytorch"
+    try:
+        return ensure_exported(model_path, backend), backend
+    except Exception as e:
+        logger.warning("cannot use %s for %s (%s); using pytorch",
+                       backend, os.path.basename(model_path), e)
+        return model_path, "pytorch"
+
+
+def benchmark_backends(
+    model_path: str,
+    backends: Optional[List[str]] = None,
+    inference_size: int = 640,
+    runs: int = 20,
+    frame: Optional[np.ndarray] = None,
+) -> List[Dict[str, Any]]:
+    """
+    CPU throughput of model_path on each backend.
+
+    Args:
+        model_path: Path of the uploaded .pt model
+        backends: Backends to measure (default: all)
+        inference_size: YOLO inference image size
+        runs: Timed predictions per backend (after the registry's warm-up)
+        frame: BGR frame to predict on (default: a blank inference_size square)
+
+    Returns:
+        One dict per backend with export/load time, median ms per frame and fps,
+        or the reason it was skipped
+    """
+    if frame is None:
+        frame = np.zeros((inference_size, inference_size, 3), dtype=np.uint8)
+    results = []
+    for backend in backends or INFERENCE_BACKENDS:
+        row: Dict[str, Any] = {"backend": backend, "available": backend_available(backend)}
+        results.append(row)
+        if not row["available"]:
+            row["error"] = "runtime not installed"
+            continue
+        try:
+            t0 = time.perf_counter()
+            path = ensure_exported(model_path, backend)
+            t1 = time.perf_counter()
+            with model_registry.lease(path, "cpu") as model:
+                t2 = time.perf_counter()
+                times = []
+                for _ in range(max(1, runs)):
+                    start = time.perf_counter()
+                    model.predict(frame, device="cpu", imgsz=inference_size, verbose=False)
+                    times.append(time.perf_counter() - start)
+        except Exception as e:
+            row["error"] = str(e)
+            continue
+        ms = statistics.median(times) * 1000
+        row.update({
+            "export_sec": round(t1 - t0, 3),
+            "load_sec": round(t2 - t1, 3),
+            "ms_per_frame": round(ms, 2),
+            "fps": round(1000 / ms, 1) if ms > 0 else 0.0,
+        })
+
+    baseline = next((r for r in results if r["backend"] == "pytorch" and "ms_per_frame" in r), None)
+    if baseline is not None:
+        for row in results:
+            if "ms_per_frame" in row and row["ms_per_frame"] > 0:
+                row["speedup"] = round(baseline["ms_per_frame"] / row["ms_per_frame"], 2)
+    return results
@@ -0,0 +1,158 @@
+"""Bounded job scheduler for offline tracking tasks.
+
+Replaces "one BackgroundTask per request": jobs are queued per device and a
+fixed number of worker threads per device drain the queue, so ten submitted
+videos run at most `limit` at a time instead of ten models competing for the
+same CPU/GPU.
+
+- Ordering: higher priority first, FIFO within the same priority.
+- Cancellation: queued jobs can be cancelled; running jobs are stopped by
+  their own cooperative stop flag (the scheduler does not kill threads).
+- Workers are started lazily on the first job for a device.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("pymice.job_scheduler")
+
+JobRunner = Callable[[str, Any], None]
+
+
+@dataclass
+class _Job:
+    task_id: str
+    payload: Any
+    device: str
+    priority: int
+    seq: int
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    state: str = "queued"  # queued -> running -> done | cancelled
+
+
+class JobScheduler:
+    """Per-device bounded worker pools fed by priority queues."""
+
+    def __init__(self, runner: JobRunner, limits: Dict[str, int], default_limit: int = 1):
+        self._runner = runner
+        self._limits = dict(limits)
+        self._default_limit = max(1, default_limit)
+        self._cond = threading.Condition()
+        self._queues: Dict[str, List[tuple]] = {}
+        self._jobs: Dict[str, _Job] = {}
+        self._workers: Dict[str, List[threading.Thread]] = {}
+        self._seq = itertools.count()
+        self._completed = 0
+
+    # --- public API ---
+
+    def submit(self, task_id: str, payload: Any, device: str, priority: int = 0) -> None:
+        with self._cond:
+            if task_id in self._jobs and self._jobs[task_id].state in ("queued", "running"):
+                raise ValueError(f"Task already scheduled: {task_id}")
+            job = _Job(task_id=task_id, payload=payload, device=device,
+                       priority=priority, seq=next(self._seq))
+            self._jobs[task_id] = job
+            heapq.heappush(self._queues.setdefault(device, []), (-priority, job.seq, task_id))
+            self._ensure_workers(device)
+            self._cond.notify_all()
+
+    def cancel(self, task_id: str) -> bool:
+        """Cancel a queued job. Returns False if it is unknown or already running."""
+        with self._cond:
+            job = self._jobs.get(task_id)
+            if job is None or job.state != "queued":
+                return False
+            # Lazy deletion: the heap entry is skipped when popped
+            job.state = "cancelled"
+            return True
+
+    def state(self, task_id: str) -> Optional[str]:
+        with self._cond:
+            job = self._jobs.get(task_id)
+            return job.state if job is not None else None
+
+    def queue_position(self, task_id: str) -> Optional[int]:
+        """0-based position among queued jobs of the same device, or None if not queued."""
+        with self._cond:
+            job = self._jobs.get(task_id)
+            if job is None or job.state != "queued":
+                return None
+            ahead = [
+                entry for entry in self._queues.get(job.device, [])
+                if self._is_live(entry) and entry < (-job.priority, job.seq, task_id)
+            ]
+            return len(ahead)
+
+    def limit_for(self, device: str) -> int:
+        return max(1, self._limits.get(device, self._default_limit))
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            devices = {}
+            for device in set(self._queues) | set(self._workers):
+                queued = sorted(e for e in self._queues.get(device, []) if self._is_live(e))
+                running = [j for j in self._jobs.values() if j.device == device and j.state == "running"]
+                devices[device] = {
+                    "limit": self.limit_for(device),
+                    "running": [j.task_id for j in running],
+                    "queued": [task_id for _, _, task_id in queued],
+                }
+            return {"devices": devices, "completed": self._completed}
+
+    # --- workers ---
+
+    def _is_live(self, entry: tuple) -> bool:
+        """True if a heap entry still refers to a queued job (not cancelled or superseded)."""
+        job = self._jobs.get(entry[2])
+        return job is not None and job.seq == entry[1] and job.state == "queued"
+
+    def _ensure_workers(self, device: str) -> None:
+        workers = self._workers.setdefault(device, [])
+        workers[:] = [w for w in workers if w.is_alive()]
+        while len(workers) < self.limit_for(device):
+            w = threading.Thread(
+                target=self._worker_loop, args=(device,),
+                name=f"tracking-{device}-{len(workers)}", daemon=True,
+            )
+            workers.append(w)
+            w.start()
+
+    def _next_job(self, device: str) -> _Job:
+        with self._cond:
+            while True:
+                q = self._queues.get(device, [])
+                while q:
+                    entry = heapq.heappop(q)
+                    if not self._is_live(entry):
+                        job = self._jobs.get(entry[2])
+                        if job is not None and job.seq == entry[1] and job.state == "cancelled":
+                            del self._jobs[entry[2]]
+                        continue
+                    job = self._jobs[entry[2]]
+                    job.state = "running"
+                    job.started_at = time.time()
+                    return job
+                self._cond.wait()
+
+    def _worker_loop(self, device: str) -> None:
+        while True:
+            job = self._next_job(device)
+            logger.info("running %s on %s (waited %.1fs)",
+                        job.task_id, device, job.started_at - job.submitted_at)
+            try:
+                self._runner(job.task_id, job.payload)
+            except Exception:
+                logger.exception("job %s raised", job.task_id)
+            finally:
+                with self._cond:
+                    job.state = "done"
+                    self._completed += 1
+                    # Finished jobs are not kept; their outcome lives with the caller
+                    self._jobs.pop(job.task_id, None)
@@ -0,0 +1,254 @@
+"""Process-wide registry of loaded inference models.
+
+Tracking tasks, test detections and live experiments used to call
+``YOLO(model_path)`` (or ``build_sam3_video_model``) from scratch every time,
+paying seconds of load time per task and holding one copy of the weights per
+running task. The registry loads a model once, warms it up, and keeps it for
+the next caller.
+
+- Key: (absolute path, file mtime, device, kind). Replacing a model file on
+  disk changes its mtime, so stale instances are never handed out.
+- Leases: an instance is used by one caller at a time (Ultralytics predictors
+  keep per-call state). ``acquire()`` reuses an idle instance or loads a new
+  one; ``release()`` returns it to the idle pool.
+- Eviction: idle instances are dropped least-recently-used first whenever the
+  total estimated weight memory exceeds the budget. Leased instances are never
+  evicted; they are counted so the budget reflects what is actually resident.
+"""
+
+import gc
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("pymice.model_registry")
+
+DEFAULT_MEMORY_BUDGET_MB = 2048
+WARMUP_IMGSZ = 320
+
+ModelKey = Tuple[str, int, str, str]  # (abspath, mtime_ns, device, kind)
+Loader = Callable[[str, str], Any]  # (model_path, device) -> instance
+Warmup = Callable[[Any, str], None]  # (instance, device) -> None
+
+
+def load_yolo(model_path: str, device: str) -> Any:
+    from ultralytics import YOLO
+
+    model = YOLO(model_path)
+    if device not in ("cpu", None):
+        model.to(device)
+    return model
+
+
+def warmup_yolo(model: Any, device: str) -> None:
+    """One dummy forward pass so the first real frame does not pay for setup."""
+    model.predict(np.zeros((WARMUP_IMGSZ, WARMUP_IMGSZ, 3), dtype=np.uint8),
+                  device=device, imgsz=WARMUP_IMGSZ, verbose=False)
+
+
+def estimate_model_bytes(instance: Any, model_path: str) -> int:
+    """Weight + buffer bytes of a torch-backed model, or the file size as a fallback."""
+    module = instance
+    inner = getattr(instance, "model", None)  # Ultralytics wraps the nn.Module
+    if inner is not None and hasattr(inner, "parameters"):
+        module = inner
+    try:
+        tensors = list(module.parameters()) + list(module.buffers())
+        total = sum(t.numel() * t.element_size() for t in tensors)
+        if total > 0:
+            return int(total)
+    except Exception:
+        pass
+    try:
+        return os.path.getsize(model_path)
+    except OSError:
+        return 0
+
+
+@dataclass
+class _Entry:
+    key: ModelKey
+    instance: Any
+    nbytes: int
+    loaded_at: float
+    last_used: float
+    leased: bool = False
+
+
+class ModelRegistry:
+    """Thread-safe pool of loaded models with LRU eviction of idle instances."""
+
+    def __init__(self, memory_budget_bytes: int = DEFAULT_MEMORY_BUDGET_MB * 1024 * 1024):
+        self.memory_budget_bytes = memory_budget_bytes
+        self._lock = threading.Lock()
+        self._idle: "OrderedDict[int, _Entry]" = OrderedDict()  # id(instance) -> entry, LRU first
+        self._leased: Dict[int, _Entry] = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "load_sec": 0.0, "warmup_sec": 0.0}
+
+    # --- public API ---
+
+    def acquire(
+        self,
+        model_path: str,
+        device: str,
+        kind: str = "yolo",
+        loader: Optional[Loader] = None,
+        warmup: Optional[Warmup] = None,
+    ) -> Any:
+        """Lease an instance of model_path on device, loading it if none is idle.
+
+        For kind "yolo" the loader and warm-up default to Ultralytics YOLO.
+        The caller must hand the instance back with release().
+        """
+        if kind == "yolo":
+            loader = loader or load_yolo
+            warmup = warmup or warmup_yolo
+        if loader is None:
+            raise ValueError(f"No loader given for model kind '{kind}'")
+
+        key = self._key(model_path, device, kind)
+        with self._lock:
+            entry = self._take_idle(key)
+            if entry is not None:
+                self._stats["hits"] += 1
+                return entry.instance
+            # Every idle copy is leased out (or none was loaded yet): load another
+            self._stats["misses"] += 1
+            self._drop_stale(key)
+
+        t0 = time.perf_counter()
+        instance = loader(model_path, device)
+        t1 = time.perf_counter()
+        if warmup is not None:
+            warmup(instance, device)
+        t2 = time.perf_counter()
+        logger.info("loaded %s [%s/%s] in %.2fs (+%.2fs warm-up)",
+                    os.path.basename(model_path), kind, device, t1 - t0, t2 - t1)
+
+        entry = _Entry(key=key, instance=instance, nbytes=estimate_model_bytes(instance, model_path),
+                       loaded_at=time.time(), last_used=time.time(), leased=True)
+        with self._lock:
+            self._stats["load_sec"] += t1 - t0
+            self._stats["warmup_sec"] += t2 - t1
+            self._leased[id(instance)] = entry
+            self._evict_over_budget()
+        return instance
+
+    def release(self, instance: Any, discard: bool = False) -> None:
+        """Return a leased instance. discard=True drops it instead (e.g. after a device error).
+
+        Instances the registry did not hand out are ignored.
+        """
+        if instance is None:
+            return
+        with self._lock:
+            entry = self._leased.pop(id(instance), None)
+            if entry is None:
+                return
+            entry.leased = False
+            entry.last_used = time.time()
+            if not discard:
+                self._idle[id(instance)] = entry
+                self._evict_over_budget()
+        if discard:
+            _free_memory()
+
+    @contextmanager
+    def lease(self, model_path: str, device: str, kind: str = "yolo",
+              loader: Optional[Loader] = None, warmup: Optional[Warmup] = None) -> Iterator[Any]:
+        instance = self.acquire(model_path, device, kind=kind, loader=loader, warmup=warmup)
+        try:
+            yield instance
+        finally:
+            self.release(instance)
+
+    def clear(self) -> int:
+        """Drop every idle instance. Returns how many were dropped."""
+        with self._lock:
+            dropped = len(self._idle)
+            self._idle.clear()
+        if dropped:
+            _free_memory()
+        return dropped
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = list(self._idle.values()) + list(self._leased.values())
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "hits": self._stats["hits"],
+                "misses": self._stats["misses"],
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "evictions": self._stats["evictions"],
+                "load_sec": round(self._stats["load_sec"], 3),
+                "warmup_sec": round(self._stats["warmup_sec"], 3),
+                "memory_budget_mb": round(self.memory_budget_bytes / 1024 ** 2, 1),
+                "resident_mb": round(sum(e.nbytes for e in entries) / 1024 ** 2, 1),
+                "models": [
+                    {
+                        "model": os.path.basename(e.key[0]),
+                        "device": e.key[2],
+                        "kind": e.key[3],
+                        "size_mb": round(e.nbytes / 1024 ** 2, 1),
+                        "leased": e.leased,
+                        "idle_sec": 0.0 if e.leased else round(time.time() - e.last_used, 1),
+                    }
+                    for e in entries
+                ],
+            }
+
+    # --- internals (call with the lock held) ---
+
+    @staticmethod
+    def _key(model_path: str, device: str, kind: str) -> ModelKey:
+        path = os.path.abspath(model_path)
+        return (path, os.stat(path).st_mtime_ns, device, kind)
+
+    def _take_idle(self, key: ModelKey) -> Optional[_Entry]:
+        # Most recently used first: it is the likeliest to still be warm on the device
+        for ident in reversed(self._idle):
+            entry = self._idle[ident]
+            if entry.key == key:
+                del self._idle[ident]
+                entry.leased = True
+                entry.last_used = time.time()
+                self._leased[ident] = entry
+                return entry
+        return None
+
+    def _drop_stale(self, key: ModelKey) -> None:
+        """Forget idle instances of the same file/device/kind loaded from an older mtime."""
+        path, mtime, device, kind = key
+        for ident in [i for i, e in self._idle.items()
+                      if e.key[0] == path and e.key[2:] == (device, kind) and e.key[1] != mtime]:
+            del self._idle[ident]
+            self._stats["evictions"] += 1
+
+    def _evict_over_budget(self) -> None:
+        resident = sum(e.nbytes for e in self._idle.values()) + sum(e.nbytes for e in self._leased.values())
+        while self._idle and resident > self.memory_budget_bytes:
+            _, entry = self._idle.popitem(last=False)
+            resident -= entry.nbytes
+            self._stats["evictions"] += 1
+            logger.info("evicted %s [%s/%s]", os.path.basename(entry.key[0]), entry.key[3], entry.key[2])
+
+
+def _free_memory() -> None:
+    gc.collect()
+    try:
+        import torch
+
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except Exception:
+        pass
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,104 @@
+"""Tests for sequential background estimation and its on-disk cache."""
+
+import os
+
+import cv2
+import numpy as np
+
+from app.processing import background as bg
+
+
+def _write_video(path, n_frames=40, size=(64, 48)):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, size)
+    rng = np.random.default_rng(0)
+    for i in range(n_frames):
+        frame = np.full((size[1], size[0], 3), 180, dtype=np.uint8)
+        frame[10:20, i % 40:(i % 40) + 12] = 30  # moving dark blob
+        frame += rng.integers(0, 8, frame.shape, dtype=np.uint8)
+        writer.write(frame)
+    writer.release()
+
+
+def _seek_background(path, sample_frames):
+    """Reference: seek to every sampled index, as the estimator used to."""
+    cap = cv2.VideoCapture(path)
+    indices = bg.sample_indices(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), sample_frames)
+    frames = []
+    for idx in indices:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(idx))
+        ret, frame = cap.read()
+        if ret:
+            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    cap.release()
+    return np.median(np.array(frames, dtype=np.float32), axis=0).astype(np.uint8)
+
+
+def test_tiled_median_matches_float_median_for_any_tile_size():
+    rng = np.random.default_rng(1)
+    for n in (1, 2, 7, 10):
+        stack = rng.integers(0, 256, (n, 13, 17), dtype=np.uint8)
+        expected = np.median(stack.astype(np.float32), axis=0).astype(np.uint8)
+        for memory_limit in (1, 500, 10 ** 9):  # one row per tile ... whole stack
+            assert np.array_equal(bg.tiled_median(stack, memory_limit), expected)
+
+
+def test_sequential_pass_matches_seeking(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    _write_video(path)
+    for sample_frames in (5, 20, 60):  # 60 > 21 frames in range: repeated indices
+        expected = _seek_background(path, sample_frames)
+        assert np.array_equal(bg.estimate_background(path, sample_frames), expected)
+        assert np.array_equal(bg.estimate_background(path, sample_frames, memory_limit=1), expected)
+    assert bg.estimate_background(str(tmp_path / "missing.avi")) is None
+
+
+def test_cache_hit_skips_decoding_and_key_follows_content(tmp_path, monkeypatch):
+    path = str(tmp_path / "clip.avi")
+    _write_video(path)
+    cache_dir = str(tmp_path / "cache")
+    first = bg.cached_background(path, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("background recomputed")
+
+    monkeypatch.setattr(bg, "estimate_background", fail)
+    copy = str(tmp_path / "copy.avi")
+    with open(path, "rb") as src, open(copy, "wb") as dst:
+        dst.write(src.read())
+    assert np.array_equal(bg.cached_background(copy, cache_dir=cache_dir), first)  # same content, new name
+
+    assert bg.background_cache_path(path, 50, cache_dir) != bg.background_cache_path(path, 100, cache_dir)
+    other = str(tmp_path / "other.avi")
+    _write_video(other, n_frames=30)
+    assert bg.background_cache_path(other, cache_dir=cache_dir) != bg.background_cache_path(path, cache_dir=cache_dir)
+
+
+def test_cache_is_pruned_to_max_files(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    for n in (20, 25, 30):
+        path = str(tmp_path / f"clip{n}.avi")
+        _write_video(path, n_frames=n)
+        bg.cached_background(path, cache_dir=cache_dir, max_files=2)
+    assert len(os.listdir(cache_dir)) == 2
+
+
+def test_failed_cache_write_is_a_miss_not_an_error(tmp_path, monkeypatch):
+    path = str(tmp_path / "clip.avi")
+    _write_video(path)
+    cache_dir = str(tmp_path / "cache")
+    os.makedirs(cache_dir)
+    in_progress = os.path.join(cache_dir, "other.npy.abc.tmp")  # another writer's temp file
+    open(in_progress, "wb").close()
+
+    def lost_race(src, dst):
+        os.remove(src)  # e.g. a concurrent writer cleaned up first
+        raise FileNotFoundError(src)
+
+    monkeypatch.setattr(bg.os, "replace", lost_race)
+    assert bg.cached_background(path, cache_dir=cache_dir, max_files=0) is not None
+    assert os.listdir(cache_dir) == ["other.npy.abc.tmp"]
+
+    monkeypatch.undo()
+    bg.cached_background(path, cache_dir=cache_dir, max_files=0)
+    assert os.path.exists(in_progress)  # pruning leaves temp files alone
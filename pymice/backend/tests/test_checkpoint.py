@@ -0,0 +1,83 @@
+"""Tests for tracking checkpoints and resuming the streamed results."""
+
+import json
+import os
+
+import numpy as np
+
+from app.processing.checkpoint import (
+    CheckpointPolicy,
+    TrackingCheckpoint,
+    load_background,
+    load_checkpoint,
+    resumable_task_files,
+    save_background,
+    save_checkpoint,
+    tracking_config_hash,
+)
+from app.processing.results_writer import StreamingResultsWriter
+
+
+def _files(tmp_path):
+    video = tmp_path / "v.mp4"
+    model = tmp_path / "m.pt"
+    video.write_bytes(b"video")
+    model.write_bytes(b"model")
+    return str(video), str(model)
+
+
+def test_config_hash_tracks_result_fields_and_files(tmp_path):
+    video, model = _files(tmp_path)
+    request = {"video_filename": "v.mp4", "model_name": "m.pt", "confidence_threshold": 0.5,
+               "batch_size": 1, "priority": 0}
+    h = tracking_config_hash(request, video, model)
+
+    assert tracking_config_hash({**request, "batch_size": 16, "priority": 5}, video, model) == h
+    assert tracking_config_hash({**request, "confidence_threshold": 0.6}, video, model) != h
+    with open(model, "ab") as f:
+        f.write(b"retrained")
+    assert tracking_config_hash(request, video, model) != h
+
+
+def test_checkpoint_and_background_roundtrip(tmp_path):
+    path = str(tmp_path / "t_checkpoint.json")
+    assert load_checkpoint(path) is None
+
+    background = np.arange(24, dtype=np.uint8).reshape(2, 4, 3)
+    bg_path = save_background(str(tmp_path / "t_background.npy"), background)
+    checkpoint = TrackingCheckpoint(task_id="t", config_hash="abc", request={"video_filename": "v.mp4"},
+                                    total_frames=10, next_frame=4, frames_written=4, frames_offset=99,
+                                    counters={"yolo_detections": 3}, background_path=bg_path)
+    save_checkpoint(path, checkpoint)
+
+    loaded = load_checkpoint(path)
+    assert loaded == checkpoint
+    assert np.array_equal(load_background(loaded.background_path), background)
+    assert str(tmp_path / "v.mp4") in resumable_task_files(str(tmp_path), str(tmp_path))
+
+
+def test_resumed_writer_drops_frames_after_checkpoint(tmp_path):
+    results_path = str(tmp_path / "t_results.json")
+    writer = StreamingResultsWriter(results_path, flush_every=2)
+    for i in range(5):
+        writer.append({"frame_number": i})
+    offset, count = writer.offset(), len(writer)
+    for i in range(5, 8):  # written after the checkpoint, then the task dies
+        writer.append({"frame_number": i})
+    writer.close()
+
+    resumed = StreamingResultsWriter(results_path, resume_offset=offset, resume_count=count)
+    for i in range(5, 10):
+        resumed.append({"frame_number": i})
+    assert len(resumed) == 10
+    resumed.finalize({"video_name": "v"})
+
+    with open(results_path) as f:
+        frames = json.load(f)["tracking_data"]
+    assert [f["frame_number"] for f in frames] == list(range(10))
+    assert not os.path.exists(resumed.frames_path)
+
+
+def test_policy_by_frames():
+    policy = CheckpointPolicy(every_frames=10, every_sec=3600)
+    assert [n for n in range(1, 35) if policy.due(n)] == [10, 20, 30]
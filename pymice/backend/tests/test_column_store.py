@@ -0,0 +1,89 @@
+"""Tests for the memory-mapped column store."""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.processing.column_store import ColumnStoreBuilder, is_column_store, open_column_store
+from app.processing.results_writer import StreamingResultsWriter, column_store_path_for
+from app.services.dataset_cache import DatasetCache, dataset_from_file
+
+
+def _frames(n, missing=(1, 4)):
+    return [
+        {"frame_number": i, "centroid_x": None if i in missing else 10.0 + i,
+         "centroid_y": None if i in missing else 5.0, "roi": None, "roi_index": 0 if i % 2 else None,
+         "detection_method": "none" if i in missing else "template", "timestamp_sec": i / 25.0}
+        for i in range(n)
+    ]
+
+
+def _finalize(tmp_path, frames):
+    results_path = str(tmp_path / "t_results.json")
+    writer = StreamingResultsWriter(results_path)
+    for f in frames:
+        writer.append(f)
+    writer.finalize({"video_name": "v.mp4", "rois": []}, store_path=column_store_path_for(results_path))
+    return results_path
+
+
+def test_store_is_the_mapped_analysis_dataset(tmp_path):
+    results_path = _finalize(tmp_path, _frames(30))
+    store = column_store_path_for(results_path)
+    assert is_column_store(store) and not os.path.exists(store + ".tmp")
+
+    header, columns = open_column_store(store)
+    assert header["video_name"] == "v.mp4" and header["column_store"]["total_frames"] == 30
+    assert isinstance(columns["x"], np.memmap) and not columns["x"].flags.writeable
+
+    mapped = dataset_from_file(results_path)  # picks up the sibling store
+    assert mapped.mapped and mapped.resident_nbytes == 0 and mapped.total_frames == 30
+    assert mapped.frame_number.tolist() == [i for i in range(30) if i not in (1, 4)]
+
+
+def test_store_and_parsed_results_share_the_dataset_id(tmp_path):
+    results_path = _finalize(tmp_path, _frames(30))
+    copy = tmp_path / "copy.json"
+    copy.write_text(open(results_path).read())
+    parsed = dataset_from_file(str(copy))
+    mapped = dataset_from_file(column_store_path_for(results_path))
+    assert not parsed.mapped and parsed.dataset_id == mapped.dataset_id
+    for name in ("x", "y", "timestamp", "roi_index", "method"):
+        assert np.array_equal(getattr(parsed, name), getattr(mapped, name))
+
+
+def test_stale_store_is_ignored(tmp_path):
+    results_path = _finalize(tmp_path, _frames(10))
+    later = os.path.getmtime(results_path) + 10
+    os.utime(results_path, (later, later))
+    assert not dataset_from_file(results_path).mapped
+
+
+def test_background_load_of_a_store_is_ready_at_once(tmp_path):
+    results_path = _finalize(tmp_path, _frames(12))
+    cache = DatasetCache(memory_budget_mb=0)
+    header, load = cache.start_load(results_path)
+    assert load.status == "ready" and header == {"video_name": "v.mp4", "rois": []}
+    assert cache.get(load.dataset_id).mapped
+    assert cache.stats()["resident_nbytes"] == 0
+
+
+def test_builder_chunks_and_empty_store(tmp_path):
+    builder = ColumnStoreBuilder(chunk_frames=4)
+    for f in _frames(11):
+        builder.append(f)
+    assert len(builder) == 11 and builder.columns()["frame_number"].tolist() == list(range(11))
+
+    path = ColumnStoreBuilder().save(str(tmp_path / "empty.columns"), {})
+    header, columns = open_column_store(path)
+    assert header["column_store"]["total_frames"] == 0 and len(columns["x"]) == 0
+
+
+def test_invalid_frames_skip_the_store(tmp_path):
+    frames = _frames(5)
+    frames[3]["detection_method"] = "magic"
+    results_path = _finalize(tmp_path, frames)
+    assert json.load(open(results_path))["tracking_data"] == frames
+    assert not os.path.exists(column_store_path_for(results_path))
@@ -0,0 +1,76 @@
+"""Tests for the columnar (.npz) tracking results format."""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.processing.columnar import build_columnar, columnar_to_document, load_columnar
+from app.processing.results_writer import StreamingResultsWriter, columnar_path_for
+
+
+def _frames(n):
+    frames = []
+    for i in range(n):
+        frame = {
+            "frame_number": i,
+            "centroid_x": float(10 + i) if i % 4 else None,
+            "centroid_y": float(20 + i) if i % 4 else None,
+            "roi": f"roi_{i % 2}" if i % 4 else None,
+            "roi_index": i % 2 if i % 4 else None,
+            "detection_method": ["none", "yolo", "template", "yolo"][i % 4],
+            "timestamp_sec": i / 30.0,
+        }
+        if i % 4 == 1:
+            frame["mask"] = [[1.0, 2.0], [3.0, 4.0], [5.0, float(i)]]
+        if i % 4 == 3:
+            frame["keypoints"] = [{"x": 1.5, "y": 2.5, "conf": 0.75}]
+        if i == 5:
+            frame["mask"] = []
+        if i % 7 == 6:
+            frame["gated"] = True
+        frames.append(frame)
+    return frames
+
+
+def _header():
+    return {
+        "video_name": "v.mp4",
+        "video_info": {"total_frames": 40, "fps": 30.0},
+        "statistics": {"yolo_detections": 20},
+        "rois": [{"roi_type": "Circle", "center_x": 1.0, "center_y": 2.0, "radius": 3.0}],
+    }
+
+
+def test_roundtrip_matches_json_document(tmp_path):
+    frames = _frames(40)
+    path = str(tmp_path / "t_results.npz")
+    build_columnar(frames).save(path, _header())
+
+    header, columns = load_columnar(path)
+    assert columns["centroid_x"].dtype == np.float32
+    assert len(columns["frame_number"]) == 40
+    assert columnar_to_document(header, columns) == {**_header(), "tracking_data": frames}
+
+
+def test_writer_finalize_emits_both_formats(tmp_path):
+    results_path = str(tmp_path / "t_results.json")
+    writer = StreamingResultsWriter(results_path, flush_every=7)
+    for frame in _frames(2000):
+        writer.append(frame)
+    writer.finalize(_header(), columnar_path=columnar_path_for(results_path))
+
+    npz_path = str(tmp_path / "t_results.npz")
+    with open(results_path) as f:
+        document = json.load(f)
+    header, columns = load_columnar(npz_path)
+    assert columnar_to_document(header, columns) == document
+    assert os.path.getsize(npz_path) * 10 < os.path.getsize(results_path)
+
+
+def test_rejects_plain_npz(tmp_path):
+    path = str(tmp_path / "other.npz")
+    np.savez(path, x=np.arange(3))
+    with pytest.raises(ValueError):
+        load_columnar(path)
@@ -0,0 +1,72 @@
+"""Tests for the CPU thread governor (budgets, live priority, per-thread apply)."""
+
+import threading
+
+import cv2
+import pytest
+import torch
+
+from app.services.cpu_governor import CpuGovernor, split_threads
+
+
+@pytest.fixture(autouse=True)
+def restore_thread_pools():
+    torch_threads, opencv_threads = torch.get_num_threads(), cv2.getNumThreads()
+    yield
+    torch.set_num_threads(torch_threads)
+    cv2.setNumThreads(opencv_threads)
+
+
+def test_split_gives_live_priority_and_at_least_one_thread():
+    assert split_threads(8, ["offline"]) == [8]
+    assert split_threads(8, ["offline", "offline"]) == [4, 4]
+    assert split_threads(8, ["live", "offline"]) == [6, 2]
+    assert split_threads(4, ["offline", "live", "offline"]) == [1, 3, 1]
+    assert split_threads(1, ["live", "offline"]) == [1, 1]
+    assert split_threads(8, []) == []
+
+
+def test_budgets_follow_leases():
+    governor = CpuGovernor(total_threads=8)
+    offline = governor.lease("track_1")
+    assert offline.budget().torch_threads == 8
+    assert offline.budget().decoder_threads == 2
+
+    with governor.lease("exp_1", kind="live") as live:
+        assert (live.budget().torch_threads, offline.budget().torch_threads) == (6, 2)
+        assert [entry["task_id"] for entry in governor.stats()["leases"]] == ["track_1", "exp_1"]
+        assert governor.stats()["opencv_threads"] == 2
+
+    assert offline.budget().torch_threads == 8
+    offline.release()
+    assert governor.stats()["leases"] == []
+
+
+def test_apply_sets_torch_threads_per_calling_thread():
+    governor = CpuGovernor(total_threads=4)
+    first = governor.lease("a")
+    seen = {}
+
+    def run(lease, name, ready, go):
+        lease.apply()
+        ready.set()
+        go.wait()
+        seen[name] = torch.get_num_threads()
+
+    go = threading.Event()
+    ready_a = threading.Event()
+    thread_a = threading.Thread(target=run, args=(first, "a", ready_a, go))
+    thread_a.start()
+    ready_a.wait()
+    second = governor.lease("b", kind="live")  # a now has 1 thread, b has 3
+    ready_b = threading.Event()
+    thread_b = threading.Thread(target=run, args=(second, "b", ready_b, go))
+    thread_b.start()
+    ready_b.wait()
+    go.set()
+    thread_a.join()
+    thread_b.join()
+
+    assert seen == {"a": 4, "b": 3}  # a keeps what it applied until its next apply()
+    first.release()
+    second.release()
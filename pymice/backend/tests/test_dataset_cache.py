@@ -0,0 +1,136 @@
+"""Tests for the analysis dataset cache."""
+
+import json
+import time
+
+import numpy as np
+import pytest
+
+from app.models.schemas import TrackingFrame
+from app.processing.columnar import build_columnar
+from app.services.dataset_cache import DatasetCache, dataset_from_columns, dataset_from_file, dataset_from_frames
+
+
+def _frames(n, missing=(1,)):
+    return [
+        {
+            "frame_number": i,
+            "centroid_x": None if i in missing else 10.0 + i,
+            "centroid_y": None if i in missing else 20.5 - i,
+            "roi": None,
+            "roi_index": None,
+            "detection_method": "none" if i in missing else "yolo",
+            "timestamp_sec": i / 30,
+        }
+        for i in range(n)
+    ]
+
+
+def test_frames_objects_dicts_and_columns_give_the_same_dataset():
+    frames = _frames(6)
+    from_dicts = dataset_from_frames(frames, "clip.mp4")
+    from_models = dataset_from_frames([TrackingFrame(**f) for f in frames], "clip.mp4")
+    builder = build_columnar(frames)
+    from_columns = dataset_from_columns({"video_name": "clip.mp4", "columnar": builder.code_tables()},
+                                        builder.columns())
+
+    assert from_dicts.total_frames == 6
+    assert from_dicts.frame_number.tolist() == [0, 2, 3, 4, 5]  # frame 1 has no centroid
+    assert from_dicts.x.tolist() == [10.0, 12.0, 13.0, 14.0, 15.0]
+    assert from_columns.video_name == "clip.mp4"
+    for other in (from_models, from_columns):
+        assert other.dataset_id == from_dicts.dataset_id
+        assert np.array_equal(other.timestamp, from_dicts.timestamp)
+    assert dataset_from_frames(_frames(6, missing=(2,))).dataset_id != from_dicts.dataset_id
+    assert dataset_from_frames([]).total_frames == 0
+
+
+def test_lru_eviction_by_count_and_memory():
+    datasets = [dataset_from_frames(_frames(n, missing=())) for n in (10, 11, 12)]
+    cache = DatasetCache(max_entries=2)
+    for dataset in datasets[:2]:
+        cache.put(dataset)
+    assert cache.get(datasets[0].dataset_id) is datasets[0]  # now most recently used
+    cache.put(datasets[2])
+    assert cache.get(datasets[1].dataset_id) is None
+    assert cache.get(datasets[0].dataset_id) is datasets[0]
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+    small = DatasetCache(memory_budget_mb=datasets[0].nbytes * 1.5 / 1024 / 1024)
+    small.put(datasets[0])
+    small.put(datasets[1])
+    assert len(small) == 1 and small.get(datasets[1].dataset_id) is datasets[1]
+
+
+def test_registering_twice_keeps_one_copy(tmp_path):
+    path = tmp_path / "results.json"
+    path.write_text(json.dumps({"video_name": "clip.mp4", "tracking_data": _frames(5)}))
+    cache = DatasetCache()
+    first = dataset_from_file(str(path), trace_memory=True)
+    assert first.ingest["frames"] == 5 and first.ingest["peak_bytes"] > 0
+    assert cache.put(first) == cache.put(dataset_from_frames(_frames(5)))
+    assert len(cache) == 1
+    assert cache.drop(first.dataset_id) and not cache.drop(first.dataset_id)
+
+
+def _wait(cache, dataset_id, timeout=10.0):
+    deadline = time.time() + timeout
+    while cache.load_status(dataset_id).status == "loading" and time.time() < deadline:
+        time.sleep(0.01)
+    return cache.load_status(dataset_id)
+
+
+def test_background_load_returns_the_header_first(tmp_path):
+    path = tmp_path / "results.json"
+    path.write_text(json.dumps({"video_name": "clip.mp4", "video_info": {"fps": 30.0}, "tracking_data": _frames(50)}))
+    cache = DatasetCache()
+    header, load = cache.start_load(str(path), delete_after=True, chunk_frames=7)
+    assert header == {"video_name": "clip.mp4", "video_info": {"fps": 30.0}}
+
+    load = _wait(cache, load.load_id)
+    assert load.status == "ready" and load.info()["percentage"] == 100.0
+    dataset = cache.get(load.dataset_id)
+    assert np.array_equal(dataset.x, dataset_from_frames(_frames(50)).x)
+    assert not path.exists()
+
+
+def test_loading_the_same_file_twice_keeps_one_copy(tmp_path):
+    path = tmp_path / "results.json"
+    path.write_text(json.dumps({"video_name": "clip.mp4", "tracking_data": _frames(30)}))
+    cache = DatasetCache()
+    loads = [_wait(cache, cache.start_load(str(path))[1].load_id) for _ in range(2)]
+    assert loads[0].load_id != loads[1].load_id
+    assert loads[0].dataset_id == loads[1].dataset_id == dataset_from_frames(_frames(30)).dataset_id
+    assert len(cache) == 1
+    assert cache.get(loads[0].load_id) is cache.get(loads[1].dataset_id)  # the handle resolves too
+    assert cache.drop(loads[1].load_id) and len(cache) == 0
+
+
+def test_background_load_reports_bad_frames(tmp_path):
+    frames = _frames(20)
+    frames[15]["detection_method"] = "magic"
+    path = tmp_path / "results.json"
+    path.write_text(json.dumps({"tracking_data": frames}))
+    cache = DatasetCache()
+    _, load = cache.start_load(str(path), chunk_frames=4)
+    load = _wait(cache, load.load_id)
+    assert load.status == "error" and "frame index 15" in load.error
+    assert load.dataset_id is None and cache.get(load.load_id) is None
+
+    path.write_text("[]")
+    with pytest.raises(ValueError):
+        cache.start_load(str(path))
+
+
+def test_partial_results_keep_their_processed_ranges(tmp_path):
+    frames = _frames(10)[:3] + _frames(10)[5:8]  # two shards stopped early
+    path = tmp_path / "results.json"
+    path.write_text(json.dumps({"partial": True, "processed_ranges": [[0, 3], [5, 8]], "tracking_data": frames}))
+    dataset = dataset_from_file(str(path))
+    assert dataset.info()["partial"] and dataset.processed_ranges == [[0, 3], [5, 8]]
+
+    cache = DatasetCache()
+    _, load = cache.start_load(str(path))
+    assert _wait(cache, load.load_id).status == "ready"
+    assert cache.get(load.load_id).processed_ranges == [[0, 3], [5, 8]]
+    assert not dataset_from_frames(_frames(5)).info()["partial"]
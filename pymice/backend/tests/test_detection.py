@@ -0,0 +1,38 @@
+"""Tests for the template-matching fallback detector."""
+
+import numpy as np
+
+from app.processing.detection import TemplateMatcher, template_matching
+
+
+def _frame(x, y, size=(120, 160)):
+    frame = np.full((*size, 3), 200, dtype=np.uint8)
+    frame[y:y + 10, x:x + 20] = 20  # dark 20 x 10 "mouse"
+    return frame
+
+
+BACKGROUND = np.full((120, 160), 200, dtype=np.uint8)
+
+
+def test_finds_blob_centroid_and_respects_roi_mask():
+    matcher = TemplateMatcher(BACKGROUND)
+    assert matcher.match(_frame(30, 40)) == (39, 44)
+    assert matcher.match(_frame(30, 40)[:, :, 0]) == (39, 44)  # grayscale input
+    assert matcher.match(np.full((120, 160, 3), 200, dtype=np.uint8)) is None
+
+    roi_mask = np.zeros((120, 160), dtype=np.uint8)
+    roi_mask[:, 80:] = 255
+    masked = TemplateMatcher(BACKGROUND, roi_mask=roi_mask)
+    assert masked.match(_frame(30, 40)) is None
+    assert masked.match(_frame(100, 40)) == (109, 44)
+
+
+def test_batch_and_wrapper_match_single_calls_and_reuse_buffers():
+    frames = [_frame(10 + 7 * i, 20 + 5 * i) for i in range(8)]
+    matcher = TemplateMatcher(BACKGROUND)
+    single = [matcher.match(f) for f in frames]
+    buffer = matcher._closed
+
+    assert matcher.match_batch(frames) == single
+    assert matcher._closed is buffer
+    assert [template_matching(f, BACKGROUND) for f in frames] == single
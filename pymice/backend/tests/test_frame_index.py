@@ -0,0 +1,65 @@
+"""Tests for the results frame index and paged reads."""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.processing.frame_index import build_frame_index, load_frame_index, read_frames
+from app.processing.results_writer import StreamingResultsWriter, frame_index_path_for
+
+
+def _frames(n):
+    return [
+        {"frame_number": i, "centroid_x": 1.0 * i, "centroid_y": None if i % 4 == 0 else 2.0,
+         "roi": "zone \"é\"", "detection_method": "yolo", "timestamp_sec": i / 30.0,
+         "mask": [[1, 2], [3, 4]] if i % 2 else None}
+        for i in range(n)
+    ]
+
+
+def _write(tmp_path, frames):
+    results_path = str(tmp_path / "t_results.json")
+    writer = StreamingResultsWriter(results_path)
+    for f in frames:
+        writer.append(f)
+    writer.finalize({"video_name": "v.mp4"}, index_path=frame_index_path_for(results_path))
+    return results_path
+
+
+def test_rebuilt_index_matches_the_written_one(tmp_path):
+    results_path = _write(tmp_path, _frames(40))
+    written = np.load(frame_index_path_for(results_path))
+    assert np.array_equal(build_frame_index(results_path), written)
+
+    # Older results without an index get one on first use
+    os.remove(frame_index_path_for(results_path))
+    assert np.array_equal(load_frame_index(results_path, frame_index_path_for(results_path)), written)
+    assert os.path.exists(frame_index_path_for(results_path))
+
+
+def test_pages_steps_and_fields(tmp_path):
+    frames = _frames(40)
+    results_path = _write(tmp_path, frames)
+    index = load_frame_index(results_path, frame_index_path_for(results_path))
+
+    page = read_frames(results_path, index, start=5, end=30, step=3, limit=4)
+    assert page["frames"] == frames[5:30:3][:4]
+    assert page["matched"] == 9 and page["next_start"] == 17
+
+    rest = read_frames(results_path, index, start=page["next_start"], end=30, step=3, limit=100)
+    assert [f["frame_number"] for f in rest["frames"]] == [17, 20, 23, 26, 29]
+    assert rest["next_start"] is None
+
+    page = read_frames(results_path, index, start=38, fields=["centroid_y", "mask"])
+    assert page["frames"] == [{"frame_number": 38, "centroid_y": 2.0, "mask": None},
+                              {"frame_number": 39, "centroid_y": 2.0, "mask": [[1, 2], [3, 4]]}]
+    assert read_frames(results_path, index, start=100)["frames"] == []
+
+
+def test_non_ascii_results_cannot_be_indexed(tmp_path):
+    path = tmp_path / "t_results.json"
+    path.write_text(json.dumps({"tracking_data": _frames(3)}, ensure_ascii=False), encoding="utf-8")
+    with pytest.raises(ValueError):
+        build_frame_index(str(path))
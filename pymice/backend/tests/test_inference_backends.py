@@ -0,0 +1,70 @@
+"""Tests for CPU inference backend resolution and the export cache."""
+
+import os
+import time
+
+from app.services import inference_backends as ib
+
+
+def _fake_export(calls):
+    def export(model_path, backend):
+        calls.append(backend)
+        artifact = ib.exported_model_path(model_path, backend)
+        if backend == "openvino":
+            os.makedirs(artifact, exist_ok=True)
+            stem = os.path.splitext(os.path.basename(model_path))[0]
+            open(os.path.join(artifact, stem + ".xml"), "w").close()
+        else:
+            open(artifact, "w").close()
+        return artifact
+
+    return export
+
+
+def test_exports_once_and_again_when_the_model_changes(tmp_path, monkeypatch):
+    model = tmp_path / "mouse.pt"
+    model.write_bytes(b"weights")
+    calls = []
+    monkeypatch.setattr(ib, "_export", _fake_export(calls))
+    monkeypatch.setattr(ib, "backend_available", lambda backend: True)
+
+    assert ib.resolve_inference_model(str(model), "onnx", "cpu") == (str(tmp_path / "mouse.onnx"), "onnx")
+    assert ib.resolve_inference_model(str(model), "onnx", "cpu")[1] == "onnx"
+    assert ib.resolve_inference_model(str(model), "openvino", "cpu") == (
+        str(tmp_path / "mouse_openvino_model"), "openvino")
+    assert calls == ["onnx", "openvino"]
+
+    later = time.time() + 10
+    os.utime(model, (later, later))  # re-uploaded .pt is newer than its artifacts
+    ib.resolve_inference_model(str(model), "onnx", "cpu")
+    assert calls == ["onnx", "openvino", "onnx"]
+
+
+def test_falls_back_to_pytorch(tmp_path, monkeypatch):
+    model = str(tmp_path / "mouse.pt")
+    open(model, "w").close()
+
+    def failing_export(model_path, backend):
+        raise RuntimeError("export failed")
+
+    monkeypatch.setattr(ib, "_export", failing_export)
+    monkeypatch.setattr(ib, "backend_available", lambda backend: backend != "openvino")
+
+    assert ib.resolve_inference_model(model, "pytorch", "cpu") == (model, "pytorch")
+    assert ib.resolve_inference_model(model, "onnx", "cuda") == (model, "pytorch")  # CPU-only runtimes
+    assert ib.resolve_inference_model(model, "openvino", "cpu") == (model, "pytorch")  # not installed
+    assert ib.resolve_inference_model(model, "onnx", "cpu") == (model, "pytorch")  # export error
+
+
+def test_int8_model_is_never_exported_implicitly(tmp_path, monkeypatch):
+    model = tmp_path / "mouse.pt"
+    model.write_bytes(b"weights")
+    calls = []
+    monkeypatch.setattr(ib, "_export", _fake_export(calls))
+    monkeypatch.setattr(ib, "backend_available", lambda backend: True)
+
+    assert ib.resolve_inference_model(str(model), "onnx_int8", "cpu") == (str(model), "pytorch")
+    (tmp_path / "mouse_int8.onnx").write_bytes(b"int8")  # built by POST /system/models/quantize
+    assert ib.resolve_inference_model(str(model), "onnx_int8", "cpu") == (
+        str(tmp_path / "mouse_int8.onnx"), "onnx_int8")
+    assert calls == []
@@ -0,0 +1,105 @@
+"""Tests for the column ingest of tracking results."""
+
+import json
+import threading
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from app.models.schemas import TrackingFrame
+from app.processing.columnar import build_columnar
+from app.processing.ingest import METHODS, frames_to_columns, ingest_document, ingest_file, measure_ingest
+
+
+def _frames(n):
+    return [
+        {
+            "frame_number": i,
+            "centroid_x": float(10 + i) if i % 3 else None,
+            "centroid_y": float(20 - i) if i % 3 else None,
+            "roi": f"roi_{i % 2}" if i % 3 else None,
+            "roi_index": i % 2 if i % 3 else None,
+            "detection_method": ["none", "yolo", "template"][i % 3],
+            "timestamp_sec": i / 30.0,
+            "bbox": [0.0, 0.0, 1.0, 1.0],
+        }
+        for i in range(n)
+    ]
+
+
+def test_columns_match_the_frames():
+    frames = _frames(7)
+    columns = frames_to_columns(frames)
+    assert columns["frame_number"].dtype == np.int64
+    assert columns["roi_index"].tolist() == [-1, 1, 0, -1, 0, 1, -1]
+    assert [METHODS[m] for m in columns["method"]] == [f["detection_method"] for f in frames]
+    assert np.isnan(columns["x"][[0, 3, 6]]).all() and columns["x"][1] == 11.0
+    assert np.array_equal(columns["t"], np.arange(7) / 30.0)
+
+    from_models = frames_to_columns([TrackingFrame(**f) for f in frames])
+    for name, column in columns.items():
+        assert np.array_equal(from_models[name], column, equal_nan=True)
+
+
+@pytest.mark.parametrize("field, value, message", [
+    ("frame_number", None, "frame_number: missing value at frame index 2"),
+    ("frame_number", 1.5, "frame_number: invalid value 1.5 at frame index 2"),
+    ("centroid_x", "left", "x: invalid value 'left' at frame index 2"),
+    ("centroid_y", None, "centroid: only one of x/y set at frame index 2"),
+    ("timestamp_sec", None, "t: missing timestamp_sec at frame index 2"),
+    ("roi_index", -3, "roi_index: invalid value -3 at frame index 2"),
+    ("detection_method", "magic", "method: invalid value 'magic' at frame index 2"),
+])
+def test_column_validation_names_the_first_bad_frame(field, value, message):
+    frames = _frames(4)
+    frames[2][field] = value
+    with pytest.raises(ValueError, match=message):
+        frames_to_columns(frames)
+
+
+def test_json_and_columnar_files_ingest_the_same(tmp_path):
+    frames = _frames(10)
+    header = {"video_name": "clip.mp4", "video_info": {"total_frames": 10, "fps": 30.0}}
+    json_path = tmp_path / "r_results.json"
+    json_path.write_text(json.dumps({**header, "tracking_data": frames}))
+    npz_path = build_columnar(frames).save(str(tmp_path / "r_results.npz"), header)
+
+    json_header, json_columns, stats = ingest_file(str(json_path), trace_memory=True)
+    npz_header, npz_columns, _ = ingest_file(npz_path)
+    assert json_header == npz_header == header
+    for name, column in json_columns.items():
+        assert np.array_equal(npz_columns[name], column, equal_nan=True)
+    assert stats.frames == 10 and stats.ingest_ms >= 0 and stats.peak_bytes > 0
+
+    with pytest.raises(ValueError, match="no tracking_data"):
+        ingest_document({"video_name": "clip.mp4"})
+
+
+def test_traced_ingests_do_not_disturb_each_other():
+    document = {"tracking_data": _frames(50)}
+    inner_started, release = threading.Event(), threading.Event()
+
+    def slow_load():
+        inner_started.set()
+        release.wait(5)
+        return ingest_document(document)
+
+    results = []
+    worker = threading.Thread(target=lambda: results.append(measure_ingest(slow_load, "a", trace_memory=True)))
+    worker.start()
+    inner_started.wait(5)
+    assert tracemalloc.is_tracing()
+    release.set()
+    # Waits for the first traced ingest instead of stopping its tracing
+    stats = measure_ingest(lambda: ingest_document(document), "b", trace_memory=True)[2]
+    worker.join()
+    assert results[0][2].peak_bytes > 0 and stats.peak_bytes > 0
+    assert not tracemalloc.is_tracing()
+
+    tracemalloc.start()
+    try:
+        assert measure_ingest(lambda: ingest_document(document), "c", trace_memory=True)[2].peak_bytes is None
+        assert tracemalloc.is_tracing()  # someone else's tracing is left running
+    finally:
+        tracemalloc.stop()
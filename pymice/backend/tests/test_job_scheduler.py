@@ -0,0 +1,123 @@
+"""Tests for the per-device bounded tracking JobScheduler."""
+
+import threading
+import time
+
+from app.services.job_scheduler import JobScheduler
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+class _BlockingRunner:
+    """Runner whose jobs block until released; records start order and peak concurrency."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = []
+        self.running = 0
+        self.peak = 0
+        self.release = {}
+
+    def __call__(self, task_id, payload):
+        gate = threading.Event()
+        with self.lock:
+            self.release[task_id] = gate
+            self.started.append(task_id)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        gate.wait(5)
+        with self.lock:
+            self.running -= 1
+
+    def finish(self, task_id):
+        assert _wait_for(lambda: task_id in self.release)
+        self.release[task_id].set()
+
+
+def test_concurrency_is_bounded_per_device():
+    runner = _BlockingRunner()
+    sched = JobScheduler(runner, limits={"cpu": 2})
+    for i in range(5):
+        sched.submit(f"t{i}", None, device="cpu")
+
+    assert _wait_for(lambda: len(runner.started) == 2)
+    time.sleep(0.05)
+    assert runner.peak == 2
+    assert sched.snapshot()["devices"]["cpu"]["queued"] == ["t2", "t3", "t4"]
+
+    for i in range(5):
+        runner.finish(f"t{i}")
+    assert _wait_for(lambda: sched.snapshot()["completed"] == 5)
+    assert runner.peak == 2
+
+
+def test_priority_then_fifo_order():
+    runner = _BlockingRunner()
+    sched = JobScheduler(runner, limits={"cpu": 1})
+    sched.submit("first", None, device="cpu")
+    assert _wait_for(lambda: runner.started == ["first"])
+
+    sched.submit("low", None, device="cpu", priority=0)
+    sched.submit("high", None, device="cpu", priority=5)
+    sched.submit("low2", None, device="cpu", priority=0)
+    assert sched.queue_position("high") == 0
+    assert sched.queue_position("low") == 1
+    assert sched.queue_position("low2") == 2
+    assert sched.queue_position("first") is None
+
+    for task_id in ["first", "high", "low", "low2"]:
+        runner.finish(task_id)
+    assert _wait_for(lambda: len(runner.started) == 4)
+    assert runner.started == ["first", "high", "low", "low2"]
+
+
+def test_cancel_only_affects_queued_jobs():
+    runner = _BlockingRunner()
+    sched = JobScheduler(runner, limits={"cpu": 1})
+    sched.submit("running", None, device="cpu")
+    sched.submit("queued", None, device="cpu")
+    sched.submit("after", None, device="cpu")
+    assert _wait_for(lambda: runner.started == ["running"])
+
+    assert sched.cancel("queued") is True
+    assert sched.cancel("running") is False
+    assert sched.cancel("unknown") is False
+    assert sched.queue_position("after") == 0
+
+    runner.finish("running")
+    runner.finish("after")
+    assert _wait_for(lambda: sched.snapshot()["completed"] == 2)
+    assert runner.started == ["running", "after"]
+    assert sched.state("queued") is None
+
+
+def test_devices_have_independent_limits():
+    runner = _BlockingRunner()
+    sched = JobScheduler(runner, limits={"cuda": 1, "cpu": 1})
+    sched.submit("gpu", None, device="cuda")
+    sched.submit("cpu", None, device="cpu")
+    assert _wait_for(lambda: sorted(runner.started) == ["cpu", "gpu"])
+    runner.finish("gpu")
+    runner.finish("cpu")
+
+
+def test_runner_exception_does_not_kill_worker():
+    calls = []
+
+    def runner(task_id, payload):
+        calls.append(task_id)
+        if task_id == "bad":
+            raise RuntimeError("boom")
+
+    sched = JobScheduler(runner, limits={"cpu": 1})
+    sched.submit("bad", None, device="cpu")
+    sched.submit("good", None, device="cpu")
+    assert _wait_for(lambda: sched.snapshot()["completed"] == 2)
+    assert calls == ["bad", "good"]
@@ -0,0 +1,64 @@
+"""Tests for the incremental results JSON reader."""
+
+import io
+import json
+
+import pytest
+
+from app.processing.json_stream import ResultsStreamReader
+
+
+def _document(n=25, trailer=False):
+    document = {
+        "video_name": "clip é.mp4",  # non-ASCII: split across blocks at byte level
+        "video_info": {"total_frames": n, "fps": 30.0},
+        "rois": [{"roi_type": "circle", "center_x": 1, "center_y": 2, "radius": 3}],
+        "tracking_data": [
+            {"frame_number": i, "centroid_x": 12345.678 + i, "centroid_y": None, "timestamp_sec": i / 30}
+            for i in range(n)
+        ],
+    }
+    if trailer:
+        document["finished"] = 1234567890
+    return document
+
+
+def _read(raw, block_size):
+    reader = ResultsStreamReader(io.BytesIO(raw), block_size=block_size)
+    header = reader.read_header()
+    frames = list(reader.iter_frames())
+    return header, frames, reader.read_trailer()
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 16, 1 << 20])
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("trailer", [False, True])
+def test_round_trips_any_block_boundary(block_size, indent, trailer):
+    document = _document(trailer=trailer)
+    header, frames, rest = _read(json.dumps(document, indent=indent, ensure_ascii=False).encode(), block_size)
+    assert {**header, "tracking_data": frames, **rest} == document
+    assert "tracking_data" not in header and list(rest) == (["finished"] if trailer else [])
+
+
+def test_empty_and_missing_frames():
+    assert _read(b'{"video_name": "a", "tracking_data": []}', 4) == ({"video_name": "a"}, [], {})
+    assert _read(b'{"video_name": "a"}', 4) == ({"video_name": "a"}, [], {})
+
+
+@pytest.mark.parametrize("raw", [
+    b'{"a": 1, "tracking_data": [{"x": 1}, {"x": ]}',
+    b'{"a": 1 "b": 2}',
+    b'{"tracking_data": [1, 2',
+    b'[1, 2]',
+])
+def test_malformed_documents_raise(raw):
+    with pytest.raises(ValueError):
+        _read(raw, 4)
+
+
+def test_oversized_value_is_rejected():
+    raw = json.dumps({"tracking_data": [{"mask": [[1.0, 2.0]] * 1000}]}).encode()
+    reader = ResultsStreamReader(io.BytesIO(raw), block_size=64, max_value_chars=1000)
+    reader.read_header()
+    with pytest.raises(ValueError, match="larger than"):
+        list(reader.iter_frames())
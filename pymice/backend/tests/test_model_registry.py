@@ -0,0 +1,152 @@
+"""Tests for the shared ModelRegistry (reuse, mtime keys, LRU eviction)."""
+
+import os
+import threading
+
+import pytest
+
+from app.services.model_registry import ModelRegistry
+
+
+class FakeModel:
+    def __init__(self, path, device):
+        self.path = path
+        self.device = device
+        self.warmed = False
+
+
+def _model_file(tmp_path, name, size=1000):
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def _registry(budget=10_000):
+    loads = []
+
+    def loader(path, device):
+        loads.append((os.path.basename(path), device))
+        return FakeModel(path, device)
+
+    def warmup(model, device):
+        model.warmed = True
+
+    reg = ModelRegistry(memory_budget_bytes=budget)
+    acquire = lambda path, device="cpu": reg.acquire(path, device, kind="fake", loader=loader, warmup=warmup)
+    return reg, acquire, loads
+
+
+def test_released_instance_is_reused_and_warmed_once(tmp_path):
+    reg, acquire, loads = _registry()
+    path = _model_file(tmp_path, "a.pt")
+
+    m1 = acquire(path)
+    assert m1.warmed
+    reg.release(m1)
+    m2 = acquire(path)
+    assert m2 is m1
+    assert loads == [("a.pt", "cpu")]
+
+    stats = reg.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["models"][0]["leased"] is True
+
+
+def test_concurrent_leases_get_distinct_instances(tmp_path):
+    reg, acquire, loads = _registry()
+    path = _model_file(tmp_path, "a.pt")
+
+    m1 = acquire(path)
+    m2 = acquire(path)
+    assert m1 is not m2
+    reg.release(m1)
+    reg.release(m2)
+    assert len(reg.stats()["models"]) == 2
+
+
+def test_key_includes_device_and_mtime(tmp_path):
+    reg, acquire, loads = _registry()
+    path = _model_file(tmp_path, "a.pt")
+
+    reg.release(acquire(path, "cpu"))
+    reg.release(acquire(path, "cuda"))
+    assert loads == [("a.pt", "cpu"), ("a.pt", "cuda")]
+
+    # Replacing the file on disk invalidates the idle cpu instance
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    m = acquire(path, "cpu")
+    assert len(loads) == 3
+    reg.release(m)
+    assert sorted(e["device"] for e in reg.stats()["models"]) == ["cpu", "cuda"]
+
+
+def test_idle_models_evicted_lru_under_budget(tmp_path):
+    reg, acquire, loads = _registry(budget=2500)
+    a, b, c = (_model_file(tmp_path, n) for n in ("a.pt", "b.pt", "c.pt"))
+
+    reg.release(acquire(a))
+    reg.release(acquire(b))
+    reg.release(acquire(a))  # a is now most recently used
+    reg.release(acquire(c))  # 3000 bytes > budget: b goes
+
+    resident = sorted(e["model"] for e in reg.stats()["models"])
+    assert resident == ["a.pt", "c.pt"]
+    assert reg.stats()["evictions"] == 1
+
+
+def test_leased_models_are_never_evicted(tmp_path):
+    reg, acquire, loads = _registry(budget=500)
+    a, b = _model_file(tmp_path, "a.pt"), _model_file(tmp_path, "b.pt")
+
+    ma = acquire(a)
+    mb = acquire(b)
+    assert len(reg.stats()["models"]) == 2
+    reg.release(mb)  # over budget: idle b is dropped, leased a stays
+    assert [e["model"] for e in reg.stats()["models"]] == ["a.pt"]
+    reg.release(ma)
+    assert reg.stats()["models"] == []
+
+
+def test_discard_and_unknown_release(tmp_path):
+    reg, acquire, loads = _registry()
+    path = _model_file(tmp_path, "a.pt")
+
+    m = acquire(path)
+    reg.release(m, discard=True)
+    reg.release(FakeModel(path, "cpu"))  # not from the registry: ignored
+    assert reg.stats()["models"] == []
+    assert acquire(path) is not m
+
+
+def test_missing_loader_for_custom_kind(tmp_path):
+    reg = ModelRegistry()
+    with pytest.raises(ValueError):
+        reg.acquire(_model_file(tmp_path, "a.pt"), "cpu", kind="sam3")
+
+
+def test_lease_is_thread_safe(tmp_path):
+    reg, acquire, loads = _registry(budget=10**9)
+    path = _model_file(tmp_path, "a.pt")
+    in_use = set()
+    clash = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(50):
+            m = acquire(path)
+            with lock:
+                if id(m) in in_use:
+                    clash.append(m)
+                in_use.add(id(m))
+            with lock:
+                in_use.discard(id(m))
+            reg.release(m)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not clash
+    assert len(loads) <= 4
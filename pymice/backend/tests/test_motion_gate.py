@@ -0,0 +1,43 @@
+"""Tests for the motion gate that reuses results on static frames."""
+
+import numpy as np
+
+from app.processing.motion_gate import MotionGate
+
+
+def _scene(x=None, size=(120, 160)):
+    frame = np.full((*size, 3), 100, dtype=np.uint8)
+    if x is not None:
+        frame[50:70, x:x + 20] = 0  # the "mouse"
+    return frame
+
+
+def test_static_frames_are_gated_and_movement_is_inferred():
+    gate = MotionGate(width=160)
+    frames = [_scene(40), _scene(40), _scene(40), _scene(80), _scene(80)]
+    assert [gate.should_infer(f) for f in frames] == [True, False, False, True, False]
+    assert gate.stats() == {"checked_frames": 5, "gated_frames": 3, "hit_rate": 0.6}
+
+
+def test_motion_outside_the_rois_is_ignored():
+    roi_mask = np.zeros((120, 160), dtype=np.uint8)
+    roi_mask[:, :60] = 255
+    gate = MotionGate(roi_mask=roi_mask, width=160)
+    assert gate.should_infer(_scene(100))
+    assert not gate.should_infer(_scene(120))  # moved, but right of the ROI
+
+
+def test_gated_results_copy_the_last_inferred_one():
+    calls = []
+
+    def infer_fn(frame_numbers, frames):
+        calls.append(list(frame_numbers))
+        return [{"frame_number": n, "centroid_x": 50.0, "detection_method": "yolo"} for n in frame_numbers]
+
+    gate = MotionGate(width=160, max_gated=2)
+    results = gate.infer(list(range(5)), [_scene(40)] * 5, infer_fn)
+
+    assert calls == [[0, 3]]  # frame 3: two gated frames in a row is the limit
+    assert [r["frame_number"] for r in results] == list(range(5))
+    assert [bool(r.get("gated")) for r in results] == [False, True, True, False, True]
+    assert results[1]["centroid_x"] == 50.0 and results[1]["detection_method"] == "yolo"
@@ -0,0 +1,106 @@
+"""Tests for the staged decode → infer → postprocess TrackingPipeline."""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.processing.pipeline import TrackingPipeline
+
+
+def _reader(n):
+    state = {"i": 0}
+
+    def read_frame():
+        if state["i"] >= n:
+            return None
+        i = state["i"]
+        state["i"] += 1
+        frame = np.full((4, 4, 3), i % 256, dtype=np.uint8)
+        return frame, i / 30.0
+
+    return read_frame
+
+
+def test_results_arrive_in_frame_order_with_batches():
+    batches = []
+    seen = []
+
+    def infer(frame_numbers, frames):
+        batches.append(list(frame_numbers))
+        return [{"frame_number": fn} for fn in frame_numbers]
+
+    def postprocess(frame_number, frame, timestamp_sec, frame_data):
+        seen.append((frame_number, frame_data["frame_number"], timestamp_sec))
+
+    pipe = TrackingPipeline(_reader(23), infer, postprocess, batch_size=5, queue_size=4)
+    assert pipe.run() == 23
+
+    assert [s[0] for s in seen] == list(range(23))
+    assert all(a == b for a, b, _ in seen)
+    assert seen[3][2] == pytest.approx(3 / 30.0)
+    assert all(len(b) <= 5 for b in batches)
+    assert sum(len(b) for b in batches) == 23
+
+    stats = pipe.stats()
+    assert stats["decode"]["items"] == 23
+    assert stats["inference"]["items"] == 23
+    assert stats["postprocess"]["items"] == 23
+    assert stats["decode"]["queue_depth"] is None  # decode has no input queue
+    assert stats["inference"]["queue_depth"] == stats["postprocess"]["queue_depth"] == 0
+
+
+def test_decode_overlaps_inference():
+    """A slow decoder and a slow model together take ~max, not sum, of both."""
+    def slow_reader():
+        inner = _reader(20)
+
+        def read_frame():
+            time.sleep(0.01)
+            return inner()
+
+        return read_frame
+
+    def infer(frame_numbers, frames):
+        time.sleep(0.01 * len(frames))
+        return [{} for _ in frames]
+
+    pipe = TrackingPipeline(slow_reader(), infer, lambda *a: None, batch_size=1)
+    t0 = time.monotonic()
+    pipe.run()
+    elapsed = time.monotonic() - t0
+    assert elapsed < 0.35  # sequential would be ~0.4 s
+
+
+def test_stop_request_ends_run_early():
+    stop = threading.Event()
+    processed = []
+
+    def postprocess(frame_number, *args):
+        processed.append(frame_number)
+        if frame_number == 10:
+            stop.set()
+
+    pipe = TrackingPipeline(
+        _reader(10_000),
+        lambda fns, frames: [{} for _ in fns],
+        postprocess,
+        batch_size=2,
+        queue_size=4,
+        stop_requested=stop.is_set,
+    )
+    pipe.run()
+    assert 10 <= len(processed) < 100
+    assert processed == list(range(len(processed)))
+
+
+def test_stage_error_is_reraised():
+    def infer(frame_numbers, frames):
+        if 7 in frame_numbers:
+            raise RuntimeError("boom")
+        return [{} for _ in frames]
+
+    pipe = TrackingPipeline(_reader(50), infer, lambda *a: None, batch_size=1, queue_size=2)
+    with pytest.raises(RuntimeError, match="boom"):
+        pipe.run()
@@ -0,0 +1,63 @@
+"""Tests for on-demand LazyPreview rendering."""
+
+import time
+
+import cv2
+import numpy as np
+
+from app.processing.preview import LazyPreview
+
+
+def _counting_render():
+    calls = []
+
+    def render(frame, frame_data, frame_number):
+        calls.append(frame_number)
+        frame[:] = 255  # draws on the copy, never on the caller's frame
+        return frame
+
+    return render, calls
+
+
+def test_nothing_is_rendered_until_requested():
+    render, calls = _counting_render()
+    preview = LazyPreview(render, max_fps=1000)
+    for i in range(50):
+        preview.update(np.zeros((8, 8, 3), dtype=np.uint8), {}, i)
+    assert calls == []
+
+    data = preview.jpeg()
+    assert calls == [49]
+    decoded = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    assert decoded.shape == (8, 8, 3)
+
+
+def test_unchanged_frame_and_rate_limit_reuse_cache():
+    render, calls = _counting_render()
+    preview = LazyPreview(render, max_fps=2)
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+
+    preview.update(frame, {}, 0)
+    first = preview.jpeg()
+    assert preview.jpeg() is first  # no new frame
+    preview.update(frame, {}, 1)
+    assert preview.jpeg() is first  # new frame, but within 0.5 s
+    assert calls == [0]
+    assert not frame.any()  # original frame untouched
+
+    time.sleep(0.55)
+    preview.jpeg()
+    assert calls == [0, 1]
+
+
+def test_placeholder_until_first_frame_and_finalize():
+    render, calls = _counting_render()
+    preview = LazyPreview(render, max_fps=0.1, placeholder=b"placeholder")
+    assert preview.jpeg() == b"placeholder"
+
+    preview.update(np.zeros((8, 8, 3), dtype=np.uint8), {}, 0)
+    preview.jpeg()
+    preview.update(np.zeros((8, 8, 3), dtype=np.uint8), {}, 1)
+    final = preview.finalize()  # ignores the rate limit
+    assert calls == [0, 1]
+    assert final is not None and final == preview.jpeg()
@@ -0,0 +1,62 @@
+"""Tests for the INT8 accuracy report (model comparison on a held-out clip)."""
+
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+
+from app.services import quantization as q
+
+
+class _Boxes:
+    def __init__(self, conf, xyxy):
+        self.conf, self.xyxy = torch.tensor(conf), torch.tensor(xyxy)
+
+    def __len__(self):
+        return len(self.conf)
+
+
+class FakeModel:
+    """Returns a best box centred at the given point per frame, or no box for None."""
+
+    def __init__(self, centres):
+        self._centres = iter(centres)
+
+    def predict(self, frame, **kwargs):
+        centre = next(self._centres)
+        if centre is None:
+            return [SimpleNamespace(boxes=_Boxes([], []))]
+        x, y = centre
+        boxes = _Boxes([0.3, 0.9], [[0.0, 0.0, 2.0, 2.0], [x - 5, y - 5, x + 5, y + 5]])
+        return [SimpleNamespace(boxes=boxes)]
+
+
+def test_compare_models_reports_detection_rates_and_centroid_error(monkeypatch):
+    models = {
+        "fp32": FakeModel([(10, 10), (20, 20), None, (40, 40)]),
+        "int8": FakeModel([(13, 14), (20, 20), None, None]),
+    }
+
+    @contextmanager
+    def lease(path, device):
+        yield models[path]
+
+    monkeypatch.setattr(q, "model_registry", SimpleNamespace(lease=lease))
+    frames = iter([np.zeros((8, 8, 3), dtype=np.uint8)] * 4)
+    report = q.compare_models("fp32", "int8", frames, 320, 0.5)
+
+    assert report["frames"] == 4
+    assert report["fp32"]["detection_rate"] == 75.0
+    assert report["int8"]["detection_rate"] == 50.0
+    assert report["detection_agreement"] == 75.0  # frame 3: only fp32 detects
+    assert report["centroid_error_px"] == {"frames": 2, "mean": 2.5, "median": 2.5, "p95": 4.75, "max": 5.0}
+
+
+def test_letterbox_input_is_square_normalised_rgb():
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    frame[..., 2] = 255  # red in BGR
+    x = q.letterbox_input(frame, 320)
+    assert x.shape == (1, 3, 320, 320) and x.dtype == np.float32
+    assert x[0, 0, 160, 160] == 1.0 and x[0, 2, 160, 160] == 0.0  # red is channel 0 after BGR -> RGB
+    assert np.isclose(x[0, 0, 0, 0], 114 / 255)  # letterbox padding
@@ -0,0 +1,71 @@
+"""Tests for the streaming results writer."""
+
+import json
+import os
+
+import numpy as np
+
+from app.processing.results_writer import StreamingResultsWriter, frame_index_path_for, frames_path_for
+
+
+def _frames(n):
+    return [
+        {"frame_number": i, "centroid_x": i * 1.5 if i % 3 else None, "centroid_y": 2.0,
+         "roi": "zone \"A\"\n", "mask": [[1, 2], [3, 4]] if i % 2 else None,
+         "detection_method": "yolo", "timestamp_sec": i / 30.0}
+        for i in range(n)
+    ]
+
+
+def _header():
+    return {"video_name": "v.mp4", "video_info": {"fps": 30.0}, "statistics": {}, "rois": []}
+
+
+def test_finalize_matches_json_dump(tmp_path):
+    results_path = str(tmp_path / "t_results.json")
+    frames = _frames(37)
+
+    writer = StreamingResultsWriter(results_path, flush_every=5)
+    for f in frames:
+        writer.append(f)
+    assert len(writer) == 37
+    writer.finalize(_header())
+
+    expected = json.dumps({**_header(), "tracking_data": frames}, indent=2)
+    assert open(results_path).read() == expected
+    assert not os.path.exists(frames_path_for(results_path))
+
+
+def test_empty_results_document(tmp_path):
+    results_path = str(tmp_path / "t_results.json")
+    StreamingResultsWriter(results_path).finalize(_header())
+    assert open(results_path).read() == json.dumps({**_header(), "tracking_data": []}, indent=2)
+
+
+def test_frames_are_on_disk_before_finalize(tmp_path):
+    results_path = str(tmp_path / "t_results.json")
+    writer = StreamingResultsWriter(results_path, flush_every=10)
+    for f in _frames(25):
+        writer.append(f)
+
+    # Only whole chunks are flushed while running; close() writes the rest
+    with open(writer.frames_path) as fh:
+        assert len(fh.readlines()) == 20
+    writer.close()
+    assert [f["frame_number"] for f in writer.iter_frames()] == list(range(25))
+    assert not os.path.exists(results_path)
+
+
+def test_finalize_writes_the_frame_index(tmp_path):
+    results_path = str(tmp_path / "t_results.json")
+    index_path = frame_index_path_for(results_path)
+    frames = _frames(12)
+    writer = StreamingResultsWriter(results_path)
+    for f in frames:
+        writer.append(f)
+    writer.finalize(_header(), index_path=index_path)
+
+    index = np.load(index_path)
+    assert index[:, 0].tolist() == list(range(12))
+    raw = open(results_path, "rb").read()
+    assert [json.loads(raw[s:e]) for _, s, e in index] == frames
@@ -0,0 +1,106 @@
+"""Tests for keyframe sampling and gap interpolation."""
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from app.models.schemas import RectangleROI, TrackingRequest
+from app.processing.pipeline import TrackingPipeline
+from app.processing.sampling import FrameSampler, interpolate_frame
+
+
+def _frame(n, x, y=0.0):
+    return {"frame_number": n, "centroid_x": x, "centroid_y": y, "detection_method": "yolo"}
+
+
+def test_interpolate_between_keyframes_and_recompute_roi():
+    rois = [RectangleROI(roi_type="Rectangle", center_x=15, center_y=5, width=10, height=10)]
+    data = interpolate_frame(3, _frame(0, 0.0), _frame(4, 20.0, 8.0), rois)
+    assert data["centroid_x"] == pytest.approx(15.0)
+    assert data["centroid_y"] == pytest.approx(6.0)
+    assert data["detection_method"] == "interpolated"
+    assert data["roi_index"] == 0 and data["roi"] == "roi_0"
+
+    missing = {"frame_number": 4, "centroid_x": None, "centroid_y": None}
+    assert interpolate_frame(2, _frame(0, 0.0), missing, [])["detection_method"] == "none"
+    # Tail of the video: hold the last keyframe
+    assert interpolate_frame(9, _frame(8, 5.0), None, [])["centroid_x"] == 5.0
+
+
+def test_stride_selects_every_kth_and_the_last_frame():
+    sampler = FrameSampler(mode="stride", stride=4, last_frame=9)
+    assert [n for n in range(10) if sampler.select(n)] == [0, 4, 8, 9]
+    assert [n for n in range(10) if sampler.must_decode(n)] == [0, 4, 8, 9]
+
+
+def test_adaptive_stride_grows_when_still_and_resets_on_motion():
+    sampler = FrameSampler(mode="adaptive", max_stride=8)
+    assert sampler.select(0)
+    assert sampler.observe(_frame(0, 100.0)) == 1
+    strides = []
+    n = 1
+    for _ in range(4):  # animal still
+        while not sampler.select(n):
+            n += 1
+        strides.append(sampler.observe(_frame(n, 100.0)))
+        n += 1
+    assert strides == [2, 4, 8, 8]
+    while not sampler.select(n):
+        n += 1
+    assert sampler.observe(_frame(n, 300.0)) == 1  # 200 px in 8 frames
+
+
+def _reader(n):
+    state = {"i": 0}
+
+    def read_frame():
+        if state["i"] >= n:
+            return None
+        state["i"] += 1
+        return np.zeros((2, 2, 3), dtype=np.uint8), (state["i"] - 1) / 30.0
+
+    def grab_frame():
+        if state["i"] >= n:
+            return None
+        state["i"] += 1
+        return (state["i"] - 1) / 30.0
+
+    return read_frame, grab_frame
+
+
+def test_pipeline_interpolates_skipped_frames_in_order():
+    read_frame, grab_frame = _reader(10)
+    inferred = []
+    seen = []
+
+    def infer(frame_numbers, frames):
+        assert all(f is not None for f in frames)
+        inferred.extend(frame_numbers)
+        return [_frame(fn, fn * 2.0) for fn in frame_numbers]
+
+    def postprocess(frame_number, frame, timestamp_sec, frame_data):
+        seen.append((frame_number, frame is None, frame_data["detection_method"], frame_data["centroid_x"]))
+
+    sampler = FrameSampler(mode="stride", stride=3, last_frame=9)
+    pipe = TrackingPipeline(read_frame, infer, postprocess, batch_size=2, sampler=sampler, grab_frame=grab_frame)
+    assert pipe.run() == 10
+
+    assert inferred == [0, 3, 6, 9]
+    assert [s[0] for s in seen] == list(range(10))
+    assert [s[3] for s in seen] == [n * 2.0 for n in range(10)]
+    assert [s[2] for s in seen].count("interpolated") == 6
+    assert all(s[1] == (s[2] == "interpolated") for s in seen)
+    assert pipe.stats()["sampling"]["interpolated_frames"] == 6
+    assert sampler.state()["anchor"]["frame_number"] == 9
+
+
+def test_sampling_is_rejected_for_sharded_runs():
+    settings = {
+        "video_filename": "v.mp4", "model_name": "m.pt", "confidence_threshold": 0.5, "iou_threshold": 0.5,
+        "rois": {"preset_name": "p", "description": "", "timestamp": "", "frame_width": 64,
+                 "frame_height": 64, "rois": []},
+    }
+    assert TrackingRequest(**settings, num_shards=4).num_shards == 4
+    assert TrackingRequest(**settings, sampling_mode="stride", sampling_stride=3).sampling_stride == 3
+    with pytest.raises(ValidationError, match="num_shards=1"):
+        TrackingRequest(**settings, num_shards=4, sampling_mode="stride", sampling_stride=3)
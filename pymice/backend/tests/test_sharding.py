@@ -0,0 +1,31 @@
+"""Tests for shard planning and merging of sharded tracking results."""
+
+import json
+
+from app.processing.sharding import merge_shard_results, plan_shards
+
+
+def test_plan_shards_covers_range_contiguously():
+    shards = plan_shards(1000, 3)
+    assert shards[0][0] == 0
+    assert shards[-1][1] == 1000
+    for (_, prev_end), (start, _) in zip(shards, shards[1:]):
+        assert start == prev_end
+    sizes = [end - start for start, end in shards]
+    assert max(sizes) - min(sizes) <= 1
+
+
+def test_plan_shards_never_makes_empty_shards():
+    assert plan_shards(2, 8) == [(0, 1), (1, 2)]
+    assert plan_shards(10, 1) == [(0, 10)]
+
+
+def test_merge_orders_frames_across_shards(tmp_path):
+    paths = []
+    for i, frames in enumerate([[3, 4, 5], [0, 1, 2], [6]]):
+        path = tmp_path / f"shard{i}.jsonl"
+        path.write_text("".join(json.dumps({"frame_number": f}) + "\n" for f in frames))
+        paths.append(str(path))
+
+    merged = [d["frame_number"] for d in merge_shard_results(paths)]
+    assert merged == list(range(7))
@@ -0,0 +1,181 @@
+"""Tests for batched YOLO inference in process_frames_batch.
+
+The model is replaced with a fake that returns Ultralytics-shaped results
+(torch tensors on .boxes / .keypoints), so no weights are needed.
+"""
+
+import numpy as np
+import torch
+
+from app.models.schemas import RectangleROI
+from app.processing.tracking import (
+    create_roi_mask,
+    crop_inference_size,
+    extract_batch_detections,
+    process_frame,
+    process_frames_batch,
+    roi_crop_box,
+    SearchWindow,
+)
+
+
+class FakeBoxes:
+    def __init__(self, xyxy, conf):
+        self.xyxy = torch.tensor(xyxy, dtype=torch.float32).reshape(-1, 4)
+        self.conf = torch.tensor(conf, dtype=torch.float32)
+
+    def __len__(self):
+        return len(self.conf)
+
+
+class FakeKeypoints:
+    def __init__(self, data):
+        self.data = torch.tensor(data, dtype=torch.float32)
+
+
+class FakeResult:
+    def __init__(self, xyxy, conf, keypoints=None):
+        self.boxes = FakeBoxes(xyxy, conf)
+        self.masks = None
+        self.keypoints = FakeKeypoints(keypoints) if keypoints is not None else None
+
+
+class FakeModel:
+    """Returns canned results per frame; records how many predictor calls were made."""
+
+    def __init__(self, per_frame_results, task="detect"):
+        self._per_frame = per_frame_results
+        self.task = task
+        self.calls = 0
+
+    def __call__(self, source, **kwargs):
+        self.calls += 1
+        frames = source if isinstance(source, list) else [source]
+        # Frame identity is encoded in pixel (0, 0)
+        return [self._per_frame[int(f[0, 0, 0])] for f in frames]
+
+
+def _frames(n):
+    frames = []
+    for i in range(n):
+        f = np.zeros((48, 64, 3), dtype=np.uint8)
+        f[0, 0, 0] = i
+        frames.append(f)
+    return frames
+
+
+def _kwargs(model):
+    return dict(
+        model=model,
+        background_frame=None,
+        rois=[],
+        roi_mask=None,
+        confidence_threshold=0.5,
+        iou_threshold=0.5,
+        device="cpu",
+    )
+
+
+def test_batch_matches_frame_by_frame_and_uses_one_call():
+    per_frame = [
+        FakeResult([[0, 0, 10, 10], [20, 20, 30, 40]], [0.6, 0.9]),
+        FakeResult(np.zeros((0, 4)), []),
+        FakeResult([[5, 5, 15, 25]], [0.7]),
+        FakeResult([[1, 1, 3, 3], [40, 10, 50, 20]], [0.8, 0.8]),  # tie -> first box
+    ]
+    frames = _frames(len(per_frame))
+
+    single_model = FakeModel(per_frame)
+    single = [process_frame(f, i, **_kwargs(single_model)) for i, f in enumerate(frames)]
+
+    batch_model = FakeModel(per_frame)
+    batch = process_frames_batch(frames, list(range(len(frames))), **_kwargs(batch_model))
+
+    assert batch == single
+    assert batch_model.calls == 1
+    assert single_model.calls == len(frames)
+    assert [(d["centroid_x"], d["centroid_y"]) for d in batch] == [
+        (25.0, 30.0), (None, None), (10.0, 15.0), (2.0, 2.0),
+    ]
+    assert [d["detection_method"] for d in batch] == ["yolo", "none", "yolo", "yolo"]
+
+
+def test_pose_keypoints_vectorised_per_image():
+    kpts_a = [
+        [[[10, 20, 0.9], [30, 40, 0.9], [99, 99, 0.1]]],
+    ]
+    kpts_b = [
+        [[[0, 0, 0.2], [0, 0, 0.4], [0, 0, 0.1]]],  # nothing visible
+    ]
+    results = [
+        FakeResult([[0, 0, 1, 1]], [0.9], keypoints=kpts_a[0]),
+        FakeResult([[0, 0, 1, 1]], [0.9], keypoints=kpts_b[0]),
+    ]
+    detections = extract_batch_detections(results, (48, 64), model_task="pose")
+
+    centroid, mask, keypoints = detections[0]
+    assert centroid == (20, 30)
+    assert mask is None
+    assert [k["x"] for k in keypoints] == [10.0, 30.0]
+    assert detections[1] == (None, None, None)
+
+
+def test_roi_crop_box_and_inference_size():
+    roi = RectangleROI(roi_type="Rectangle", center_x=300, center_y=200, width=200, height=100)
+    mask = create_roi_mask([roi], (480, 640))
+    assert roi_crop_box(mask, padding=10) == (190, 140, 411, 261)
+    assert roi_crop_box(mask, padding=1000) is None  # whole frame: nothing to crop
+    assert roi_crop_box(None) is None
+    # 221 px of a 640 px frame at imgsz 640 -> same scale, rounded up to a stride multiple
+    assert crop_inference_size((190, 140, 411, 261), (480, 640), 640) == 224
+
+
+def test_cropped_inference_maps_back_to_frame_coordinates():
+    shapes = []
+
+    class CropModel:
+        task = "detect"
+
+        def __call__(self, source, **kwargs):
+            frames = source if isinstance(source, list) else [source]
+            shapes.extend((f.shape[:2], kwargs["imgsz"]) for f in frames)
+            return [FakeResult([[10, 20, 30, 40]], [0.9]) for _ in frames]
+
+    data = process_frames_batch(
+        _frames(2), [0, 1], inference_size=640, crop_box=(16, 8, 48, 40), **_kwargs(CropModel())
+    )
+    assert shapes == [((32, 32), 320), ((32, 32), 320)]
+    assert [(d["centroid_x"], d["centroid_y"]) for d in data] == [(36.0, 38.0)] * 2
+
+
+def test_search_window_around_last_centroid_with_full_frame_fallback():
+    calls = []
+    window_conf = {"value": 0.9}
+
+    class WindowModel:
+        task = "detect"
+
+        def __call__(self, source, **kwargs):
+            frames = source if isinstance(source, list) else [source]
+            shape = frames[0].shape[:2]
+            calls.append((shape, len(frames)))
+            if shape == (64, 64):  # the search window
+                return [FakeResult([[30, 30, 34, 34]], [window_conf["value"]]) for _ in frames]
+            return [FakeResult([[98, 98, 102, 102]], [0.9]) for _ in frames]
+
+    frames = [np.zeros((240, 320, 3), dtype=np.uint8) for _ in range(2)]
+    window = SearchWindow(size=64, min_confidence=0.5)
+    kwargs = dict(_kwargs(WindowModel()), inference_size=320, search_window=window)
+
+    process_frames_batch(frames, [0, 1], **kwargs)  # not found yet: full frame
+    assert calls == [((240, 320), 2)] and window.center == (100, 100)
+    assert window.box((240, 320)) == (68, 68, 132, 132)
+
+    data = process_frames_batch(frames, [2, 3], **kwargs)
+    assert calls[1:] == [((64, 64), 2)]
+    assert [(d["centroid_x"], d["centroid_y"]) for d in data] == [(100.0, 100.0)] * 2
+
+    window_conf["value"] = 0.3  # low confidence in the window: search the full frame
+    process_frames_batch(frames, [4, 5], **kwargs)
+    assert calls[2:] == [((64, 64), 2), ((240, 320), 2)]
+    assert window.stats() == {"window_hits": 2, "full_frame_fallbacks": 2, "hit_rate": 0.5}
@@ -138,6 +138,29 @@ export default function EthologicalTab({ onTrackingStateChange }: EthologicalTab
     }, 100)
   }
 
+  // Server-side copy of trackingData for the analysis endpoints (see withDataset)
+  const datasetIdRef = useRef<string | null>(null)
+  useEffect(() => {
+    datasetIdRef.current = null
+  }, [trackingData])
+
+  const withDataset = async <T,>(request: (source: { dataset_id: string }) => Promise<T>): Promise<T> => {
+    if (!trackingData) throw new Error('No tracking data loaded')
+    const register = async () => {
+      const response = await analysisApi.registerDataset({ tracking_data: trackingData })
+      datasetIdRef.current = response.data.data!.dataset_id
+      return datasetIdRef.current
+    }
+    const datasetId = datasetIdRef.current ?? await register()
+    try {
+      return await request({ dataset_id: datasetId })
+    } catch (error: any) {
+      // Evicted from the server cache: register again and retry once
+      if (error?.response?.status !== 404) throw error
+      return request({ dataset_id: await register() })
+    }
+  }
+
   const [showLargeFileLoader, setShowLargeFileLoader] = useState(false)
   const [serverFilePath, setServerFilePath] = useState('')
 
@@ -214,8 +237,9 @@ export default function EthologicalTab({ onTrackingStateChange }: EthologicalTab
       try {
         let data: TrackingData
 
-        if (file.size > LARGE_FILE_THRESHOLD) {
-          // Use server-side upload for large files
+        const isColumnar = file.name.toLowerCase().endsWith('.npz')
+        if (file.size > LARGE_FILE_THRESHOLD || isColumnar) {
+          // Use server-side upload for large files (and columnar .npz results, decoded server-side)
           addLog(`Large file detected (${fileSizeMB.toFixed(0)} MB). Using server-side processing...`, 'info')
           setUploadProgress(0)
           setIsAnalyzing(true)
@@ -844,8 +868,8 @@ export default function EthologicalTab({ onTrackingStateChange }: EthologicalTab
           }
         }
 
-        const response = await analysisApi.generateCompleteAnalysis({
-          tracking_data: trackingData,
+        const response = await withDataset((source) => analysisApi.generateCompleteAnalysis({
+          ...source,
           settings: heatmapSettings,
           options: {
             heatmap: movementAnalysisOptions.heatmap,
@@ -863,7 +887,7 @@ export default function EthologicalTab({ onTrackingStateChange }: EthologicalTab
             },
           },
           video_frame_base64: videoFrameBase64,
-        })
+        }))
 
         // Create image URL from blob
         const imageUrl = URL.createObjectURL(response.data)
@@ -999,7 +1023,7 @@ export default function EthologicalTab({ onTrackingStateChange }: EthologicalTab
               <div className="space-y-2">
                 <input
                   type="file"
-                  accept=".json"
+                  accept=".json,.npz"
                   onChange={handleTrackingFileUpload}
                   disabled={uploadProgress !== null}
                   className="w-full bg-white dark:bg-gray-700 border border-gray-300 dark:border-gray-600 rounded-lg px-4 py-2 text-gray-900 dark:text-white file:mr-4 file:py-2 file:px-4 file:rounded-lg file:border-0 file:bg-primary-600 file:text-white hover:file:bg-primary-700 disabled:opacity-50"
@@ -1736,8 +1760,8 @@ export default function EthologicalTab({ onTrackingStateChange }: EthologicalTab
                     }
                   }
 
-                  const response = await analysisApi.downloadCompleteAnalysis({
-                    tracking_data: trackingData,
+                  const response = await withDataset((source) => analysisApi.downloadCompleteAnalysis({
+                    ...source,
                     settings: heatmapSettings,
                     options: {
                       heatmap: movementAnalysisOptions.heatmap,
@@ -1755,7 +1779,7 @@ export default function EthologicalTab({ onTrackingStateChange }: EthologicalTab
                       },
                     },
                     video_frame_base64: videoFrameBase64,
-                  })
+                  }))
 
                   // Create download link for ZIP
                   const url = URL.createObjectURL(response.data)
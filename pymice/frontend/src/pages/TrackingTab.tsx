@@ -318,7 +318,7 @@ export default function TrackingTab({ onTrackingStateChange }: TrackingTabProps
               // Don't load the JSON into memory — long tracks can be hundreds of MB each.
               // The batch download endpoint streams the combined file from disk.
               resolve({ task_id: taskId })
-            } else if (progressData.status === 'error' || progressData.status === 'stopped') {
+            } else if (progressData.status === 'error' || progressData.status === 'stopped' || progressData.status === 'cancelled') {
               clearInterval(interval)
               reject(new Error(progressData.error || 'Tracking failed'))
             }
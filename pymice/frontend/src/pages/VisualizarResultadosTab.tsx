@@ -115,8 +115,9 @@ export default function VisualizarResultadosTab(_props: VisualizarResultadosTabP
     try {
       let data: TrackingData
 
-      if (file.size > LARGE_FILE_THRESHOLD) {
-        // Use server-side upload for large files
+      const isColumnar = file.name.toLowerCase().endsWith('.npz')
+      if (file.size > LARGE_FILE_THRESHOLD || isColumnar) {
+        // Use server-side upload for large files (and columnar .npz results, decoded server-side)
         setUploadProgress(0)
         setIsAnalyzing(true)
 
@@ -270,6 +271,7 @@ export default function VisualizarResultadosTab(_props: VisualizarResultadosTabP
     // Define colors based on method
     let primaryColor = '#00ff00' // YOLO
     if (frameData.detection_method === 'template') primaryColor = '#ffff00'
+    if (frameData.detection_method === 'interpolated') primaryColor = '#00bcd4' // Cyan between sampled keyframes
     if (frameData.detection_method === 'manual') primaryColor = '#ff9800' // Orange for manual
     if (frameData.detection_method === 'none') primaryColor = '#f44336'
 
@@ -652,7 +654,7 @@ export default function VisualizarResultadosTab(_props: VisualizarResultadosTabP
               <div className="space-y-2">
                 <input
                   type="file"
-                  accept=".json"
+                  accept=".json,.npz"
                   onChange={handleJsonUpload}
                   disabled={isDownloading || isAnalyzing || uploadProgress !== null}
                   className="w-full bg-white dark:bg-gray-700 border border-gray-300 dark:border-gray-600 rounded-lg px-4 py-2 text-gray-900 dark:text-white file:mr-4 file:py-2 file:px-4 file:rounded-lg file:border-0 file:bg-primary-600 file:text-white hover:file:bg-primary-700 disabled:opacity-50"
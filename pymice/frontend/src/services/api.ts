@@ -4,8 +4,13 @@ import type {
   UploadResponse,
   VideoInfo,
   TrackingData,
+  TrackingFrame,
+  TrackingFramesPage,
   ROIPreset,
   ProcessingProgress,
+  BatchProgress,
+  AnalysisDataset,
+  AnalysisDatasetLoad,
   HeatmapSettings,
   Integration,
   TriggerRule,
@@ -109,6 +114,26 @@ export const trackingApi = {
   }) =>
     api.post<ApiResponse<{ task_id: string }>>('/tracking/start', params),
 
+  startBatch: (params: {
+    video_filenames: string[]
+    model_name: string
+    rois: ROIPreset
+    confidence_threshold: number
+    iou_threshold: number
+    inference_size?: number
+    sam_prompt?: string
+  }) =>
+    api.post<ApiResponse<{ batch_id: string; task_ids: string[] }>>('/tracking/start-batch', params),
+
+  getBatchProgress: (batchId: string) =>
+    api.get<ApiResponse<BatchProgress>>(`/tracking/batch/${batchId}`),
+
+  stopBatch: (batchId: string) =>
+    api.post<ApiResponse<{ cancelled: number; stopped: number }>>(`/tracking/batch/${batchId}/stop`),
+
+  prepareBatchTrackingDownload: (batchId: string) =>
+    api.post<ApiResponse<{ download_id: string }>>(`/tracking/batch/${batchId}/download/prepare`),
+
   getProgress: (taskId: string) =>
     api.get<ApiResponse<ProcessingProgress>>(`/tracking/progress/${taskId}`),
 
@@ -118,6 +143,17 @@ export const trackingApi = {
   downloadResults: (taskId: string) =>
     api.get(`/tracking/results/${taskId}`, { responseType: 'blob' }),
 
+  getResultFrames: (taskId: string, params: {
+    start?: number
+    end?: number
+    step?: number
+    limit?: number
+    fields?: (keyof TrackingFrame)[]
+  } = {}) =>
+    api.get<ApiResponse<TrackingFramesPage>>(`/tracking/results/${taskId}/frames`, {
+      params: { ...params, fields: params.fields?.join(',') },
+    }),
+
   prepareBatchDownload: (data: { task_ids: string[]; batch_info: Record<string, unknown> }) =>
     api.post<ApiResponse<{ download_id: string }>>('/tracking/results/batch/prepare', data),
 
@@ -175,14 +211,16 @@ export const roiApi = {
 
 // Analysis API
 export const analysisApi = {
+  // mode=full returns the whole document; the default (stream) returns only the header + a dataset handle
   loadLargeJson: (filePath: string) =>
-    api.get<ApiResponse<TrackingData>>('/analysis/load-large-json', { params: { file_path: filePath } }),
+    api.get<ApiResponse<TrackingData>>('/analysis/load-large-json', { params: { file_path: filePath, mode: 'full' } }),
 
   uploadLargeJson: (file: File, onProgress?: (progress: number) => void) => {
     const formData = new FormData()
     formData.append('file', file)
 
     return api.post<ApiResponse<TrackingData>>('/analysis/upload-large-json', formData, {
+      params: { mode: 'full' },
       headers: { 'Content-Type': 'multipart/form-data' },
       timeout: 600000, // 10 minutes for very large files
       onUploadProgress: (progressEvent) => {
@@ -194,16 +232,30 @@ export const analysisApi = {
     })
   },
 
-  generateHeatmap: (params: { tracking_data: TrackingData
+  // Register once, then pass dataset_id instead of tracking_data to the endpoints below
+  registerDataset: (params: { tracking_data?: TrackingData; file_path?: string }) =>
+    api.post<ApiResponse<AnalysisDataset>>('/analysis/datasets', params),
+
+  getDatasetStatus: (datasetId: string) =>
+    api.get<ApiResponse<AnalysisDatasetLoad>>(`/analysis/datasets/${datasetId}`),
+
+  deleteDataset: (datasetId: string) =>
+    api.delete<ApiResponse<void>>(`/analysis/datasets/${datasetId}`),
+
+  generateHeatmap: (params: { tracking_data?: TrackingData
+    dataset_id?: string
     settings: HeatmapSettings
   }) =>
     api.post<Blob>('/analysis/heatmap', params, { responseType: 'blob' }),
 
-  analyzeMovement: (trackingData: TrackingData) =>
-    api.post<Blob>('/analysis/movement', trackingData, { responseType: 'blob' }),
+  analyzeMovement: (source: TrackingData | { dataset_id: string }) =>
+    'dataset_id' in source
+      ? api.post<Blob>('/analysis/movement', null, { params: source, responseType: 'blob' })
+      : api.post<Blob>('/analysis/movement', source, { responseType: 'blob' }),
 
   generateCompleteAnalysis: (params: {
-    tracking_data: TrackingData
+    tracking_data?: TrackingData
+    dataset_id?: string
     settings: HeatmapSettings
     options?: {
       heatmap?: boolean
@@ -229,7 +281,8 @@ export const analysisApi = {
     api.post<Blob>('/analysis/complete', params, { responseType: 'blob' }),
 
   downloadCompleteAnalysis: (params: {
-    tracking_data: TrackingData
+    tracking_data?: TrackingData
+    dataset_id?: string
     settings: HeatmapSettings
     options?: {
       heatmap?: boolean
@@ -255,7 +308,8 @@ export const analysisApi = {
     api.post<Blob>('/analysis/download', params, { responseType: 'blob' }),
 
   analyzeOpenField: (params: {
-    tracking_data: TrackingData
+    tracking_data?: TrackingData
+    dataset_id?: string
     arena_center_x: number
     arena_center_y: number
     arena_radius: number
@@ -63,12 +63,13 @@ export interface TrackingFrame {
   centroid_y: number;
   roi: string | null;
   roi_index: number | null;
-  detection_method: 'yolo' | 'template' | 'none';
+  detection_method: 'yolo' | 'template' | 'interpolated' | 'none';
   timestamp_sec: number;
   bbox?: [number, number, number, number];
   confidence?: number;
   keypoints?: Keypoint[];
   mask?: [number, number][];
+  gated?: boolean;
 }
 
 export interface VideoInfo {
@@ -85,6 +86,9 @@ export interface TrackingStatistics {
   frames_without_detection: number;
   yolo_detections: number;
   template_detections: number;
+  interpolated_frames?: number;
+  gated_frames?: number;
+  gate_hit_rate?: number;
   detection_rate: number;
 }
 
@@ -95,6 +99,8 @@ export interface TrackingData {
   video_info: VideoInfo;
   statistics: TrackingStatistics;
   rois: ROI[];
+  partial?: boolean; // stopped sharded run: tracking_data only covers processed_ranges
+  processed_ranges?: [number, number][] | null; // [start, end) frame ranges that were tracked
   tracking_data: TrackingFrame[];
 }
 
@@ -146,9 +152,88 @@ export interface ProcessingProgress {
   current_frame: number;
   total_frames: number;
   percentage: number;
-  status: 'processing' | 'completed' | 'error' | 'stopped';
+  status: 'queued' | 'processing' | 'completed' | 'error' | 'stopped' | 'cancelled';
   error?: string;
   device?: string;
+  queue_position?: number;
+}
+
+// Multi-video batch tracking (/tracking/start-batch)
+export interface BatchVideoProgress {
+  task_id: string;
+  video_filename: string;
+  status: ProcessingProgress['status'];
+  current_frame: number;
+  total_frames: number;
+  percentage: number;
+  fps: number;
+  error?: string | null;
+  queue_position?: number | null;
+}
+
+export interface BatchProgress {
+  batch_id: string;
+  status: 'queued' | 'processing' | 'completed';
+  videos_total: number;
+  videos_finished: number;
+  status_counts: Record<string, number>;
+  frames_done: number;
+  frames_total: number;
+  percentage: number;
+  fps: number;
+  elapsed_sec: number;
+  eta_sec: number | null;
+  completed_task_ids: string[];
+  videos: BatchVideoProgress[];
+}
+
+// Tracking data registered server-side for the analysis endpoints
+export interface AnalysisDataset {
+  dataset_id: string;
+  video_name: string | null;
+  total_frames: number;
+  valid_frames: number;
+  nbytes: number;
+  mapped: boolean; // memory-mapped column store, not held in server RAM
+  partial: boolean;
+  processed_ranges: [number, number][] | null;
+  ingest: {
+    source: string;
+    frames: number;
+    ingest_ms: number;
+    peak_bytes: number | null;
+  } | null;
+  register_ms?: number;
+}
+
+// Background load started by load-large-json / upload-large-json (mode=stream)
+export interface AnalysisDatasetLoad {
+  load_id: string; // handle returned at once; also accepted as a dataset_id
+  dataset_id: string | null; // content id, once ready
+  source: string;
+  status: 'loading' | 'ready' | 'error' | 'cancelled';
+  frames: number;
+  bytes_read: number;
+  file_size: number;
+  percentage: number;
+  elapsed_sec: number;
+  error: string | null;
+  trailer: Record<string, unknown>;
+}
+
+// One page of GET /tracking/results/{task_id}/frames
+export interface TrackingFramesPage {
+  task_id: string;
+  start: number;
+  end: number | null;
+  step: number;
+  frames: Partial<TrackingFrame>[];
+  returned: number;
+  matched: number;
+  next_start: number | null;
+  total_frames: number;
+  partial: boolean;
+  processed_ranges: [number, number][] | null;
 }
 
 // Video Info